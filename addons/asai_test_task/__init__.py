@@ -1,2 +1,3 @@
 # Импорт моделей
-from . import models
\ No newline at end of file
+from . import models
+from . import controllers
\ No newline at end of file
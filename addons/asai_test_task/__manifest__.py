@@ -4,18 +4,34 @@
     'sequence': '1',
     'category': 'Inventory',
     'summary': 'Control packing process',
-    'depends': ['base'],
+    'depends': ['base', 'bus'],
     'data': [
         'data/sequence_data.xml',
         'security/ir.model.access.csv',
+        'data/cron_data.xml',
+        'data/carton_data.xml',
         'views/packaging_order_views.xml',    
         'views/packaging_order_create_views.xml',
         'views/quick_jump_wizard_views.xml',
+        'views/scan_router_views.xml',
         'views/packaging_order_form_views.xml',
         'views/packaging_item_views.xml',        
         'views/packaging_label_views.xml',
         'views/packaging_defective_report_views.xml',
+        'views/packaging_order_archive_views.xml',
+        'views/packaging_scan_event_views.xml',
+        'views/packaging_scan_log_views.xml',
+        'views/packaging_slow_op_views.xml',
+        'views/packaging_carton_views.xml',
+        'views/packaging_outbox_views.xml',
+        'views/packaging_order_state_log_views.xml',
+        'views/packaging_productivity_views.xml',
     ],
+    'assets': {
+        'web.assets_backend': [
+            'asai_test_task/static/src/js/live_progress.js',
+        ],
+    },
     'installable': True,
     'application': True,
     'auto_install': False,
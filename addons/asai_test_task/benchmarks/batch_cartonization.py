@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Scaling of the carton queue with the number of worker processes.
+
+    python3 batch_cartonization.py -c /etc/odoo/odoo.conf -d <db> --orders 2000 --items-per-order 40 --workers 1,2,4
+
+Generated orders are committed, queued with carton_pending and drained by N
+separate processes, each with its own registry and cursor, running the
+worker cron method on its share of order ids. Prints one JSON line per
+worker count with the total and per-worker throughput and the scaling
+against one worker. Generated orders are deleted at the end.
+"""
+import argparse
+import multiprocessing
+import random
+import time
+from types import SimpleNamespace
+
+from odoo import api, SUPERUSER_ID
+
+from common import add_database_arguments, emit, open_registry
+
+
+def generate(env, orders, items_per_order, rng):
+    Order = env['packaging.order']
+    created = Order.create([{'auto_print_labels': False} for _i in range(orders)])
+    env['packaging.item'].create([{
+        'order_id': order.id,
+        'item_code': f'CART-{order.id}-{i}',
+        'product_name': f'Product {i}',
+        'dimensions': '%dx%dx%d cm' % (rng.randint(2, 35), rng.randint(2, 25), rng.randint(1, 15)),
+    } for order in created for i in range(items_per_order)])
+    env.flush_all()
+    return created
+
+
+def drain(config, database, worker, workers, chunk_size, barrier, results):
+    """One worker process: own registry and cursor, its share of the queue"""
+    registry = open_registry(SimpleNamespace(config=config, database=database))
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        barrier.wait()
+        start = time.perf_counter()
+        processed = env['packaging.order']._cron_process_carton_queue(
+            chunk_size=chunk_size, worker=worker, workers=workers,
+        )
+        results.put((worker, processed, time.perf_counter() - start))
+
+
+def run(args, order_ids, workers):
+    registry = open_registry(args)
+    with registry.cursor() as cr:
+        cr.execute("UPDATE packaging_order SET carton_pending = true WHERE id IN %s", (tuple(order_ids),))
+        cr.commit()
+
+    # spawn: процессы не наследуют соединения и состояние реестра родителя
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=drain, args=(
+            args.config, args.database, worker, workers, args.chunk_size, barrier, results,
+        ))
+        for worker in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _process in processes]
+    for process in processes:
+        process.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_arguments(parser)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--items-per-order', type=int, default=40)
+    parser.add_argument('--chunk-size', type=int, default=200)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    registry = open_registry(args)
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        order_ids = generate(env, args.orders, args.items_per_order, random.Random(args.seed)).ids
+        cr.commit()
+
+    records = []
+    baseline = None
+    try:
+        for workers in sorted({int(value) for value in args.workers.split(',')}):
+            samples = run(args, order_ids, workers)
+            processed = sum(sample[1] for sample in samples)
+            elapsed = max(sample[2] for sample in samples)
+            orders_per_s = processed / elapsed if elapsed else 0.0
+            baseline = baseline or orders_per_s
+            records.append({
+                'benchmark': 'batch_cartonization',
+                'orders': processed,
+                'items_per_order': args.items_per_order,
+                'chunk_size': args.chunk_size,
+                'workers': workers,
+                'elapsed_s': round(elapsed, 3),
+                'orders_per_s': round(orders_per_s, 1),
+                'worker_orders_per_s': [
+                    round(count / seconds, 1) if seconds else 0.0
+                    for _worker, count, seconds in sorted(samples)
+                ],
+                'scaling': round(orders_per_s / baseline, 2) if baseline else 0.0,
+                'efficiency': round(orders_per_s / baseline / workers, 2) if baseline else 0.0,
+            })
+    finally:
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['packaging.order'].browse(order_ids).unlink()
+            cr.commit()
+    emit(records, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Shared helpers of the standalone benchmarks (not loaded by Odoo).
+
+The benchmarks are plain scripts, not a package: run them by path
+(python3 addons/asai_test_task/benchmarks/load_suite.py ...) from any
+directory. Python puts the script directory first on sys.path, so
+'from common import' resolves; 'python -m' is not supported.
+"""
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+import odoo
+from odoo.modules.registry import Registry
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def add_database_arguments(parser):
+    parser.add_argument('-c', '--config', required=True, help='Odoo configuration file')
+    parser.add_argument('-d', '--database', required=True, help='Database with asai_test_task installed')
+    parser.add_argument('--output', help='Append JSON lines to this file instead of stdout')
+
+
+def settle(env):
+    """Flush and run the precommit hooks, as a commit would"""
+    # Буферы журналов, outbox и live-уведомлений пишутся в precommit:
+    # без этого замер не учитывает их стоимость, а откат их отбрасывает
+    env.flush_all()
+    env.cr.precommit.run()
+
+
+def open_registry(args):
+    odoo.tools.config.parse_config(['-c', args.config, '-d', args.database])
+    return Registry(args.database)
+
+
+class Timings:
+    """Latency samples per operation, reported as JSON lines"""
+
+    def __init__(self):
+        self.samples = {}
+        self.counts = {}
+
+    @contextmanager
+    def measure(self, name, count=1):
+        start = time.perf_counter()
+        yield
+        self.samples.setdefault(name, []).append(time.perf_counter() - start)
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    def summary(self, name):
+        samples = self.samples.get(name, [])
+        total = sum(samples)
+        return {
+            'operation': name,
+            'calls': len(samples),
+            'units': self.counts.get(name, 0),
+            'total_s': round(total, 3),
+            'throughput_per_s': round(self.counts.get(name, 0) / total, 1) if total else 0,
+            'p50_ms': round(percentile(samples, 50) * 1000, 3),
+            'p95_ms': round(percentile(samples, 95) * 1000, 3),
+            'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        }
+
+
+def emit(records, output=None):
+    lines = [json.dumps(record, sort_keys=True) for record in records]
+    if output:
+        with open(output, 'a', encoding='utf-8') as stream:
+            stream.write('\n'.join(lines) + '\n')
+    else:
+        sys.stdout.write('\n'.join(lines) + '\n')
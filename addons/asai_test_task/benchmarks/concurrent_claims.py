@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Multi-threaded benchmark of the dispatch queue: stations claiming orders.
+
+    python3 concurrent_claims.py -c /etc/odoo/odoo.conf -d <db> --threads 16 --orders 5000
+
+Every thread is one operator claiming orders until the queue is empty.
+Prints one JSON line: claims per second, collisions (orders claimed twice),
+the rate of claims retried after a serialization conflict and latency
+percentiles. Fails (exit code 1) on collisions, unclaimed orders, failed
+claims or a retry rate above --max-retry-rate. Generated orders and
+operators are removed.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from psycopg2.errors import SerializationFailure
+
+from odoo import api, SUPERUSER_ID
+
+from common import add_database_arguments, emit, open_registry, percentile
+
+CLAIM_MAX_PARAM = 'asai_test_task.max_claims_per_operator'
+
+
+def setup(registry, orders, threads):
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        Param = env['ir.config_parameter']
+        previous_max = Param.get_param(CLAIM_MAX_PARAM)
+        # Каждый поток держит много захватов - меряем саму раздачу
+        Param.set_param(CLAIM_MAX_PARAM, orders + 1)
+        created = env['packaging.order'].create([{'auto_print_labels': False} for _i in range(orders)])
+        env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': 'Claim product',
+            'item_code': f'CLAIM-{order.id}',
+        } for order in created])
+        operators = env['res.users'].create([
+            {'name': f'Claim bench {i}', 'login': f'claim_bench_{i}_{time.time_ns()}'} for i in range(threads)
+        ])
+        cr.commit()
+        return created.ids, operators.ids, previous_max
+
+
+def station(registry, uid, stats, lock):
+    claimed, latencies, failed = [], [], 0
+    while True:
+        start = time.perf_counter()
+        try:
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, {})
+                order = env['packaging.order']._claim_next_order()
+                order_id = order.id
+        except SerializationFailure:
+            # Все попытки захвата внутри метода исчерпаны
+            failed += 1
+            continue
+        if not order_id:
+            break
+        latencies.append(time.perf_counter() - start)
+        claimed.append(order_id)
+    with lock:
+        stats['claimed'].extend(claimed)
+        stats['latencies'].extend(latencies)
+        stats['failed'] += failed
+
+
+def cleanup(registry, order_ids, operator_ids, previous_max):
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        env['packaging.order'].browse(order_ids).unlink()
+        operators = env['res.users'].browse(operator_ids)
+        partners = operators.partner_id
+        operators.unlink()
+        partners.unlink()
+        env['ir.config_parameter'].set_param(CLAIM_MAX_PARAM, previous_max or False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_arguments(parser)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--max-retry-rate', type=float, default=0.05,
+                        help='Highest accepted share of claims retried after a conflict')
+    args = parser.parse_args()
+
+    registry = open_registry(args)
+    from odoo.addons.asai_test_task import metrics
+    retries_before = metrics.CLAIM_RETRIES.value()
+    order_ids, operator_ids, previous_max = setup(registry, args.orders, args.threads)
+    stats = {'claimed': [], 'latencies': [], 'failed': 0}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=station, args=(registry, uid, stats, lock))
+        for uid in operator_ids
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cleanup(registry, order_ids, operator_ids, previous_max)
+
+    claims = len(stats['claimed'])
+    retries = metrics.CLAIM_RETRIES.value() - retries_before
+    collisions = claims - len(set(stats['claimed']))
+    unclaimed = len(set(order_ids) - set(stats['claimed']))
+    retry_rate = retries / claims if claims else 0.0
+    passed = not collisions and not unclaimed and not stats['failed'] and retry_rate <= args.max_retry_rate
+    emit([{
+        'benchmark': 'concurrent_claims',
+        'threads': args.threads,
+        'orders': args.orders,
+        'elapsed_s': round(elapsed, 3),
+        'claims': claims,
+        'claims_per_s': round(claims / elapsed, 1) if elapsed else 0,
+        'collisions': collisions,
+        'unclaimed': unclaimed,
+        'retries': retries,
+        'retry_rate': round(retry_rate, 4),
+        'failed': stats['failed'],
+        'passed': passed,
+        'p50_ms': round(percentile(stats['latencies'], 50) * 1000, 3),
+        'p95_ms': round(percentile(stats['latencies'], 95) * 1000, 3),
+        'p99_ms': round(percentile(stats['latencies'], 99) * 1000, 3),
+    }], args.output)
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Multi-threaded stress benchmark: many packers scanning items of one order.
+
+Runs against a real database with the module installed (not inside the test
+runner, whose cursors are serialized):
+
+    python3 concurrent_packing.py -c /etc/odoo/odoo.conf -d <db> --threads 8 --items 2000
+
+Prints one JSON line: scans per second, retry rate and latency percentiles.
+"""
+import argparse
+import queue
+import threading
+import time
+
+from psycopg2.errors import SerializationFailure
+
+from odoo import api, SUPERUSER_ID
+from odoo.exceptions import UserError
+
+from common import add_database_arguments, emit, open_registry, percentile
+
+MAX_RETRIES = 5
+
+
+def setup_order(registry, items):
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        order = env['packaging.order'].create({'auto_print_labels': False})
+        env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Stress product {i}',
+            'item_code': f'STRESS-{order.id}-{i}',
+        } for i in range(items)])
+        cr.commit()
+        return order.id, order.item_ids.mapped('item_code')
+
+
+def packer(registry, order_id, codes, stats, lock):
+    latencies, retries, scans, failures = [], 0, 0, 0
+    while True:
+        try:
+            code = codes.get_nowait()
+        except queue.Empty:
+            break
+        start = time.perf_counter()
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    env['packaging.order'].browse(order_id)._quick_pack_code(code)
+                scans += 1
+                break
+            except SerializationFailure:
+                retries += 1
+            except UserError:
+                failures += 1
+                break
+        else:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    with lock:
+        stats['latencies'].extend(latencies)
+        stats['retries'] += retries
+        stats['scans'] += scans
+        stats['failures'] += failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_arguments(parser)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--items', type=int, default=2000)
+    args = parser.parse_args()
+
+    registry = open_registry(args)
+
+    order_id, item_codes = setup_order(registry, args.items)
+    codes = queue.Queue()
+    for code in item_codes:
+        codes.put(code)
+
+    stats = {'latencies': [], 'retries': 0, 'scans': 0, 'failures': 0}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=packer, args=(registry, order_id, codes, stats, lock))
+        for _i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # Хвост дельт сворачивается так же, как это делает cron
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        env['packaging.order']._cron_fold_progress_deltas()
+        order = env['packaging.order'].browse(order_id)
+        final = {'packed_items': order.packed_items, 'state': order.state}
+
+    attempts = stats['scans'] + stats['retries'] + stats['failures']
+    emit([{
+        'benchmark': 'concurrent_packing',
+        'threads': args.threads,
+        'items': args.items,
+        'elapsed_s': round(elapsed, 3),
+        'scans': stats['scans'],
+        'scans_per_s': round(stats['scans'] / elapsed, 1) if elapsed else 0,
+        'retries': stats['retries'],
+        'retry_rate': round(stats['retries'] / attempts, 4) if attempts else 0,
+        'failures': stats['failures'],
+        'p50_ms': round(percentile(stats['latencies'], 50) * 1000, 3),
+        'p95_ms': round(percentile(stats['latencies'], 95) * 1000, 3),
+        'p99_ms': round(percentile(stats['latencies'], 99) * 1000, 3),
+        'final': final,
+    }], args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Throughput of item import per file format.
+
+    python3 import_formats.py -c /etc/odoo/odoo.conf -d <db> --rows 50000 --formats csv,csv.gz,ndjson,xlsx
+
+For every format the same generated rows are encoded, parsed alone and then
+imported into an order through action_import_csv. Prints one JSON line per
+format. Generated orders are rolled back.
+"""
+import argparse
+import base64
+import csv
+import gzip
+import io
+import json
+import random
+import time
+
+from odoo import api, SUPERUSER_ID
+
+from common import add_database_arguments, emit, open_registry, settle
+
+COLUMNS = ['item_code', 'product_name', 'dimensions']
+
+
+def make_rows(count, rng):
+    return [{
+        'item_code': f'FMT-{i}',
+        'product_name': f'Product {i}',
+        'dimensions': '%dx%dx%d cm' % (rng.randint(2, 35), rng.randint(2, 25), rng.randint(1, 15)),
+    } for i in range(count)]
+
+
+def encode_csv(rows):
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return stream.getvalue().encode('utf-8')
+
+
+def encode_xlsx(rows):
+    import xlsxwriter
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {'in_memory': True, 'constant_memory': True})
+    sheet = workbook.add_worksheet()
+    sheet.write_row(0, 0, COLUMNS)
+    for index, row in enumerate(rows, 1):
+        sheet.write_row(index, 0, [row[name] for name in COLUMNS])
+    workbook.close()
+    return buffer.getvalue()
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'csv.gz': lambda rows: gzip.compress(encode_csv(rows)),
+    'ndjson': lambda rows: ''.join(json.dumps(row) + '\n' for row in rows).encode('utf-8'),
+    'xlsx': encode_xlsx,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_arguments(parser)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--formats', default=','.join(ENCODERS))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    registry = open_registry(args)
+    from odoo.addons.asai_test_task import importers
+
+    rows = make_rows(args.rows, random.Random(args.seed))
+    records = []
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        for file_format in args.formats.split(','):
+            content = ENCODERS[file_format](rows)
+            filename = f'bench.{file_format}'
+
+            start = time.perf_counter()
+            parsed = sum(1 for _row in importers.iter_rows(filename, content))
+            parse_elapsed = time.perf_counter() - start
+
+            order = env['packaging.order'].create({'auto_print_labels': False})
+            order.write({'import_file': base64.b64encode(content), 'import_filename': filename})
+            start = time.perf_counter()
+            order.action_import_csv()
+            settle(env)
+            import_elapsed = time.perf_counter() - start
+            records.append({
+                'benchmark': 'import_formats',
+                'format': file_format,
+                'rows': parsed,
+                'file_kb': round(len(content) / 1024, 1),
+                'parse_s': round(parse_elapsed, 3),
+                'parse_rows_per_s': round(parsed / parse_elapsed, 1),
+                'import_s': round(import_elapsed, 3),
+                'import_rows_per_s': round(parsed / import_elapsed, 1),
+            })
+            env.invalidate_all()
+        cr.rollback()
+    emit(records, args.output)
+
+
+if __name__ == '__main__':
+    main()
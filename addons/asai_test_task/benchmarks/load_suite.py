@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""End-to-end load benchmark on synthetic data.
+
+Generates orders at the requested scale and drives the real entry points:
+CSV import, quick pack, label creation and the defective report.
+
+    python3 load_suite.py -c /etc/odoo/odoo.conf -d <db> --orders 200 --items-per-order 50 --defect-rate 0.02
+
+Prints one JSON line per operation with throughput and p50/p95/p99 latency.
+Every measured call is flushed and runs the precommit hooks, so the timings
+include the deferred log and outbox writes of a real commit. Data is rolled
+back at the end unless --keep is given.
+"""
+import argparse
+import base64
+import csv
+import io
+import random
+from datetime import timedelta
+
+from odoo import api, fields, SUPERUSER_ID
+
+from common import Timings, add_database_arguments, emit, open_registry, settle
+
+PRODUCTS = [
+    'Processor Intel i7', 'RAM DDR4 16GB', 'SSD 1TB', 'Video Card NVIDIA',
+    'Power Supply 750W', 'Motherboard ATX', 'CPU Cooler', 'Case Fan 120mm',
+]
+
+
+def make_csv(order_index, items, rng):
+    """CSV in the same shape as order_items.csv"""
+    stream = io.StringIO()
+    writer = csv.writer(stream)
+    writer.writerow(['item_code', 'product_name', 'dimensions'])
+    for i in range(items):
+        writer.writerow([
+            f'BENCH-{order_index:06d}-{i:04d}',
+            rng.choice(PRODUCTS),
+            '%dx%dx%d cm' % (rng.randint(1, 40), rng.randint(1, 40), rng.randint(1, 20)),
+        ])
+    return base64.b64encode(stream.getvalue().encode('utf-8'))
+
+
+def run(env, args, timings):
+    rng = random.Random(args.seed)
+    Order = env['packaging.order']
+    orders = Order.browse()
+
+    for index in range(args.orders):
+        order = Order.create({'auto_print_labels': args.auto_labels})
+        order.write({
+            'import_file': make_csv(index, args.items_per_order, rng),
+            'import_filename': f'bench_{index}.csv',
+        })
+        with timings.measure('import_csv', count=args.items_per_order):
+            order.action_import_csv()
+            settle(env)
+        orders |= order
+
+    for order in orders:
+        for item in order.item_ids:
+            if rng.random() < args.defect_rate:
+                with timings.measure('mark_defective'):
+                    item.action_mark_defective_simple()
+                    settle(env)
+                continue
+            order.quick_pack_item_code = item.item_code
+            with timings.measure('quick_pack'):
+                order.action_quick_pack()
+                settle(env)
+
+    for order in orders:
+        with timings.measure('label_create'):
+            env['packaging.label'].create({'order_id': order.id})
+            settle(env)
+
+    report = env['packaging.defective.report'].create({
+        'date_from': fields.Date.today() - timedelta(days=1),
+        'date_to': fields.Date.today() + timedelta(days=1),
+        'show_details': True,
+    })
+    if orders.filtered(lambda order: order.state == 'defective'):
+        for _attempt in range(args.report_runs):
+            env.invalidate_all()
+            with timings.measure('defective_report'):
+                report.action_generate_report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_arguments(parser)
+    parser.add_argument('--orders', type=int, default=100)
+    parser.add_argument('--items-per-order', type=int, default=50)
+    parser.add_argument('--defect-rate', type=float, default=0.02)
+    parser.add_argument('--report-runs', type=int, default=10)
+    parser.add_argument('--auto-labels', action='store_true', help='Print labels on order completion')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help='Commit generated data')
+    args = parser.parse_args()
+
+    registry = open_registry(args)
+    timings = Timings()
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        run(env, args, timings)
+        if not args.keep:
+            cr.rollback()
+
+    scale = {
+        'orders': args.orders,
+        'items_per_order': args.items_per_order,
+        'defect_rate': args.defect_rate,
+    }
+    emit([
+        dict(timings.summary(name), benchmark='load_suite', **scale)
+        for name in ('import_csv', 'quick_pack', 'mark_defective', 'label_create', 'defective_report')
+        if name in timings.samples
+    ], args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Throughput of the bulk order intake API.
+
+    python3 order_intake.py -c /etc/odoo/odoo.conf -d <db> --orders 2000 --items-per-order 20 --batches 3
+
+Every batch is sent twice: the retry must return the same orders without
+creating anything. Prints one JSON line per batch. Generated orders are
+rolled back.
+"""
+import argparse
+import time
+import uuid
+
+from odoo import api, SUPERUSER_ID
+
+from common import add_database_arguments, emit, open_registry, settle
+
+
+def payload(orders, items_per_order):
+    return [{
+        'key': str(uuid.uuid4()),
+        'auto_print_labels': False,
+        'items': [{
+            'item_code': f'IN-{o}-{i}',
+            'product_name': f'Product {i}',
+            'dimensions': '20x15x10 cm',
+        } for i in range(items_per_order)],
+    } for o in range(orders)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_arguments(parser)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--items-per-order', type=int, default=20)
+    parser.add_argument('--batches', type=int, default=3)
+    args = parser.parse_args()
+
+    registry = open_registry(args)
+    records = []
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        Order = env['packaging.order']
+        for batch in range(args.batches):
+            orders = payload(args.orders, args.items_per_order)
+            start = time.perf_counter()
+            results = Order.intake_orders(orders)
+            settle(env)
+            elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            retry = Order.intake_orders(orders)
+            retry_elapsed = time.perf_counter() - start
+            records.append({
+                'benchmark': 'order_intake',
+                'batch': batch,
+                'orders': args.orders,
+                'items_per_order': args.items_per_order,
+                'elapsed_s': round(elapsed, 3),
+                'orders_per_s': round(args.orders / elapsed, 1),
+                'items_per_s': round(args.orders * args.items_per_order / elapsed, 1),
+                'retry_s': round(retry_elapsed, 3),
+                'retry_duplicates': sum(result['status'] == 'duplicate' for result in retry),
+                'same_orders': [r['id'] for r in results] == [r['id'] for r in retry],
+            })
+        cr.rollback()
+    emit(records, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Carton recommendation: fast 3D bin packing heuristic.
+
+Pure Python without ORM access: callers read the sizes and store the plans.
+Items and cartons are given in centimetres:
+    items:   [(item_id, length, width, height), ...]
+    cartons: [(carton_id, length, width, height, cost), ...]
+
+Items are placed largest first into guillotine free spaces of the open
+cartons (first fit). A new carton is opened with the largest type, and every
+filled carton is then shrunk to the cheapest type its items still fit in.
+
+Free spaces are kept sorted by volume, so the search starts at the first
+space large enough for the item; spaces too small for the smallest item of
+the order are dropped right after the cut and never scanned again.
+"""
+import itertools
+import time
+from bisect import bisect_left, insort
+
+_EPSILON = 1e-9
+
+
+class _Bin:
+    __slots__ = ('dims', 'spaces', 'items', 'free_volume', 'min_side', 'min_volume', 'sequence')
+
+    def __init__(self, dims, min_side=0.0, min_volume=0.0):
+        self.dims = dims
+        self.min_side = min_side - _EPSILON
+        self.min_volume = min_volume - _EPSILON
+        # Порядок вставки: при равном объеме раньше занимается старое пространство
+        self.sequence = itertools.count()
+        # Свободные параллелепипеды по возрастанию объема:
+        # (объем, №, стороны по возрастанию, оси сторон, (x, y, z, длина, ширина, высота))
+        self.spaces = []
+        self.items = []
+        self.free_volume = dims[0] * dims[1] * dims[2]
+        self._add_space((0.0, 0.0, 0.0) + tuple(dims))
+
+    def _add_space(self, space):
+        space_dims = space[3:]
+        order = sorted(range(3), key=space_dims.__getitem__)
+        sides = tuple(space_dims[axis] for axis in order)
+        # Сюда не влезет ни один товар заказа
+        if sides[0] < self.min_side or sides[0] * sides[1] * sides[2] < self.min_volume:
+            return
+        insort(self.spaces, (sides[0] * sides[1] * sides[2], next(self.sequence), sides, order, space))
+
+    def place(self, item_id, item_sorted, volume):
+        """Put the item into the first free space it fits, False if none"""
+        spaces = self.spaces
+        if volume > self.free_volume + _EPSILON or not spaces or volume > spaces[-1][0] + _EPSILON:
+            return False
+        small, middle, large = item_sorted
+        # Пространства меньшего объема товар не вместят
+        for index in range(bisect_left(spaces, (volume - _EPSILON,)), len(spaces)):
+            sides = spaces[index][2]
+            # Поворот: меньшая сторона товара вдоль меньшей стороны пространства
+            if (small <= sides[0] + _EPSILON and middle <= sides[1] + _EPSILON
+                    and large <= sides[2] + _EPSILON):
+                _volume, _sequence, _sides, order, space = spaces.pop(index)
+                placed = [0.0, 0.0, 0.0]
+                for axis, size in zip(order, item_sorted):
+                    placed[axis] = size
+                self._split(space, placed)
+                self.items.append(item_id)
+                self.free_volume -= volume
+                return True
+        return False
+
+    def _split(self, space, placed):
+        x, y, z, length, width, height = space
+        pl, pw, ph = placed
+        # Гильотинный разрез: справа, спереди, сверху от товара
+        for new_space in (
+            (x + pl, y, z, length - pl, width, height),
+            (x, y + pw, z, pl, width - pw, height),
+            (x, y, z + ph, pl, pw, height - ph),
+        ):
+            if min(new_space[3:]) > _EPSILON:
+                self._add_space(new_space)
+
+
+def _prepare(items):
+    prepared = []
+    for item_id, length, width, height in items:
+        dims = tuple(sorted((float(length or 0), float(width or 0), float(height or 0))))
+        prepared.append((item_id, dims, dims[0] * dims[1] * dims[2]))
+    prepared.sort(key=lambda item: (item[2], item[1][2]), reverse=True)
+    return prepared
+
+
+def _limits(prepared):
+    """Smallest side and volume of the items: smaller free spaces are useless"""
+    sized = [item for item in prepared if item[2] > 0]
+    if not sized:
+        return 0.0, 0.0
+    return min(item[1][0] for item in sized), min(item[2] for item in sized)
+
+
+def _fits_all(prepared, carton_dims):
+    packing_bin = _Bin(carton_dims, *_limits(prepared))
+    return all(packing_bin.place(item_id, dims, volume) for item_id, dims, volume in prepared)
+
+
+def pack_items(items, cartons):
+    """Assign items to cartons.
+
+    Returns {'cartons': [{'carton_id', 'item_ids', 'fill'}], 'unpacked': [item_id, ...], 'cost': float}.
+    Items without dimensions are ignored; items larger than every carton are unpacked.
+    """
+    catalog = []
+    for carton_id, length, width, height, cost in cartons:
+        dims = tuple(sorted((float(length), float(width), float(height))))
+        volume = dims[0] * dims[1] * dims[2]
+        if volume > 0:
+            catalog.append((carton_id, dims, volume, float(cost or 0.0) or volume))
+    result = {'cartons': [], 'unpacked': [], 'cost': 0.0}
+    if not catalog:
+        result['unpacked'] = [item[0] for item in items]
+        return result
+
+    largest = max(catalog, key=lambda carton: carton[2])
+    by_cost = sorted(catalog, key=lambda carton: (carton[3], carton[2]))
+
+    bins = []
+    prepared_items = _prepare(items)
+    limits = _limits(prepared_items)
+    for item_id, dims, volume in prepared_items:
+        if volume <= 0:
+            continue
+        if any(size > limit + _EPSILON for size, limit in zip(dims, largest[1])):
+            result['unpacked'].append(item_id)
+            continue
+        if not any(packing_bin.place(item_id, dims, volume) for packing_bin in bins):
+            packing_bin = _Bin(largest[1], *limits)
+            if packing_bin.place(item_id, dims, volume):
+                bins.append(packing_bin)
+            else:
+                result['unpacked'].append(item_id)
+
+    volumes = {item_id: (dims, volume) for item_id, dims, volume in prepared_items}
+    for packing_bin in bins:
+        prepared = sorted(
+            ((item_id,) + volumes[item_id] for item_id in packing_bin.items),
+            key=lambda item: (item[2], item[1][2]), reverse=True,
+        )
+        items_volume = sum(item[2] for item in prepared)
+        carton = largest
+        for candidate in by_cost:
+            if candidate[2] + _EPSILON < items_volume:
+                continue
+            if candidate is largest or _fits_all(prepared, candidate[1]):
+                carton = candidate
+                break
+        result['cartons'].append({
+            'carton_id': carton[0],
+            'item_ids': [item[0] for item in prepared],
+            'fill': round(items_volume / carton[2], 4),
+        })
+        result['cost'] += carton[3]
+    result['cost'] = round(result['cost'], 4)
+    return result
+
+
+def pack_orders(orders, cartons):
+    """Plan a chunk of orders.
+
+    `orders` is [(order_id, items), ...]; returns the plans with chunk timing.
+    """
+    start = time.perf_counter()
+    plans = {order_id: pack_items(items, cartons) for order_id, items in orders}
+    return {
+        'orders': len(plans),
+        'items': sum(len(items) for _order_id, items in orders),
+        'seconds': time.perf_counter() - start,
+        'plans': plans,
+    }
@@ -0,0 +1,4 @@
+from . import scanner_sync
+from . import metrics
+from . import export
+from . import intake
@@ -0,0 +1,37 @@
+from werkzeug.exceptions import BadRequest
+
+from odoo import http
+from odoo.http import request
+
+from .. import export
+
+
+class PackagingExportController(http.Controller):
+
+    @http.route('/asai_test_task/export/<string:resource>', type='http', auth='user', methods=['GET'])
+    def export_changes(self, resource, cursor=None, limit=export.PAGE_LIMIT_DEFAULT, fields=None):
+        """Orders, items or deletions after the cursor, one JSON object per line.
+
+        The next cursor is returned in the X-Next-Cursor header, X-Has-More
+        tells whether another page is waiting. Compressed with gzip when the
+        client accepts it.
+        """
+        try:
+            model_name, field_names = export.select_fields(resource, fields)
+            rows, next_cursor, has_more = export.fetch_page(
+                request.env, model_name, field_names, cursor=cursor, limit=int(limit),
+            )
+        except ValueError as e:
+            raise BadRequest(str(e))
+        compress = 'gzip' in request.httprequest.headers.get('Accept-Encoding', '')
+        headers = [
+            ('Content-Type', 'application/x-ndjson; charset=utf-8'),
+            ('Cache-Control', 'no-store'),
+            ('Vary', 'Accept-Encoding'),
+            ('X-Next-Cursor', next_cursor),
+            ('X-Has-More', '1' if has_more else '0'),
+            ('X-Row-Count', str(len(rows))),
+        ]
+        if compress:
+            headers.append(('Content-Encoding', 'gzip'))
+        return request.make_response(export.iter_ndjson(rows, compress=compress), headers=headers)
@@ -0,0 +1,13 @@
+from odoo import http
+from odoo.http import request
+
+
+class PackagingIntakeController(http.Controller):
+
+    @http.route('/asai_test_task/orders/intake', type='json', auth='user', methods=['POST'])
+    def intake(self, orders):
+        """Create orders with their items pushed by the ERP.
+
+        Safe to resend: orders are deduplicated by their client `key`.
+        """
+        return request.env['packaging.order'].intake_orders(orders)
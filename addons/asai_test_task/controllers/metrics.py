@@ -0,0 +1,43 @@
+import hmac
+
+from werkzeug.exceptions import Forbidden
+
+from odoo import http
+from odoo.http import request
+
+from .. import metrics
+
+METRICS_TOKEN_PARAM = 'asai_test_task.metrics_token'
+METRICS_ALLOWED_IPS_PARAM = 'asai_test_task.metrics_allowed_ips'
+
+
+class PackagingMetricsController(http.Controller):
+
+    @http.route('/asai_test_task/metrics', type='http', auth='none', methods=['GET'], save_session=False)
+    def metrics(self):
+        """Packing metrics in Prometheus text format.
+
+        Scrapers send the configured token as `Authorization: Bearer <token>`
+        or come from an address of the configured allowlist. Values are per
+        worker process, see metrics.py.
+        """
+        if not self._is_allowed():
+            raise Forbidden()
+        body = metrics.render()
+        if request.db:
+            body += request.env['packaging.order'].sudo()._metrics_orders_by_state()
+        return request.make_response(body, headers=[
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Cache-Control', 'no-store'),
+        ])
+
+    def _is_allowed(self):
+        # За обратным прокси все запросы локальные, поэтому loopback сам по себе не пропускаем
+        if not request.db:
+            return False
+        get_param = request.env['ir.config_parameter'].sudo().get_param
+        if metrics.address_allowed(request.httprequest.remote_addr, get_param(METRICS_ALLOWED_IPS_PARAM)):
+            return True
+        token = get_param(METRICS_TOKEN_PARAM)
+        header = request.httprequest.headers.get('Authorization', '')
+        return bool(token) and hmac.compare_digest(header, f'Bearer {token}')
@@ -0,0 +1,13 @@
+from odoo import http
+from odoo.http import request
+
+
+class ScannerSyncController(http.Controller):
+
+    @http.route('/asai_test_task/scanner/sync', type='json', auth='user', methods=['POST'])
+    def sync(self, events, device=None):
+        """Flush events buffered by an offline scanner.
+
+        Safe to resend: events are deduplicated by their client UUID.
+        """
+        return request.env['packaging.scan.event'].sync_events(events, device=device)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Item import formats.
+
+A parser takes the raw file content and yields one dict per item row with
+the item_code, product_name and dimensions columns. Parsers are registered
+by file extension; the content signature wins over a wrong extension for
+compressed and XLSX files. Rows are produced lazily, so the caller can
+create items in batches without holding all rows in memory.
+"""
+import csv
+import gzip
+import io
+import json
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+
+# Расширение -> парсер; длинные расширения ('.csv.gz') проверяются первыми
+PARSERS = {}
+
+
+def register(*extensions):
+    def decorator(parser):
+        for extension in extensions:
+            PARSERS[extension] = parser
+        return parser
+    return decorator
+
+
+@register('.csv')
+def parse_csv(content):
+    # utf-8-sig: Excel пишет BOM в начале CSV
+    with io.TextIOWrapper(io.BytesIO(content), encoding='utf-8-sig', newline='') as stream:
+        yield from csv.DictReader(stream)
+
+
+@register('.csv.gz', '.gz')
+def parse_csv_gzip(content):
+    # Распаковка потоком, файл целиком не разжимается
+    with gzip.GzipFile(fileobj=io.BytesIO(content)) as raw, \
+            io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as stream:
+        yield from csv.DictReader(stream)
+
+
+@register('.ndjson', '.jsonl')
+def parse_ndjson(content):
+    with io.TextIOWrapper(io.BytesIO(content), encoding='utf-8-sig') as stream:
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f'line {number}: {e}')
+            if not isinstance(row, dict):
+                raise ValueError(f'line {number}: object expected')
+            yield row
+
+
+@register('.xlsx')
+def parse_xlsx(content):
+    # Odoo ставит openpyxl, но модуль грузится и без него
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError('XLSX import requires the openpyxl library')
+    # read_only: строки читаются потоком из XML листа, без модели всей книги
+    workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            return
+        names = [str(name).strip() if name is not None else '' for name in header]
+        for values in rows:
+            if not any(value is not None for value in values):
+                continue
+            yield {
+                name: '' if value is None else str(value)
+                for name, value in zip(names, values) if name
+            }
+    finally:
+        workbook.close()
+
+
+def detect(filename, content):
+    """Parser for the file: by content signature, then by extension"""
+    name = (filename or '').lower()
+    if content[:2] == GZIP_MAGIC:
+        return parse_csv_gzip
+    if content[:4] == ZIP_MAGIC:
+        return parse_xlsx
+    for extension in sorted(PARSERS, key=len, reverse=True):
+        if name.endswith(extension):
+            return PARSERS[extension]
+    return parse_csv
+
+
+def iter_rows(filename, content):
+    """Item rows of an import file of any registered format"""
+    return detect(filename, content)(content)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""In-process metrics of packing operations in Prometheus text format.
+
+Updates are a few additions under a per-metric lock, no I/O and no SQL,
+so they can be called on the scan path. Values live in the worker process:
+with several workers every scrape shows the process that served it
+(the `worker` label keeps the series apart). Counters and histogram buckets
+of all workers add up on the Prometheus side, e.g.
+    sum without (worker) (rate(packaging_scan_seconds_bucket[5m]))
+"""
+import ipaddress
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REGISTRY = []
+
+
+def _format_labels(names, values):
+    pairs = [('worker', str(os.getpid()))] + list(zip(names, values))
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in pairs
+    )
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        _REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.label_names)
+
+    def collect(self):
+        with self._lock:
+            values = {key: self._copy(value) for key, value in self._values.items()}
+        lines = [
+            '# HELP %s %s' % (self.name, self.documentation),
+            '# TYPE %s %s' % (self.name, self.kind),
+        ]
+        for key, value in sorted(values.items()):
+            lines.extend(self._samples(_format_labels(self.label_names, key), value))
+        return lines
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Current value of a series in this process"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, labels, value):
+        return ['%s_total%s %s' % (self.name, labels, value)]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Индекс корзины считаем до захвата блокировки
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, **labels):
+        """Number of observations of a series in this process"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _copy(self, value):
+        return [list(value[0]), value[1]]
+
+    def _samples(self, labels, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = '+Inf' if bound == math.inf else repr(bound)
+            lines.append('%s_bucket%s,le="%s"} %d' % (self.name, labels[:-1], le, cumulative))
+        lines.append('%s_sum%s %s' % (self.name, labels, total))
+        lines.append('%s_count%s %d' % (self.name, labels, cumulative))
+        return lines
+
+
+def render():
+    """All registered metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+def address_allowed(address, allowlist):
+    """Whether an IP address is in a comma-separated list of addresses and networks"""
+    try:
+        ip = ipaddress.ip_address(address or '')
+    except ValueError:
+        return False
+    for entry in (allowlist or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            if ip in ipaddress.ip_network(entry, strict=False):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+IMPORT_ROWS = Counter('packaging_import_rows', 'Items imported from files')
+IMPORT_SECONDS = Histogram('packaging_import_seconds', 'Duration of one file import')
+SCAN_SECONDS = Histogram(
+    'packaging_scan_seconds', 'Time from scan to packed item', labels=('source',),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+LABEL_RENDER_SECONDS = Histogram('packaging_label_render_seconds', 'Duration of shipping label rendering')
+LABEL_FAILURES = Counter('packaging_label_failures', 'Shipping labels that failed to render')
+REPORT_SECONDS = Histogram('packaging_report_seconds', 'Duration of defective report generation')
+CLAIM_RETRIES = Counter('packaging_claim_retries', 'Order claims retried after a serialization conflict')
@@ -1,8 +1,23 @@
 from . import packaging_order
 from . import packaging_item
+from . import packaging_carton
 from . import packaging_label
 from . import packaging_defective_wizard
 from . import packaging_order_defective_wizard
 from . import packaging_defective_report
 from . import packaging_defective_report_wizard
-from . import packaging_order_quick_jump_wizard
\ No newline at end of file
+from . import packaging_order_quick_jump_wizard
+from . import packaging_scan_router
+from . import packaging_order_archive
+from . import packaging_order_progress_delta
+from . import ir_websocket
+from . import ir_sequence
+from . import packaging_scan_event
+from . import packaging_scan_log
+from . import packaging_slow_op
+from . import packaging_webhook
+from . import packaging_outbox_event
+from . import packaging_order_state_log
+from . import packaging_productivity_hourly
+from . import packaging_productivity_order
+from . import packaging_export_tombstone
\ No newline at end of file
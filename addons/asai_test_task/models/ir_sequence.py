@@ -0,0 +1,89 @@
+from odoo import models, api, tools
+from odoo.tools import SQL
+from collections import deque
+import itertools
+import threading
+
+# Заранее выделенные номера процесса:
+# (база, id последовательности) -> (поколение, очередь номеров)
+_PREFETCHED = {}
+_PREFETCH_LOCK = threading.Lock()
+_GENERATIONS = itertools.count(1)
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Номера, выданные до перенастройки, больше не действительны во всех
+        # процессах: сброс ormcache рассылается воркерам сигналом реестра
+        self.env.registry.clear_cache()
+        return res
+
+    @api.model
+    @tools.ormcache('sequence_id')
+    def _prefetch_generation(self, sequence_id):
+        """Generation of the prefetched block, renewed when the registry cache is cleared"""
+        return next(_GENERATIONS)
+
+    @api.model
+    def _sequence_by_code(self, sequence_code):
+        """Same lookup as next_by_code"""
+        self.check_access('read')
+        company_id = self.env.company.id
+        return self.search(
+            [('code', '=', sequence_code), ('company_id', 'in', [company_id, False])],
+            order='company_id', limit=1,
+        )
+
+    @api.model
+    def _next_block_by_code(self, sequence_code, count):
+        """Reserve `count` numbers of a sequence in one round trip"""
+        sequence = self._sequence_by_code(sequence_code)
+        if not sequence:
+            return [False] * count
+        if not sequence._is_block_reservable():
+            return [sequence._next() for _i in range(count)]
+        return [sequence.get_next_char(number) for number in sequence._reserve_numbers(count)]
+
+    @api.model
+    def _next_prefetched_by_code(self, sequence_code, count=1, block_size=50):
+        """Take numbers from a per-process block, refilled `block_size` at a time.
+
+        Only for standard sequences: numbers taken by a process that stops
+        are lost, the same way rolled back nextval() numbers are.
+        """
+        sequence = self._sequence_by_code(sequence_code)
+        if not sequence:
+            return [False] * count
+        if not sequence._is_block_reservable():
+            return [sequence._next() for _i in range(count)]
+
+        key = (self.env.cr.dbname, sequence.id)
+        generation = self._prefetch_generation(sequence.id)
+        with _PREFETCH_LOCK:
+            block_generation, numbers = _PREFETCHED.get(key, (None, None))
+            if block_generation != generation:
+                # Последовательность изменена (в любом процессе) - старый блок выбрасываем
+                numbers = deque()
+                _PREFETCHED[key] = (generation, numbers)
+            if len(numbers) < count:
+                numbers.extend(sequence._reserve_numbers(count - len(numbers) + block_size))
+            taken = [numbers.popleft() for _i in range(count)]
+        return [sequence.get_next_char(number) for number in taken]
+
+    def _is_block_reservable(self):
+        self.ensure_one()
+        return self.implementation == 'standard' and not self.use_date_range
+
+    def _reserve_numbers(self, count):
+        """Raw next numbers of a standard sequence in one query"""
+        self.ensure_one()
+        if count <= 0:
+            return []
+        self.env.cr.execute(SQL(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            'ir_sequence_%03d' % self.id, count,
+        ))
+        return [row[0] for row in self.env.cr.fetchall()]
@@ -0,0 +1,18 @@
+from odoo import models
+
+from .packaging_order import LIVE_LIST_CHANNEL, LIVE_ORDER_CHANNEL, LIVE_STATION_CHANNEL
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        # Каналы упаковки доступны только внутренним пользователям
+        if not self.env.user._is_internal():
+            channels = [
+                channel for channel in channels
+                if not (isinstance(channel, str) and channel.startswith(
+                    (LIVE_LIST_CHANNEL, LIVE_ORDER_CHANNEL, LIVE_STATION_CHANNEL)
+                ))
+            ]
+        return super()._build_bus_channel_list(channels)
@@ -0,0 +1,51 @@
+from odoo import models, fields, api
+
+
+class PackagingCarton(models.Model):
+    _name = 'packaging.carton'
+    _description = 'Carton Type'
+    _order = 'sequence, volume, id'
+
+    name = fields.Char(string='Carton', required=True)
+    sequence = fields.Integer(string='Sequence', default=10)
+    active = fields.Boolean(string='Active', default=True)
+    length = fields.Float(string='Length (cm)', required=True)
+    width = fields.Float(string='Width (cm)', required=True)
+    height = fields.Float(string='Height (cm)', required=True)
+    volume = fields.Float(string='Volume (cm³)', compute='_compute_volume', store=True)
+    cost = fields.Float(string='Cost', help="Used to pick the cheapest carton; volume is used when empty")
+
+    _sql_constraints = [
+        ('dimensions_positive', 'CHECK(length > 0 AND width > 0 AND height > 0)',
+         'Carton dimensions must be positive!'),
+    ]
+
+    @api.depends('length', 'width', 'height')
+    def _compute_volume(self):
+        for carton in self:
+            carton.volume = carton.length * carton.width * carton.height
+
+    @api.model
+    def _catalog(self):
+        """Active cartons in the form expected by cartonization.pack_items"""
+        return [
+            (carton.id, carton.length, carton.width, carton.height, carton.cost)
+            for carton in self.search([])
+        ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        cartons = super().create(vals_list)
+        self.env['packaging.order']._refresh_carton_plans()
+        return cartons
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'length', 'width', 'height', 'cost', 'active'} & vals.keys():
+            self.env['packaging.order']._refresh_carton_plans()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['packaging.order']._refresh_carton_plans()
+        return res
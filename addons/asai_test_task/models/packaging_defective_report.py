@@ -1,6 +1,10 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 from datetime import datetime, timedelta
+import time
+
+from .. import metrics
+from .. import tracing
 
 class PackagingDefectiveReport(models.TransientModel):
     _name = 'packaging.defective.report'
@@ -11,9 +15,11 @@ class PackagingDefectiveReport(models.TransientModel):
     responsible_id = fields.Many2one('res.users', string='Responsible')
     show_details = fields.Boolean(string='Show Item Details', default=True)
 
+    @tracing.traced()
     def action_generate_report(self):
         """Generate defective orders report"""
         self.ensure_one()
+        start = time.perf_counter()
         
         domain = [
             ('state', '=', 'defective'),
@@ -65,6 +71,8 @@ class PackagingDefectiveReport(models.TransientModel):
             'show_details': self.show_details
         })
         
+        metrics.REPORT_SECONDS.observe(time.perf_counter() - start)
+        
         # Открываем wizard
         return {
             'type': 'ir.actions.act_window',
@@ -21,6 +21,7 @@ class PackagingItemDefectiveWizard(models.TransientModel):
         
         if not self.defective_reason:
             raise UserError("Please provide a reason for marking this item as defective!")
+        self.item_id._check_reset_pending()
         
         # Помечаем товар как бракованный
         self.item_id.write({
@@ -0,0 +1,46 @@
+from odoo import models, fields, api, tools
+from odoo.tools import SQL
+from datetime import timedelta
+
+# Клиент выгрузки должен забирать удаления чаще, чем раз в N дней
+TOMBSTONE_KEEP_DAYS = 30
+
+
+class PackagingExportTombstone(models.Model):
+    """Ids of deleted orders and items for the incremental export.
+
+    Deleted rows cannot show up in a (write_date, id) page of their table;
+    the export serves these rows instead, in the same keyset order.
+    """
+    _name = 'packaging.export.tombstone'
+    _description = 'Deleted Record for Export'
+    _order = 'write_date, id'
+
+    res_model = fields.Selection([
+        ('packaging.order', 'Order'),
+        ('packaging.item', 'Item'),
+    ], string='Model', required=True, readonly=True)
+    res_id = fields.Integer(string='Record ID', required=True, readonly=True)
+
+    def init(self):
+        tools.create_index(
+            self._cr, 'packaging_export_tombstone_write_date_id_index',
+            self._table, ['write_date', 'id'],
+        )
+
+    @api.model
+    def _record(self, model_name, ids):
+        """Remember deleted ids with one INSERT"""
+        if not ids:
+            return
+        self.env.cr.execute(SQL("""
+            INSERT INTO packaging_export_tombstone (res_model, res_id, create_uid, create_date, write_uid, write_date)
+            SELECT %s, res_id, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC'
+              FROM unnest(%s::int[]) AS res_id
+        """, model_name, self.env.uid, self.env.uid, list(ids)))
+
+    @api.autovacuum
+    def _gc_tombstones(self):
+        """Drop tombstones older than TOMBSTONE_KEEP_DAYS"""
+        limit_date = fields.Datetime.now() - timedelta(days=TOMBSTONE_KEEP_DAYS)
+        self.search([('write_date', '<', limit_date)]).unlink()
@@ -1,14 +1,50 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError
+import re
+
+from .. import tracing
+
+PROGRESS_FIELDS = {'is_packed', 'is_defective'}
+
+# "10x10x5 cm", "30 x 5 x 1", "2.5*4*1,5 in"; без единицы - сантиметры
+DIMENSIONS_RE = re.compile(
+    r'^\s*(\d+(?:[.,]\d+)?)\s*[x×*]\s*(\d+(?:[.,]\d+)?)\s*[x×*]\s*(\d+(?:[.,]\d+)?)\s*(mm|cm|m|in)?\s*$',
+    re.IGNORECASE,
+)
+DIMENSION_UNITS = [('mm', 'mm'), ('cm', 'cm'), ('m', 'm'), ('in', 'in')]
+UNIT_TO_CM = {'mm': 0.1, 'cm': 1.0, 'm': 100.0, 'in': 2.54}
+
+
+def parse_dimensions(values):
+    """Parse a batch of dimension strings into (length, width, height, unit).
+
+    Each distinct string is parsed once; unparsable values give (0, 0, 0, False).
+    """
+    parsed = {}
+    for value in set(values):
+        match = DIMENSIONS_RE.match(value or '')
+        if match:
+            length, width, height = (float(number.replace(',', '.')) for number in match.groups()[:3])
+            parsed[value] = (length, width, height, (match.group(4) or 'cm').lower())
+        else:
+            parsed[value] = (0.0, 0.0, 0.0, False)
+    return [parsed[value] for value in values]
+
 
 class PackagingItem(models.Model):
     _name = 'packaging.item'
     _description = 'Packaging Item'
     _rec_name = 'item_code'
 
-    order_id = fields.Many2one('packaging.order', string='Order', required=True, ondelete='cascade')
+    order_id = fields.Many2one('packaging.order', string='Order', required=True, ondelete='cascade', index=True)
     product_name = fields.Char(string='Product Name', required=True)
     dimensions = fields.Char(string='Dimensions')
-    item_code = fields.Char(string='Item ID', required=True)
+    dim_length = fields.Float(string='Length', compute='_compute_dimension_values', store=True)
+    dim_width = fields.Float(string='Width', compute='_compute_dimension_values', store=True)
+    dim_height = fields.Float(string='Height', compute='_compute_dimension_values', store=True)
+    dim_unit = fields.Selection(DIMENSION_UNITS, string='Unit', compute='_compute_dimension_values', store=True)
+    volume = fields.Float(string='Volume (cm³)', compute='_compute_dimension_values', store=True)
+    item_code = fields.Char(string='Item ID', required=True, index=True)
     is_packed = fields.Boolean(string='Packed', default=False)
     pack_date = fields.Datetime(string='Pack Date')
     
@@ -18,22 +54,121 @@ class PackagingItem(models.Model):
     defective_date = fields.Datetime(string='Defective Date')
     defective_operator_id = fields.Many2one('res.users', string='Reported By', default=lambda self: self.env.user)
 
+    @api.depends('dimensions')
+    def _compute_dimension_values(self):
+        # Разбираем все строки пачки за один проход (импорт CSV создает товары одним create)
+        for item, (length, width, height, unit) in zip(self, parse_dimensions(self.mapped('dimensions'))):
+            factor = UNIT_TO_CM.get(unit, 1.0)
+            item.dim_length = length
+            item.dim_width = width
+            item.dim_height = height
+            item.dim_unit = unit
+            item.volume = length * width * height * factor ** 3
+
+    def init(self):
+        # Поиск товара по коду внутри заказа (quick pack, сканер)
+        tools.create_index(
+            self._cr, 'packaging_item_order_id_item_code_index',
+            self._table, ['order_id', 'item_code'],
+        )
+        # Инкрементальная выгрузка: диапазон по (write_date, id)
+        tools.create_index(
+            self._cr, 'packaging_item_write_date_id_index',
+            self._table, ['write_date', 'id'],
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        items = super().create(vals_list)
+        folded = items._record_progress_deltas({})
+        # Без дельты счетчиков изменился только total_items - статус сверяем отдельно
+        (items.order_id - folded)._update_progress_state()
+        return items
+
+    def write(self, vals):
+        if not PROGRESS_FIELDS & vals.keys():
+            return super().write(vals)
+        before = self._progress_snapshot()
+        res = super().write(vals)
+        self._record_progress_deltas(before)
+        return res
+
+    def unlink(self):
+        deltas = self._progress_deltas(self._progress_snapshot(), removed=True)
+        orders = self.order_id
+        self.env['packaging.export.tombstone']._record('packaging.item', self.ids)
+        res = super().unlink()
+        # Заказ мог быть удален вместе с товарами
+        remaining = orders.exists()
+        deltas = {order_id: delta for order_id, delta in deltas.items() if order_id in remaining.ids}
+        folded = self.env['packaging.order.progress.delta']._record(deltas)
+        folded._fold_progress_deltas()
+        (remaining - folded)._update_progress_state()
+        return res
+
+    def _progress_snapshot(self):
+        return {item.id: (item.is_packed, item.is_defective) for item in self}
+
+    def _progress_deltas(self, before, removed=False):
+        """Return {order_id: (packed_delta, defective_delta)} against `before`"""
+        deltas = {}
+        for item in self:
+            was_packed, was_defective = before.get(item.id, (False, False))
+            is_packed, is_defective = (False, False) if removed else (item.is_packed, item.is_defective)
+            packed, defective = deltas.get(item.order_id.id, (0, 0))
+            deltas[item.order_id.id] = (
+                packed + int(is_packed) - int(was_packed),
+                defective + int(is_defective) - int(was_defective),
+            )
+        return deltas
+
+    @tracing.traced()
+    def _record_progress_deltas(self, before):
+        """Record counter changes of orders as deltas and try to fold them, return those orders"""
+        self._log_scan_events(before)
+        deltas = self._progress_deltas(before)
+        orders = self.env['packaging.order.progress.delta']._record(deltas)
+        orders._fold_progress_deltas()
+        return orders
+
+    def _log_scan_events(self, before):
+        """Append pack/unpack/defect transitions to the scan log"""
+        events = []
+        for item in self:
+            was_packed, was_defective = before.get(item.id, (False, False))
+            if item.is_packed != was_packed:
+                # Время упаковки, а не записи: офлайн-скан приходит с временем устройства
+                events.append(('pack' if item.is_packed else 'unpack', item.order_id.id, item.id, item.pack_date))
+            if item.is_defective != was_defective:
+                events.append(('defect' if item.is_defective else 'defect_clear', item.order_id.id, item.id))
+        self.env['packaging.scan.log']._log_events(events)
+
+    def _check_reset_pending(self):
+        """Refuse item changes while a queued packing reset of the order runs"""
+        # Фоновый сброс перезапишет товары и вернет заказ в draft
+        resetting = self.order_id.filtered('reset_pending')
+        if resetting:
+            raise UserError(_("Packing reset of order %s is in progress, please wait")
+                            % ', '.join(resetting.mapped('name')))
+
+    @tracing.traced()
     def action_mark_as_packed(self):
+        self._check_reset_pending()
         self.write({
             'is_packed': True,
             'pack_date': fields.Datetime.now()
         })
 
     def action_mark_as_unpacked(self):
+        self._check_reset_pending()
         self.write({
             'is_packed': False,
             'pack_date': False
         })
     
     def action_mark_defective_simple(self):
-        """Simple method to mark item as defective"""
-        self.ensure_one()
-        
+        """Simple method to mark items as defective"""
+        self._check_reset_pending()
         self.write({
             'is_defective': True,
             'defective_reason': 'Marked as defective by operator',
@@ -41,15 +176,13 @@ class PackagingItem(models.Model):
             'defective_operator_id': self.env.user.id
         })
         
-        # Принудительно обновляем статус заказа
-        self.order_id._compute_packed_items()
-        
+        # Статус заказов обновляется свёрткой дельт в write()
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
                 'title': _("Item Marked as Defective"),
-                'message': _("Item %s has been marked as defective. Order status updated.") % self.item_code,
+                'message': _("%d item(s) marked as defective. Order status updated.") % len(self),
                 'type': 'warning',
                 'sticky': False,
             }
@@ -6,15 +6,22 @@ from io import BytesIO
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 import re
+import time
+
+from .. import metrics
+from .. import tracing
 
 _logger = logging.getLogger(__name__)
 
+LABEL_NUMBER_RE = re.compile(r'^L\d+$')
+LABEL_NUMBER_BLOCK = 50
+
 class PackagingLabel(models.Model):
     _name = 'packaging.label'
     _description = 'Packaging Label'
     _order = 'create_date desc'
 
-    name = fields.Char(string='Label Number', required=True, default='New')
+    name = fields.Char(string='Label Number', required=True, default='New', index=True)
     order_id = fields.Many2one(
         'packaging.order', 
         string='Order', 
@@ -26,36 +33,40 @@ class PackagingLabel(models.Model):
     print_date = fields.Datetime(string='Print Date', default=fields.Datetime.now)
     printed = fields.Boolean(string='Printed', default=False)
 
-    @api.model
-    def create(self, vals):
-        if vals.get('name', 'New') == 'New':
-            # Используем последовательность вместо ручной генерации
-            vals['name'] = self.env['ir.sequence'].next_by_code('packaging.label') or 'New'
-        
-        # Проверяем формат номера перед созданием
-        if not re.match(r'^L\d+$', vals['name']):
-            raise ValidationError(_("Label number must be in format L000001!"))
-        
-        if not vals.get('order_id'):
+    @api.model_create_multi
+    def create(self, vals_list):
+        if any(not vals.get('order_id') for vals in vals_list):
             raise UserError(_("Order ID is required for creating a label!"))
+
+        unnamed = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        if unnamed:
+            # Номера берутся из заранее выделенного блока процесса; формат проверяет _check_label_number
+            names = self.env['ir.sequence']._next_prefetched_by_code(
+                'packaging.label', len(unnamed), block_size=LABEL_NUMBER_BLOCK
+            )
+            for vals, name in zip(unnamed, names):
+                vals['name'] = name or 'New'
         
-        # Создаем запись
-        label = super(PackagingLabel, self).create(vals)
+        # Создаем записи
+        labels = super(PackagingLabel, self).create(vals_list)
         
         # Генерируем PDF после создания
-        label._generate_pdf_label()
+        for label in labels:
+            label._generate_pdf_label()
             
-        return label
+        return labels
     
     @api.constrains('name')
     def _check_label_number(self):
         """Validate that label number is in correct format"""
         for label in self:
-            if not re.match(r'^L\d+$', label.name):
+            if not LABEL_NUMBER_RE.match(label.name):
                 raise ValidationError(_("Label number must be in format L000001!"))
 
+    @tracing.traced()
     def _generate_pdf_label(self):
         """Generate PDF content for shipping label"""
+        start = time.perf_counter()
         try:
             # Создаем PDF в памяти
             buffer = BytesIO()
@@ -70,6 +81,8 @@ class PackagingLabel(models.Model):
             pdf.drawString(100, 700, f"Order Number: {self.order_id.name}")
             pdf.drawString(100, 675, f"Label Number: {self.name}")
             pdf.drawString(100, 650, f"Created: {self.create_date}")
+            if self.order_id.carton_summary:
+                pdf.drawString(100, 625, f"Cartons: {self.order_id.carton_summary}")
             
             # Информация о товарах
             pdf.drawString(100, 600, "Items in order:")
@@ -94,8 +107,10 @@ class PackagingLabel(models.Model):
                 'label_data': base64.b64encode(pdf_content),
                 'label_filename': f'shipping_label_{self.name}.pdf'
             })
+            metrics.LABEL_RENDER_SECONDS.observe(time.perf_counter() - start)
             
         except Exception as e:
+            metrics.LABEL_FAILURES.inc()
             _logger.error("Error generating PDF label: %s", str(e))
             raise UserError(f"Error generating PDF: {str(e)}")
 
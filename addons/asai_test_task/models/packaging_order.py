@@ -1,16 +1,71 @@
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 import base64
-import csv
-import io
+import itertools
+import json
 import logging
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from psycopg2.errors import SerializationFailure, UniqueViolation
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL, mute_logger
+from .. import cartonization
+from .. import importers
+from .. import metrics
+from .. import tracing
+from ..savepoints import buffered_savepoint
+from .packaging_item import UNIT_TO_CM
+from .packaging_outbox_event import OUTBOX_STATES
 
 _logger = logging.getLogger(__name__)
 
+# Больше заказов за раз - этикетки печатаются очередью (cron), а не в запросе оператора
+LABEL_INLINE_LIMIT = 20
+# Заказы, завершенные упаковкой за транзакцию: этикетки обрабатываются одним набором
+COMPLETED_PRECOMMIT_KEY = 'asai_test_task.completed_order_ids'
+LABEL_QUEUE_BATCH_SIZE = 200
+RESET_CHUNK_SIZE = 1000
+# Больше заказов за раз - коробки подбираются очередью (cron) по пачкам
+CARTON_CHUNK_SIZE = 200
+# Очередь коробок разбирают параллельно несколько cron-задач, каждая - свою долю id
+CARTON_QUEUE_CRONS = (
+    'asai_test_task.ir_cron_packaging_carton_queue',
+    'asai_test_task.ir_cron_packaging_carton_queue_2',
+    'asai_test_task.ir_cron_packaging_carton_queue_3',
+    'asai_test_task.ir_cron_packaging_carton_queue_4',
+)
+IMPORT_BATCH_SIZE = 5000
+CARTON_FIELDS = ('carton_plan', 'carton_summary', 'carton_count', 'carton_cost')
+
+# Очередь раздачи заказов: захват FOR UPDATE SKIP LOCKED, захват истекает через N минут
+CLAIM_TIMEOUT_PARAM = 'asai_test_task.claim_timeout_minutes'
+CLAIM_TIMEOUT_DEFAULT = 30
+CLAIM_MAX_PARAM = 'asai_test_task.max_claims_per_operator'
+CLAIM_MAX_DEFAULT = 1
+# Захват - своя короткая транзакция; конфликт снимка повторяется с новым снимком
+CLAIM_ATTEMPTS = 5
+CLAIM_FIELDS = ['claimed_by_id', 'responsible_id', 'claim_date', 'claim_expires']
+
+# Прием заказов из ERP: один запрос - одна транзакция
+INTAKE_BATCH_LIMIT = 5000
+
+# Живой прогресс через bus: каналы списка, заказа и станции (ответственного)
+LIVE_FIELDS = {'state', 'packed_items', 'defective_items', 'total_items', 'last_label_id'}
+LIVE_NOTIFICATION = 'packaging.progress'
+LIVE_LIST_CHANNEL = 'packaging_order_list'
+LIVE_ORDER_CHANNEL = 'packaging_order_'
+LIVE_STATION_CHANNEL = 'packaging_station_'
+LIVE_PRECOMMIT_KEY = 'asai_test_task.live_order_ids'
+
 class PackagingOrder(models.Model):
     _name = 'packaging.order'
     _description = 'Packaging Order'
-    _order = 'create_date desc'
+    _order = 'create_date desc, id desc'
+
+    _sql_constraints = [
+        ('name_unique', 'unique(name)', 'Order number must be unique!'),
+        ('intake_key_unique', 'unique(intake_key)', 'Intake key must be unique!'),
+    ]
 
     # ========== FIELDS ==========
     name = fields.Char(
@@ -33,6 +88,18 @@ class PackagingOrder(models.Model):
         ('canceled', 'Canceled'),
         ('defective', 'Defective'),
     ], string='Status', default='draft', tracking=True)
+    priority = fields.Selection([
+        ('0', 'Normal'),
+        ('1', 'High'),
+        ('2', 'Urgent'),
+    ], string='Priority', default='0', required=True)
+    claimed_by_id = fields.Many2one('res.users', string='Claimed By', index=True, readonly=True, copy=False)
+    claim_date = fields.Datetime(string='Claimed At', readonly=True, copy=False)
+    claim_expires = fields.Datetime(string='Claim Expires', readonly=True, copy=False)
+    intake_key = fields.Char(string='Intake Key', readonly=True, copy=False,
+                             help='Idempotency key of the order received from the ERP')
+    closed_date = fields.Datetime(string='Closed Date', index=True, readonly=True, copy=False,
+                                  help='When the order was completed or canceled')
 
 
     defective_reason = fields.Text(string='Defective Reason', help='Reason why the order cannot be completed')
@@ -77,23 +144,51 @@ class PackagingOrder(models.Model):
         compute='_compute_total_items',
         store=True
     )
+    # Счетчики обновляются свёрткой дельт (packaging.order.progress.delta),
+    # чтобы параллельные сканы одного заказа не блокировали строку заказа
     packed_items = fields.Integer(
         string='Packed Items', 
-        compute='_compute_packed_items',
-        store=True
+        readonly=True,
+        default=0
     )
     progress = fields.Float(
         string='Progress (%)', 
-        compute='_compute_progress'
+        compute='_compute_progress',
+        store=True,
+        index=True
     )
+    # Темп упаковки из свёрток журнала (packaging.productivity.order)
+    pack_rate = fields.Float(string='Items per Hour', digits=(16, 1), compute='_compute_pack_pace')
+    pack_eta = fields.Datetime(string='Completion ETA', compute='_compute_pack_pace',
+                               help='When the order will be packed at its recent pace')
 
 
     defective_items = fields.Integer(
     string='Defective Items',
-    compute='_compute_packed_items', 
-    store=True
+    readonly=True,
+    default=0
     )
 
+    # Объем заказа для планирования (фильтры и сортировка в базе)
+    total_volume = fields.Float(
+        string='Total Volume (cm³)',
+        compute='_compute_volume',
+        store=True,
+        index=True
+    )
+    max_item_volume = fields.Float(
+        string='Largest Item (cm³)',
+        compute='_compute_volume',
+        store=True,
+        index=True
+    )
+
+    # Рекомендация коробок (cartonization.pack_items по каталогу packaging.carton)
+    carton_plan = fields.Text(string='Carton Plan (JSON)', compute='_compute_carton_plan', store=True)
+    carton_summary = fields.Char(string='Recommended Cartons', compute='_compute_carton_plan', store=True)
+    carton_count = fields.Integer(string='Cartons', compute='_compute_carton_plan', store=True)
+    carton_cost = fields.Float(string='Carton Cost', compute='_compute_carton_plan', store=True)
+
     # Labels configuration
     last_label_id = fields.Many2one(
         'packaging.label', 
@@ -103,6 +198,24 @@ class PackagingOrder(models.Model):
         string='Auto-print Labels', 
         default=True
     )
+    label_pending = fields.Boolean(
+        string='Label Pending',
+        index=True,
+        copy=False,
+        help='Label generation is queued after mass completion'
+    )
+    carton_pending = fields.Boolean(
+        string='Carton Plan Pending',
+        index=True,
+        copy=False,
+        help='Carton planning of the order is queued after a batch request'
+    )
+    reset_pending = fields.Boolean(
+        string='Reset Pending',
+        index=True,
+        copy=False,
+        help='Packing reset of a large order is running in background'
+    )
 
     show_mark_defective = fields.Boolean(  
     compute='_compute_button_visibility',
@@ -124,6 +237,206 @@ class PackagingOrder(models.Model):
             order.total_items = len(order.item_ids)
 
 
+    @api.depends('item_ids.volume')
+    def _compute_volume(self):
+        for order in self:
+            volumes = order.item_ids.mapped('volume')
+            order.total_volume = sum(volumes)
+            order.max_item_volume = max(volumes, default=0.0)
+
+    @api.depends('item_ids.dim_length', 'item_ids.dim_width', 'item_ids.dim_height', 'item_ids.dim_unit')
+    def _compute_carton_plan(self):
+        Carton = self.env['packaging.carton'].sudo()
+        catalog = Carton._catalog()
+        names = {carton.id: carton.name for carton in Carton.browse([carton[0] for carton in catalog])}
+        for order in self:
+            plan = cartonization.pack_items(order._carton_items(), catalog)
+            order.update(order._carton_plan_vals(plan, names))
+
+    def _carton_items(self):
+        """Item sizes in centimetres for cartonization.pack_items"""
+        self.ensure_one()
+        items = []
+        for item in self.item_ids:
+            if item.volume:
+                factor = UNIT_TO_CM.get(item.dim_unit, 1.0)
+                items.append((item.id, item.dim_length * factor, item.dim_width * factor, item.dim_height * factor))
+        return items
+
+    @api.model
+    def _carton_plan_vals(self, plan, names):
+        """Stored field values of a pack_items result"""
+        if not plan['cartons'] and not plan['unpacked']:
+            return {'carton_plan': False, 'carton_summary': False, 'carton_count': 0, 'carton_cost': 0.0}
+        counts = {}
+        for carton in plan['cartons']:
+            counts[carton['carton_id']] = counts.get(carton['carton_id'], 0) + 1
+        parts = ['%d × %s' % (count, names.get(carton_id, carton_id)) for carton_id, count in counts.items()]
+        if plan['unpacked']:
+            parts.append(_('%d item(s) do not fit any carton') % len(plan['unpacked']))
+        return {
+            'carton_plan': json.dumps(plan),
+            'carton_summary': ', '.join(parts),
+            'carton_count': len(plan['cartons']),
+            'carton_cost': plan['cost'],
+        }
+
+    @api.model
+    def _refresh_carton_plans(self):
+        """Queue plans of open orders for recompute after a catalog change"""
+        # Правка каталога не ждет пересчета всех открытых заказов: их считает cron
+        orders = self.search([('state', 'in', ['draft', 'in_progress']), ('total_items', '>', 0)])
+        if orders:
+            orders.write({'carton_pending': True})
+            self._trigger_carton_queue()
+
+    def action_batch_cartonize(self):
+        """Plan cartons for the selected orders and show the material forecast"""
+        if len(self) > CARTON_CHUNK_SIZE:
+            # Большой выбор не держит запрос оператора: пачки считает cron
+            self.write({'carton_pending': True})
+            self._trigger_carton_queue()
+            return self._show_notification(
+                _("Cartons Queued"),
+                _("Carton plans of %d orders will be computed in background.") % len(self),
+                'info'
+            )
+        report = self._batch_cartonize()
+        forecast = ', '.join('%d × %s' % (count, name) for name, count in report['forecast'].items())
+        return self._show_notification(
+            _("Cartons Planned"),
+            _("%d orders in %.1f s (%.0f orders/s). Forecast: %s") % (
+                report['orders'], report['seconds'], report['orders_per_s'], forecast or _('nothing to pack')
+            ),
+            'success'
+        )
+
+    @api.model
+    def _trigger_carton_queue(self):
+        """Wake up every carton queue worker cron"""
+        for xmlid in CARTON_QUEUE_CRONS:
+            self.env.ref(xmlid)._trigger()
+
+    @api.model
+    def _cron_process_carton_queue(self, chunk_size=CARTON_CHUNK_SIZE, auto_commit=True, worker=0, workers=1):
+        """Compute carton plans of queued orders, chunk by chunk.
+
+        Worker crons split the queue by order id modulo workers: they run in
+        parallel cron processes and never touch the same rows.
+        """
+        start = time.perf_counter()
+        processed = 0
+        while True:
+            self.flush_model(['carton_pending'])
+            self.env.cr.execute("""
+                SELECT id FROM packaging_order
+                 WHERE carton_pending AND id %% %s = %s
+              ORDER BY id
+                 LIMIT %s
+            """, (workers, worker, chunk_size))
+            orders = self.browse([row[0] for row in self.env.cr.fetchall()])
+            if not orders:
+                break
+            orders._batch_cartonize(chunk_size=chunk_size)
+            orders.write({'carton_pending': False})
+            processed += len(orders)
+            if auto_commit:
+                self.env.cr.commit()
+        if processed:
+            seconds = time.perf_counter() - start
+            _logger.info(
+                "Carton queue worker %d/%d: %d orders in %.2fs (%.1f orders/s)",
+                worker + 1, workers, processed, seconds, processed / seconds if seconds else 0.0,
+            )
+        return processed
+
+    def _batch_cartonize(self, chunk_size=CARTON_CHUNK_SIZE):
+        """Compute carton plans of many orders in chunks and store them in bulk.
+
+        Returns {'orders', 'items', 'seconds', 'orders_per_s', 'forecast': {carton: count}}.
+        """
+        start = time.perf_counter()
+        report = {'orders': len(self), 'items': 0, 'seconds': 0.0, 'orders_per_s': 0.0, 'forecast': {}}
+        if not self:
+            return report
+
+        Carton = self.env['packaging.carton'].sudo()
+        catalog = Carton._catalog()
+        names = {carton.id: carton.name for carton in Carton.browse([carton[0] for carton in catalog])}
+        self.env['packaging.item'].flush_model(['order_id', 'dim_length', 'dim_width', 'dim_height', 'dim_unit', 'volume'])
+        forecast = Counter()
+        order_ids = sorted(self.ids)
+        for index in range(0, len(order_ids), chunk_size):
+            chunk_ids = order_ids[index:index + chunk_size]
+            # Размеры пачки одним запросом, в эвристику уходят только числа
+            self.env.cr.execute("""
+                SELECT order_id, id, dim_length, dim_width, dim_height, dim_unit
+                  FROM packaging_item
+                 WHERE order_id IN %s AND volume > 0
+              ORDER BY order_id, id
+            """, (tuple(chunk_ids),))
+            items = defaultdict(list)
+            for order_id, item_id, length, width, height, unit in self.env.cr.fetchall():
+                factor = UNIT_TO_CM.get(unit, 1.0)
+                items[order_id].append((item_id, length * factor, width * factor, height * factor))
+            result = cartonization.pack_orders([(order_id, items[order_id]) for order_id in chunk_ids], catalog)
+            values = {}
+            for order_id, plan in result['plans'].items():
+                values[order_id] = self._carton_plan_vals(plan, names)
+                forecast.update(names.get(carton['carton_id']) for carton in plan['cartons'])
+            self._write_carton_plans(values)
+            report['items'] += result['items']
+
+        seconds = time.perf_counter() - start
+        report.update({
+            'seconds': seconds,
+            'orders_per_s': round(len(order_ids) / seconds, 1) if seconds else 0.0,
+            'forecast': dict(forecast.most_common()),
+        })
+        _logger.info(
+            "Carton plans of %d orders (%d items) computed in %.2fs",
+            report['orders'], report['items'], report['seconds'],
+        )
+        return report
+
+    @api.model
+    def _write_carton_plans(self, values, batch_size=1000):
+        """Store {order_id: carton field values} with one UPDATE per batch"""
+        order_ids = list(values)
+        orders = self.browse(order_ids)
+        # Отложенный пересчет этих заказов перезаписал бы готовый план
+        for field_name in CARTON_FIELDS:
+            self.env.remove_to_compute(self._fields[field_name], orders)
+        for index in range(0, len(order_ids), batch_size):
+            rows = SQL(", ").join(
+                SQL(
+                    "(%s::int, %s::text, %s::varchar, %s::int, %s::float8)",
+                    order_id, values[order_id]['carton_plan'] or None, values[order_id]['carton_summary'] or None,
+                    values[order_id]['carton_count'], values[order_id]['carton_cost'],
+                )
+                for order_id in order_ids[index:index + batch_size]
+            )
+            self.env.cr.execute(SQL("""
+                UPDATE packaging_order o
+                   SET carton_plan = v.plan, carton_summary = v.summary,
+                       carton_count = v.count, carton_cost = v.cost,
+                       write_uid = %s, write_date = (now() at time zone 'UTC')
+                  FROM (VALUES %s) AS v(id, plan, summary, count, cost)
+                 WHERE o.id = v.id
+            """, self.env.uid, rows))
+        # write_date - чтобы инкрементальная выгрузка увидела новый план
+        orders.invalidate_recordset(list(CARTON_FIELDS) + ['write_uid', 'write_date'])
+
+    def _compute_pack_pace(self):
+        paces = {
+            pace.order_id.id: pace
+            for pace in self.env['packaging.productivity.order'].sudo().search([('order_id', 'in', self.ids)])
+        }
+        for order in self:
+            pace = paces.get(order.id)
+            order.pack_rate = pace.rate_per_hour if pace else 0.0
+            order.pack_eta = pace.eta if pace and order.state in ('draft', 'in_progress') else False
+
     @api.depends('total_items', 'packed_items')
     def _compute_progress(self):
         for order in self:
@@ -143,13 +456,73 @@ class PackagingOrder(models.Model):
             order.show_reset_packing = order.state in ['in_progress', 'defective']
 
 
-    @api.depends('item_ids.is_packed', 'item_ids.is_defective')
+    @tracing.traced()
     def _compute_packed_items(self):
+        """Recount packed/defective items from scratch and update state"""
+        if not self.ids:
+            return
+        # Как и свёртка, держим строки заказов: иначе параллельная свёртка
+        # применит те же дельты поверх нашего пересчета. Порядок по id - без взаимоблокировок
+        self.env.cr.execute(
+            "SELECT id FROM packaging_order WHERE id IN %s ORDER BY id FOR NO KEY UPDATE",
+            (tuple(self.ids),)
+        )
+        self.env['packaging.item'].flush_model(['order_id', 'is_packed', 'is_defective'])
+        self.env.cr.execute("""
+            SELECT order_id,
+                   count(*) FILTER (WHERE is_packed),
+                   count(*) FILTER (WHERE is_defective)
+              FROM packaging_item
+             WHERE order_id IN %s
+          GROUP BY order_id
+        """, (tuple(self.ids),))
+        counts = {order_id: (packed, defective) for order_id, packed, defective in self.env.cr.fetchall()}
+        # Пересчет покрывает все видимые дельты - удаляем их
+        self.env['packaging.order.progress.delta']._consume(self)
+        for order in self:
+            packed_count, defective_count = counts.get(order.id, (0, 0))
+            order.write({'packed_items': packed_count, 'defective_items': defective_count})
+            order._update_progress_state()
+
+    @tracing.traced()
+    def _fold_progress_deltas(self):
+        """Apply pending counter deltas without waiting on busy order rows"""
+        Delta = self.env['packaging.order.progress.delta']
         for order in self:
-            packed_count = len(order.item_ids.filtered(lambda x: x.is_packed))
-            defective_count = len(order.item_ids.filtered(lambda x: x.is_defective))
-            order.packed_items = packed_count
-            order.defective_items = defective_count
+            try:
+                with buffered_savepoint(self.env):
+                    # Строку заказа держит другой упаковщик - его свёртка или cron учтут дельту
+                    self.env.cr.execute(
+                        "SELECT id FROM packaging_order WHERE id = %s FOR NO KEY UPDATE SKIP LOCKED",
+                        (order.id,)
+                    )
+                    if not self.env.cr.fetchone():
+                        continue
+                    packed_delta, defective_delta = Delta._consume(order)
+                    if packed_delta or defective_delta:
+                        order.write({
+                            'packed_items': order.packed_items + packed_delta,
+                            'defective_items': order.defective_items + defective_delta,
+                        })
+                    order._update_progress_state()
+            except SerializationFailure:
+                # Заказ изменен параллельной транзакцией после нашего снимка
+                _logger.debug("Progress fold of order %s postponed", order.id)
+
+    @api.model
+    def _cron_fold_progress_deltas(self):
+        """Fold counter deltas left by concurrent scans"""
+        self.env.cr.execute("SELECT DISTINCT order_id FROM packaging_order_progress_delta")
+        orders = self.browse([row[0] for row in self.env.cr.fetchall()])
+        orders._fold_progress_deltas()
+        return len(orders)
+
+    @tracing.traced()
+    def _update_progress_state(self):
+        """Move order state according to packed/defective counters"""
+        for order in self.with_context(state_trigger='progress'):
+            packed_count = order.packed_items
+            defective_count = order.defective_items
             
             # Автоматическое обновление состояния только для сохраненных записей
             if order.id and order.state not in ['canceled', 'defective']:
@@ -163,9 +536,9 @@ class PackagingOrder(models.Model):
                         })
                 elif packed_count == order.total_items and order.total_items > 0:
                     if order.state != 'completed':
-                        # Используем write для изменения состояния и затем вызываем обработчик
+                        # Этикетки - одним набором на транзакцию: массовое завершение уйдет в очередь
                         order.write({'state': 'completed'})
-                        order._handle_completed_order()  # Явно вызываем обработчик
+                        order._queue_completed_order()
                 elif packed_count > 0:
                     if order.state != 'in_progress':
                         order.state = 'in_progress'
@@ -174,12 +547,133 @@ class PackagingOrder(models.Model):
                         order.state = 'draft'
 
     # ========== CRUD METHODS ==========
+    def init(self):
+        # Индекс под сортировку списка по умолчанию (_order)
+        tools.create_index(
+            self._cr, 'packaging_order_create_date_id_index',
+            self._table, ['create_date DESC', 'id DESC'],
+        )
+        # Выборка очереди раздачи: только черновики, в порядке приоритета
+        tools.create_index(
+            self._cr, 'packaging_order_dispatch_index',
+            self._table, ['priority DESC', 'create_date', 'id'],
+            where="state = 'draft'",
+        )
+        # Инкрементальная выгрузка: диапазон по (write_date, id)
+        tools.create_index(
+            self._cr, 'packaging_order_write_date_id_index',
+            self._table, ['write_date', 'id'],
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Override create to generate sequence numbers, one block per batch"""
+        unnamed = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        if unnamed:
+            names = self.env['ir.sequence']._next_block_by_code('packaging.order', len(unnamed))
+            for vals, name in zip(unnamed, names):
+                vals['name'] = name or 'New'
+        orders = super().create(vals_list)
+        self.env['packaging.order.state.log']._buffer(
+            [(order.id, False, order.state) for order in orders], 'create',
+        )
+        return orders
+
+    def write(self, vals):
+        """Track when the order was closed (used by archiving)"""
+        if 'state' in vals and 'closed_date' not in vals:
+            unchanged = self.filtered(lambda order: order.state == vals['state'])
+            if unchanged:
+                # Статус этих заказов не меняется - дата закрытия остается прежней
+                rest = {key: value for key, value in vals.items() if key != 'state'}
+                if rest:
+                    unchanged.write(rest)
+                changed = self - unchanged
+                return changed.write(vals) if changed else True
+            closed = vals['state'] in ('completed', 'canceled')
+            vals = dict(vals, closed_date=fields.Datetime.now() if closed else False)
+        # События для внешних систем пишутся в той же транзакции, что и смена статуса
+        outbox_orders = self.browse()
+        changes = []
+        if vals.get('state'):
+            changes = [(order.id, order.state, vals['state']) for order in self if order.state != vals['state']]
+            if vals['state'] in OUTBOX_STATES:
+                outbox_orders = self.browse([order_id for order_id, _old, _new in changes])
+        res = super().write(vals)
+        if changes:
+            self.env['packaging.order.state.log']._buffer(
+                changes, self.env.context.get('state_trigger', 'write'),
+            )
+        if outbox_orders:
+            self.env['packaging.outbox.event']._record(outbox_orders, vals['state'])
+        if LIVE_FIELDS & vals.keys():
+            self._queue_live_update()
+        return res
+
+    def unlink(self):
+        # Выгрузка отдает удаления отдельным ресурсом; товары удаляются каскадом в базе
+        Tombstone = self.env['packaging.export.tombstone']
+        Tombstone._record('packaging.item', self.item_ids.ids)
+        Tombstone._record('packaging.order', self.ids)
+        return super().unlink()
+
+    # ========== LIVE UPDATES ==========
+    def _queue_live_update(self):
+        """Collect changed orders, one bus message per channel is sent at commit"""
+        data = self.env.cr.precommit.data
+        pending = data.get(LIVE_PRECOMMIT_KEY)
+        if pending is None:
+            pending = data[LIVE_PRECOMMIT_KEY] = set()
+            self.env.cr.precommit.add(self._send_live_updates)
+        pending.update(self.ids)
+
+    def _send_live_updates(self):
+        # Все изменения заказа за транзакцию схлопываются в одно сообщение
+        order_ids = self.env.cr.precommit.data.pop(LIVE_PRECOMMIT_KEY, set())
+        orders = self.sudo().browse(order_ids).exists()
+        if not orders:
+            return
+        by_channel = {}
+        for order in orders:
+            payload = order._live_payload()
+            for channel in (
+                LIVE_LIST_CHANNEL,
+                f'{LIVE_ORDER_CHANNEL}{order.id}',
+                f'{LIVE_STATION_CHANNEL}{order.responsible_id.id}',
+            ):
+                by_channel.setdefault(channel, []).append(payload)
+        self.env['bus.bus']._sendmany([
+            (channel, LIVE_NOTIFICATION, {'orders': payloads})
+            for channel, payloads in by_channel.items()
+        ])
+        self.env.flush_all()
+
+    def _live_payload(self):
+        self.ensure_one()
+        return {
+            'id': self.id,
+            'name': self.name,
+            'state': self.state,
+            'total_items': self.total_items,
+            'packed_items': self.packed_items,
+            'defective_items': self.defective_items,
+            'progress': self.progress,
+            'last_label': self.last_label_id.name or False,
+        }
+
     @api.model
-    def create(self, vals):
-        """Override create to generate sequence number"""
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('packaging.order') or 'New'
-        return super().create(vals)
+    def _metrics_orders_by_state(self):
+        """Gauge lines of order counts per state for the metrics endpoint"""
+        self.flush_model(['state'])
+        self.env.cr.execute("SELECT state, count(*) FROM packaging_order GROUP BY state")
+        counts = dict(self.env.cr.fetchall())
+        lines = [
+            '# HELP packaging_orders Packaging orders by state',
+            '# TYPE packaging_orders gauge',
+        ]
+        for state, _label in self._fields['state'].selection:
+            lines.append('packaging_orders{state="%s"} %d' % (state, counts.get(state, 0)))
+        return '\n'.join(lines) + '\n'
 
     # ========== CONSTRAINT METHODS ==========
     @api.constrains('name')
@@ -190,86 +684,196 @@ class PackagingOrder(models.Model):
                 raise ValidationError(_("Order number must contain only digits!"))
 
     # ========== BUSINESS LOGIC METHODS ==========
+    def _queue_completed_order(self):
+        """Collect orders completed by packing, their labels are handled once at commit"""
+        data = self.env.cr.precommit.data
+        pending = data.get(COMPLETED_PRECOMMIT_KEY)
+        if pending is None:
+            pending = data[COMPLETED_PRECOMMIT_KEY] = set()
+            self.env.cr.precommit.add(self._handle_queued_completed_orders)
+        pending.update(self.ids)
+
+    def _handle_queued_completed_orders(self):
+        order_ids = self.env.cr.precommit.data.pop(COMPLETED_PRECOMMIT_KEY, set())
+        # Заказ мог выйти из completed или быть удален в той же транзакции
+        orders = self.browse(order_ids).exists().filtered(lambda order: order.state == 'completed')
+        orders._handle_completed_order()
+        self.env.flush_all()
+
+    @tracing.traced()
     def _handle_completed_order(self):
         """Handle actions when order is completed"""
-        for order in self:
-            if order.auto_print_labels:
-                # Удаляем существующие этикетки и создаем новую
-                order.label_ids.unlink()
-                order._auto_print_shipping_label()
+        orders = self.filtered('auto_print_labels')
+        if not orders:
+            return
+        if len(orders) > LABEL_INLINE_LIMIT:
+            # Массовое завершение: этикетки печатаются фоновой очередью
+            orders.write({'label_pending': True})
+            self.env.ref('asai_test_task.ir_cron_packaging_label_queue')._trigger()
+            return
+        # Удаляем существующие этикетки одним запросом и создаем новые
+        orders.label_ids.unlink()
+        for order in orders:
+            order._auto_print_shipping_label()
+
+    @api.model
+    def _cron_process_label_queue(self, batch_size=LABEL_QUEUE_BATCH_SIZE, auto_commit=True):
+        """Generate shipping labels for orders queued by mass completion.
 
+        Orders whose label failed stay queued for the next run.
+        """
+        processed = 0
+        failed = []
+        while True:
+            orders = self.search(
+                [('label_pending', '=', True), ('id', 'not in', failed)], order='id', limit=batch_size
+            )
+            if not orders:
+                break
+            orders.label_ids.unlink()
+            printed = orders.filtered(lambda order: order._auto_print_shipping_label())
+            printed.write({'label_pending': False})
+            failed += (orders - printed).ids
+            processed += len(printed)
+            if auto_commit:
+                self.env.cr.commit()
+        return processed
+
+    @tracing.traced()
     def _auto_print_shipping_label(self):
-        """Automatically generate shipping label for completed order"""
+        """Automatically generate shipping label for completed order, return it or False"""
         try:
-            label = self.env['packaging.label'].create({
-                'order_id': self.id,
-            })
-            self.write({'last_label_id': label.id})
+            # Ошибка этикетки не должна прерывать транзакцию остальных заказов
+            with buffered_savepoint(self.env):
+                label = self.env['packaging.label'].create({
+                    'order_id': self.id,
+                })
+                self.write({'last_label_id': label.id})
             _logger.info("Shipping label created for order %s", self.name)
+            return label
         except Exception as e:
             _logger.error("Failed to create shipping label for order %s: %s", self.name, str(e))
+            return False
 
     def action_manual_print_label(self):
         """Manually trigger label printing"""
         self.ensure_one()
         if self.state != 'completed':
             raise UserError(_("Cannot print label - order is not completed!"))
-        return self._auto_print_shipping_label()
+        self._auto_print_shipping_label()
+
+    def _check_state_transition(self, allowed_states, message):
+        """Validate states of all selected orders with a single query"""
+        invalid = self.search([
+            ('id', 'in', self.ids),
+            ('state', 'not in', allowed_states),
+        ], limit=1)
+        if invalid:
+            raise UserError(message % invalid.state)
 
+    @tracing.traced()
     def action_mark_completed(self):
         """Mark order as completed manually"""
-        for order in self:
-            if order.state not in ['draft', 'in_progress']:
-                raise UserError(_("Cannot mark as completed from current state: %s") % order.state)
-        self.write({'state': 'completed'})
+        self._check_state_transition(
+            ['draft', 'in_progress'], _("Cannot mark as completed from current state: %s")
+        )
+        self.with_context(state_trigger='mark_completed').write({'state': 'completed'})
         return self._show_notification(
             _("Order Completed"), 
-            _("Order has been marked as completed"), 
+            _("%d order(s) marked as completed") % len(self),
             'success'
         )
 
     def action_reset_to_draft(self):
         """Reset order to draft state"""
-        for order in self:
-            if order.state not in ['completed', 'canceled']:
-                raise UserError(_("Cannot reset to draft from current state: %s") % order.state)
-        self.write({'state': 'draft'})
+        self._check_state_transition(
+            ['completed', 'canceled'], _("Cannot reset to draft from current state: %s")
+        )
+        self.with_context(state_trigger='reset_to_draft').write({'state': 'draft'})
         return self._show_notification(
             _("Order Reset"), 
-            _("Order has been reset to draft"), 
+            _("%d order(s) reset to draft") % len(self),
             'warning'
         )
     
+    @tracing.traced()
     def action_reset_packing(self):
         """Reset all items packing status in the order"""
-        self.ensure_one()
+        self._check_state_transition(
+            ['in_progress', 'defective'],
+            _("Can only reset packing for orders in progress or defective state (got: %s)")
+        )
         
-        if self.state not in ['in_progress', 'defective']:
-            raise UserError(_("Can only reset packing for orders in progress or defective state"))
+        # Большие заказы сбрасываются фоновой задачей порциями с коммитами
+        large = self.filtered(lambda order: order.total_items > RESET_CHUNK_SIZE)
+        small = self - large
+        if small:
+            small._reset_packing_chunked(auto_commit=False)
+        if large:
+            large.write({'reset_pending': True})
+            self.env.ref('asai_test_task.ir_cron_packaging_reset_queue')._trigger()
+            return self._show_notification(
+                _("Packing Reset Queued"),
+                _("%d large order(s) will be reset in background") % len(large),
+                'info'
+            )
         
-        # Сбрасываем статус упаковки всех товаров
-        self.item_ids.write({
-            'is_packed': False,
-            'pack_date': False,
-            'is_defective': False,
-            'defective_reason': False,
-            'defective_date': False,
-            'defective_operator_id': False
-        })
+        return self._show_notification(
+            _("Packing Reset"),
+            _("All items have been reset to unpacked state"),
+            'success'
+        )
+
+    def _reset_packing_chunked(self, chunk_size=RESET_CHUNK_SIZE, auto_commit=True):
+        """Reset items in fixed-size chunks; safe to rerun after interruption"""
+        Item = self.env['packaging.item']
+        Item.flush_model()
+        for order in self:
+            # Трогаем только товары с данными упаковки/брака
+            while True:
+                self.env.cr.execute("""
+                    UPDATE packaging_item
+                       SET is_packed = false, pack_date = NULL,
+                           is_defective = false, defective_reason = NULL,
+                           defective_date = NULL, defective_operator_id = NULL,
+                           write_uid = %s, write_date = (now() at time zone 'UTC')
+                     WHERE id IN (
+                            SELECT id FROM packaging_item
+                             WHERE order_id = %s
+                               AND (is_packed OR is_defective OR defective_reason IS NOT NULL)
+                             ORDER BY id
+                             LIMIT %s)
+                """, (self.env.uid, order.id, chunk_size))
+                updated = self.env.cr.rowcount
+                if auto_commit and updated:
+                    self.env.cr.commit()
+                if updated < chunk_size:
+                    break
+        Item.invalidate_model([
+            'is_packed', 'pack_date', 'is_defective', 'defective_reason',
+            'defective_date', 'defective_operator_id', 'write_uid', 'write_date',
+        ])
+        self.env['packaging.scan.log']._log_events([('reset', order.id, None) for order in self])
         
-        # Сбрасываем статус заказа
-        self.write({
+        # Сбрасываем статус заказа и пересчитываем счетчики один раз
+        self.with_context(state_trigger='reset_packing').write({
             'state': 'draft',
+            'reset_pending': False,
             'defective_reason': False,
             'defective_date': False,
             'defective_operator_id': False
         })
-        
-        return self._show_notification(
-            _("Packing Reset"),
-            _("All items have been reset to unpacked state"),
-            'success'
-        )
+        self._compute_packed_items()
+        if auto_commit:
+            self.env.cr.commit()
+
+    @api.model
+    def _cron_process_reset_queue(self, chunk_size=RESET_CHUNK_SIZE, auto_commit=True):
+        """Finish packing resets queued for large orders"""
+        orders = self.search([('reset_pending', '=', True)], order='id')
+        for order in orders:
+            order._reset_packing_chunked(chunk_size=chunk_size, auto_commit=auto_commit)
+        return len(orders)
         
     def action_mark_defective(self):
         """Mark order as defective with reason"""
@@ -287,10 +891,8 @@ class PackagingOrder(models.Model):
     
     def action_mark_defective_simple(self):
         """Simple method to mark order as defective without wizard"""
-        self.ensure_one()
-        
-        # Просто помечаем заказ как бракованный
-        self.write({
+        # Просто помечаем заказы как бракованные
+        self.with_context(state_trigger='mark_defective').write({
             'state': 'defective',
             'defective_reason': 'Marked as defective by operator',
             'defective_date': fields.Datetime.now(),
@@ -299,31 +901,126 @@ class PackagingOrder(models.Model):
         
         return self._show_notification(
             _("Order Marked as Defective"),
-            _("Order has been marked as defective"),
+            _("%d order(s) marked as defective") % len(self),
             'warning'
         )
 
     def action_cancel_order(self):
         """Cancel the order"""
-        for order in self:
-            if order.state not in ['draft', 'in_progress']:
-                raise UserError(_("Cannot cancel from current state: %s") % order.state)
-        self.write({'state': 'canceled'})
+        self._check_state_transition(
+            ['draft', 'in_progress'], _("Cannot cancel from current state: %s")
+        )
+        self.with_context(state_trigger='cancel').write({'state': 'canceled'})
         return self._show_notification(
             _("Order Canceled"), 
-            _("Order has been canceled"), 
+            _("%d order(s) canceled") % len(self),
             'warning'
         )
 
+    # ========== ORDER INTAKE ==========
+    @api.model
+    @tracing.traced()
+    def intake_orders(self, orders):
+        """Create a batch of orders with their items in one transaction.
+
+        `orders` is a list of dicts with key, responsible (login), priority,
+        auto_print_labels and items [{item_code, product_name, dimensions}].
+        Known keys are not created again, their order is returned instead.
+        Returns [{'key', 'id', 'name', 'status'}] in input order.
+        """
+        if len(orders) > INTAKE_BATCH_LIMIT:
+            raise UserError(_("Too many orders in one batch (max %d)") % INTAKE_BATCH_LIMIT)
+        payloads = [self._normalize_intake(order) for order in orders]
+        by_key = {
+            order.intake_key: order
+            for order in self.search(
+                [('intake_key', 'in', [payload['key'] for payload in payloads])]
+            )
+        }
+        # Повтор ключа внутри пачки - тоже дубликат
+        new_payloads = {}
+        for payload in payloads:
+            if payload['key'] not in by_key:
+                new_payloads.setdefault(payload['key'], payload)
+
+        if new_payloads:
+            by_key.update(zip(new_payloads, self._intake_create(list(new_payloads.values()))))
+        seen = set()
+        results = []
+        for payload in payloads:
+            order = by_key[payload['key']]
+            created = payload['key'] in new_payloads and payload['key'] not in seen
+            seen.add(payload['key'])
+            results.append({
+                'key': payload['key'],
+                'id': order.id,
+                'name': order.name,
+                'status': 'created' if created else 'duplicate',
+            })
+        return results
+
+    @api.model
+    def _normalize_intake(self, order):
+        key = str(order.get('key') or '').strip()
+        if not key:
+            raise UserError(_("Order without intake key"))
+        priority = str(order.get('priority') or '0')
+        if priority not in dict(self._fields['priority'].selection):
+            raise UserError(_("Unknown priority %s of order %s") % (priority, key))
+        items = []
+        for item in order.get('items') or []:
+            row = {name: str(item.get(name) or '').strip() for name in ('item_code', 'product_name', 'dimensions')}
+            if not row['item_code'] or not row['product_name']:
+                raise UserError(_("Item without code or product name in order %s") % key)
+            items.append(row)
+        return {
+            'key': key,
+            'responsible': str(order.get('responsible') or '').strip(),
+            'priority': priority,
+            'auto_print_labels': bool(order.get('auto_print_labels', True)),
+            'items': items,
+        }
+
+    @api.model
+    def _intake_create(self, payloads):
+        """Multi-create orders and all their items, returns orders in payload order"""
+        logins = {payload['responsible'] for payload in payloads if payload['responsible']}
+        users = {
+            user.login: user.id
+            for user in self.env['res.users'].search([('login', 'in', list(logins))])
+        }
+        missing = logins - users.keys()
+        if missing:
+            raise UserError(_("Unknown responsible employee: %s") % ', '.join(sorted(missing)))
+        try:
+            with self.env.cr.savepoint(), mute_logger('odoo.sql_db'):
+                orders = self.create([{
+                    'intake_key': payload['key'],
+                    'responsible_id': users.get(payload['responsible'], self.env.uid),
+                    'priority': payload['priority'],
+                    'auto_print_labels': payload['auto_print_labels'],
+                } for payload in payloads])
+        except UniqueViolation:
+            # Тот же ключ только что создан параллельным запросом - повтор вернет его заказ
+            raise UserError(_("Orders with these keys are being created by another request, please retry"))
+        # Товары всех заказов - одним create
+        self.env['packaging.item'].create([
+            order._prepare_item_vals(row)
+            for order, payload in zip(orders, payloads)
+            for row in payload['items']
+        ])
+        return orders
+
     # ========== IMPORT/EXPORT METHODS ==========
+    @tracing.traced()
     def action_import_csv(self):
-        """Import items from CSV file"""
+        """Import items from CSV, gzip CSV, NDJSON or XLSX file"""
         self.ensure_one()
         if not self.import_file:
-            raise UserError(_("Please select a CSV file to import"))
+            raise UserError(_("Please select a file to import"))
         
         try:
-            items_created = self._process_csv_import()
+            items_created = self._process_import()
             self._clear_import_fields()
             
             return self._show_notification(
@@ -332,49 +1029,63 @@ class PackagingOrder(models.Model):
                 'success'
             )
         except Exception as e:
-            raise UserError(_("CSV Import Error: %s") % str(e))
+            raise UserError(_("Import Error: %s") % str(e))
 
-    def _process_csv_import(self):
-        """Process CSV file and create items"""
-        file_content = base64.b64decode(self.import_file)
-        file_stream = io.StringIO(file_content.decode('utf-8'))
-        csv_reader = csv.DictReader(file_stream)
-        
-        items_created = 0
-        for row in csv_reader:
-            self._create_item_from_row(row)
-            items_created += 1
-            
-        return items_created
+    def _process_import(self, batch_size=IMPORT_BATCH_SIZE):
+        """Parse the import file with the parser of its format and create items"""
+        rows = importers.iter_rows(self.import_filename, base64.b64decode(self.import_file))
+        Item = self.env['packaging.item']
+        created = 0
+        with metrics.IMPORT_SECONDS.time():
+            # Один create на пачку: размеры разбираются пачкой, строки файла не копятся в памяти
+            while True:
+                batch = [self._prepare_item_vals(row) for row in itertools.islice(rows, batch_size)]
+                if not batch:
+                    break
+                created += len(Item.create(batch))
+        metrics.IMPORT_ROWS.inc(created)
+        return created
 
-    def _create_item_from_row(self, row):
-        """Create packaging item from CSV row"""
-        return self.env['packaging.item'].create({
+    def _prepare_item_vals(self, row):
+        """Packaging item values from an imported row"""
+        return {
             'order_id': self.id,
-            'item_code': row.get('item_code', '').strip(),
-            'product_name': row.get('product_name', '').strip(),
-            'dimensions': row.get('dimensions', '').strip(),
-        })
+            'item_code': str(row.get('item_code') or '').strip(),
+            'product_name': str(row.get('product_name') or '').strip(),
+            'dimensions': str(row.get('dimensions') or '').strip(),
+        }
 
     def _clear_import_fields(self):
         """Clear import-related fields after processing"""
         self.write({'import_file': False, 'import_filename': False})
 
     # ========== QUICK ACTIONS METHODS ==========
+    @tracing.traced()
     def action_quick_pack(self):
         """Quick pack item by code"""
         self.ensure_one()
         if not self.quick_pack_item_code:
             raise UserError(_("Please enter an item code"))
         
-        item = self._find_item_by_code(self.quick_pack_item_code.strip())
+        result = self._quick_pack_code(self.quick_pack_item_code.strip())
+        self.write({'quick_pack_item_code': False})
+        return result
+
+    @tracing.traced()
+    def _quick_pack_code(self, item_code):
+        """Pack item of this order by its code"""
+        self.ensure_one()
+        start = time.perf_counter()
+        if self.reset_pending:
+            raise UserError(_("Packing reset of order %s is in progress, please wait") % self.name)
+        item = self._find_item_by_code(item_code)
         if not item:
-            raise UserError(_("Item with code %s not found in this order") % self.quick_pack_item_code)
+            raise UserError(_("Item with code %s not found in this order") % item_code)
         if item.is_packed:
-            raise UserError(_("Item %s is already packed") % self.quick_pack_item_code)
+            raise UserError(_("Item %s is already packed") % item_code)
         
         item.action_mark_as_packed()
-        self.write({'quick_pack_item_code': False})
+        metrics.SCAN_SECONDS.observe(time.perf_counter() - start, source='quick_pack')
         
         return self._show_notification(
             _("Item Packed"),
@@ -382,6 +1093,7 @@ class PackagingOrder(models.Model):
             'success'
         )
 
+    @tracing.traced()
     def _find_item_by_code(self, item_code):
         """Find item by code in current order"""
         return self.env['packaging.item'].search([
@@ -394,12 +1106,121 @@ class PackagingOrder(models.Model):
         if not self.quick_jump_order_number:
             raise UserError(_("Please enter an order number"))
         
-        order = self.search([('name', '=', str(self.quick_jump_order_number))], limit=1)
+        order = self.env['packaging.scan.router']._lookup_order(str(self.quick_jump_order_number))
         if not order:
             raise UserError(_("Order with number %s not found!") % self.quick_jump_order_number)
         
         return order.action_open_order()
 
+    def action_open_scan_router(self):
+        """Open scan router for this order"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Scan'),
+            'res_model': 'packaging.scan.router',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'active_model': self._name, 'active_id': self.id},
+        }
+
+    # ========== DISPATCH QUEUE ==========
+    @api.model
+    def action_claim_next_order(self):
+        """Claim the next waiting order and open it"""
+        order = self._claim_next_order()
+        if not order:
+            return self._show_notification(_("Dispatch Queue"), _("No orders are waiting"), 'info')
+        return order.action_open_order()
+
+    @api.model
+    def _claim_next_order(self):
+        """Atomically claim the next draft order for the current user.
+
+        The claim runs in its own short transaction. Under REPEATABLE READ a row
+        claimed by a station that committed after our snapshot raises
+        SerializationFailure, and only a new transaction sees that claim: the
+        conflict is retried with a fresh cursor up to CLAIM_ATTEMPTS times and
+        counted in metrics.CLAIM_RETRIES.
+        """
+        self.env.flush_all()
+        for attempt in range(1, CLAIM_ATTEMPTS + 1):
+            try:
+                with self.env.registry.cursor() as cr, mute_logger('odoo.sql_db'):
+                    order_id = self.with_env(self.env(cr=cr))._claim_in_transaction()
+                break
+            except SerializationFailure:
+                metrics.CLAIM_RETRIES.inc()
+                if attempt == CLAIM_ATTEMPTS:
+                    raise
+        order = self.browse(order_id)
+        # Захват записан другой транзакцией: кэш этого окружения устарел
+        order.invalidate_recordset(CLAIM_FIELDS)
+        return order
+
+    @api.model
+    def _claim_in_transaction(self):
+        """Claim in the current transaction, return the order id or False.
+
+        Orders locked by other stations are skipped, not waited for. An operator
+        holding the maximum number of live claims gets the oldest claim back.
+        """
+        now = fields.Datetime.now()
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        timeout = int(get_param(CLAIM_TIMEOUT_PARAM, CLAIM_TIMEOUT_DEFAULT))
+        max_claims = int(get_param(CLAIM_MAX_PARAM, CLAIM_MAX_DEFAULT))
+
+        claimed = self.search([
+            ('claimed_by_id', '=', self.env.uid),
+            ('state', '=', 'draft'),
+            ('claim_expires', '>', now),
+        ], order='claim_date, id')
+        if len(claimed) >= max_claims:
+            return claimed[0].id
+
+        self.flush_model(['state', 'reset_pending', 'total_items', 'priority',
+                          'responsible_id', 'claimed_by_id', 'claim_expires'])
+        # Один запрос: обход packaging_order_dispatch_index по порядку, занятые строки пропускаются
+        self.env.cr.execute("""
+            SELECT id
+              FROM packaging_order
+             WHERE state = 'draft' AND NOT reset_pending AND total_items > 0
+               AND (claimed_by_id IS NULL OR claim_expires < %s)
+          ORDER BY priority DESC, create_date, id
+             LIMIT 1
+               FOR NO KEY UPDATE SKIP LOCKED
+        """, (now,))
+        row = self.env.cr.fetchone()
+        if not row:
+            return False
+        self.browse(row[0]).write({
+            'claimed_by_id': self.env.uid,
+            'responsible_id': self.env.uid,
+            'claim_date': now,
+            'claim_expires': now + timedelta(minutes=timeout),
+        })
+        return row[0]
+
+    def action_release_claim(self):
+        """Put claimed orders back into the dispatch queue"""
+        claimed = self.filtered('claimed_by_id')
+        foreign = claimed.filtered(lambda order: order.claimed_by_id != self.env.user)
+        if foreign and not self.env.user.has_group('base.group_system'):
+            raise UserError(_("Order %s is claimed by %s") % (foreign[0].name, foreign[0].claimed_by_id.name))
+        claimed.write({'claimed_by_id': False, 'claim_date': False, 'claim_expires': False})
+        return self._show_notification(
+            _("Claim Released"),
+            _("%d order(s) returned to the queue") % len(claimed),
+            'success'
+        )
+
+    @api.model
+    def _cron_release_expired_claims(self):
+        """Clear claims that timed out before packing started"""
+        expired = self.search([('claim_expires', '<', fields.Datetime.now()), ('state', '=', 'draft')])
+        expired.write({'claimed_by_id': False, 'claim_date': False, 'claim_expires': False})
+        return len(expired)
+
     def action_open_order(self):
         """Open order in view mode"""
         return {
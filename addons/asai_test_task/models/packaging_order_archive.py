@@ -0,0 +1,155 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from datetime import timedelta
+import base64
+import json
+import logging
+import zipfile
+from io import BytesIO
+
+_logger = logging.getLogger(__name__)
+
+ARCHIVE_DAYS_PARAM = 'asai_test_task.archive_after_days'
+ARCHIVE_DAYS_DEFAULT = 90
+ARCHIVE_BATCH_SIZE = 500
+
+
+class PackagingOrderArchive(models.Model):
+    _name = 'packaging.order.archive'
+    _description = 'Archived Packaging Order'
+    _order = 'archive_date desc, id desc'
+
+    name = fields.Char(string='Order Number', required=True, index=True, readonly=True)
+    responsible_id = fields.Many2one('res.users', string='Responsible Employee', index=True, readonly=True)
+    state = fields.Selection([
+        ('completed', 'Completed'),
+        ('canceled', 'Canceled'),
+    ], string='Status', readonly=True)
+    order_create_date = fields.Datetime(string='Order Created', readonly=True)
+    closed_date = fields.Datetime(string='Closed Date', readonly=True)
+    archive_date = fields.Datetime(string='Archive Date', default=fields.Datetime.now, readonly=True)
+
+    total_items = fields.Integer(string='Total Items', readonly=True)
+    packed_items = fields.Integer(string='Packed Items', readonly=True)
+    defective_items = fields.Integer(string='Defective Items', readonly=True)
+    defective_reason = fields.Text(string='Defective Reason', readonly=True)
+
+    # Товары хранятся одной JSON-строкой, поиск по коду - медленный путь (ilike)
+    items_data = fields.Text(string='Items (JSON)', readonly=True)
+    label_names = fields.Char(string='Label Numbers', readonly=True)
+    label_archive = fields.Binary(string='Labels (ZIP)', attachment=True, readonly=True)
+    label_archive_filename = fields.Char(string='Labels Filename', readonly=True)
+
+    _sql_constraints = [
+        ('name_unique', 'unique(name)', 'Archived order number must be unique!'),
+    ]
+
+    # ========== ARCHIVING ==========
+    @api.model
+    def _cron_archive_orders(self, days=None, batch_size=ARCHIVE_BATCH_SIZE, auto_commit=True):
+        """Move orders closed more than N days ago out of the hot tables"""
+        if days is None:
+            days = int(self.env['ir.config_parameter'].sudo().get_param(
+                ARCHIVE_DAYS_PARAM, ARCHIVE_DAYS_DEFAULT
+            ))
+        limit_date = fields.Datetime.now() - timedelta(days=days)
+        Order = self.env['packaging.order']
+        domain = [
+            ('state', 'in', ['completed', 'canceled']),
+            '|', ('closed_date', '<', limit_date),
+            '&', ('closed_date', '=', False), ('write_date', '<', limit_date),
+        ]
+
+        archived = 0
+        while True:
+            orders = Order.search(domain, order='id', limit=batch_size)
+            if not orders:
+                break
+            self._archive_orders(orders)
+            archived += len(orders)
+            if auto_commit:
+                self.env.cr.commit()
+            if len(orders) < batch_size:
+                break
+
+        _logger.info("Archived %d packaging orders closed before %s", archived, limit_date)
+        return archived
+
+    @api.model
+    def _archive_orders(self, orders):
+        """Copy orders into the archive table and remove them from hot tables"""
+        self.create([self._prepare_archive_vals(order) for order in orders])
+
+        # Этикетки удаляем через ORM, чтобы ушли и их вложения
+        orders.label_ids.unlink()
+        orders.unlink()
+
+    @api.model
+    def _prepare_archive_vals(self, order):
+        items = [{
+            'item_code': item.item_code,
+            'product_name': item.product_name,
+            'dimensions': item.dimensions or '',
+            'is_packed': item.is_packed,
+            'pack_date': fields.Datetime.to_string(item.pack_date) if item.pack_date else None,
+            'is_defective': item.is_defective,
+            'defective_reason': item.defective_reason or '',
+        } for item in order.item_ids]
+
+        vals = {
+            'name': order.name,
+            'responsible_id': order.responsible_id.id,
+            'state': order.state,
+            'order_create_date': order.create_date,
+            'closed_date': order.closed_date,
+            'total_items': order.total_items,
+            'packed_items': order.packed_items,
+            'defective_items': order.defective_items,
+            'defective_reason': order.defective_reason,
+            'items_data': json.dumps(items, ensure_ascii=False),
+            'label_names': ', '.join(order.label_ids.mapped('name')),
+        }
+        labels = order.label_ids.filtered('label_data')
+        if labels:
+            vals['label_archive'] = base64.b64encode(self._compress_labels(labels))
+            vals['label_archive_filename'] = f'labels_{order.name}.zip'
+        return vals
+
+    @api.model
+    def _compress_labels(self, labels):
+        """Pack label PDFs into one deflate-compressed ZIP"""
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            for label in labels:
+                archive.writestr(
+                    label.label_filename or f'shipping_label_{label.name}.pdf',
+                    base64.b64decode(label.label_data),
+                )
+        return buffer.getvalue()
+
+    # ========== SEARCH ==========
+    @api.model
+    def search_archive(self, code):
+        """Find archived orders by order number, label number or item code"""
+        code = (code or '').strip()
+        if not code:
+            return self.browse()
+        archived = self.search([('name', '=', code)])
+        if not archived:
+            archived = self.search(['|', ('label_names', 'ilike', code), ('items_data', 'ilike', code)])
+        return archived
+
+    def get_items(self):
+        self.ensure_one()
+        return json.loads(self.items_data or '[]')
+
+    def action_download_labels(self):
+        """Download archived labels"""
+        self.ensure_one()
+        if not self.label_archive:
+            raise UserError(_("No labels archived for this order!"))
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/packaging.order.archive/{self.id}/label_archive/{self.label_archive_filename}?download=true',
+            'target': 'self',
+        }
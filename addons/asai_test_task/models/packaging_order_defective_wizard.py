@@ -1,4 +1,4 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 
 class PackagingOrderDefectiveWizard(models.TransientModel):
@@ -21,9 +21,11 @@ class PackagingOrderDefectiveWizard(models.TransientModel):
         
         if not self.defective_reason:
             raise UserError("Please provide a reason for marking this order as defective!")
+        if self.order_id.reset_pending:
+            raise UserError(_("Packing reset of order %s is in progress, please wait") % self.order_id.name)
         
         # Обновляем заказ
-        self.order_id.write({
+        self.order_id.with_context(state_trigger='defective_wizard').write({
             'state': 'defective',
             'defective_reason': self.defective_reason,
             'defective_date': fields.Datetime.now(),
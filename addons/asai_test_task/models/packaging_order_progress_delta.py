@@ -0,0 +1,48 @@
+from odoo import models, fields, api
+
+
+class PackagingOrderProgressDelta(models.Model):
+    """Append-only counter deltas of an order.
+
+    Scans insert rows here instead of updating packaging_order; rows are
+    folded into packed_items/defective_items by the order (see
+    PackagingOrder._fold_progress_deltas).
+    """
+    _name = 'packaging.order.progress.delta'
+    _description = 'Packaging Order Progress Delta'
+    _log_access = False
+
+    order_id = fields.Many2one('packaging.order', string='Order', required=True, index=True, ondelete='cascade')
+    packed_delta = fields.Integer(string='Packed Delta', default=0)
+    defective_delta = fields.Integer(string='Defective Delta', default=0)
+
+    @api.model
+    def _record(self, deltas):
+        """Insert non-zero deltas, `deltas` is {order_id: (packed_delta, defective_delta)}.
+
+        Returns the orders that got a delta, the ones to fold.
+        """
+        vals_list = [{
+            'order_id': order_id,
+            'packed_delta': packed,
+            'defective_delta': defective,
+        } for order_id, (packed, defective) in deltas.items() if packed or defective]
+        if vals_list:
+            self.create(vals_list)
+        return self.env['packaging.order'].browse([vals['order_id'] for vals in vals_list])
+
+    @api.model
+    def _consume(self, orders):
+        """Delete visible deltas of orders and return their (packed, defective) sum"""
+        self.flush_model()
+        self.env.cr.execute("""
+            WITH consumed AS (
+                DELETE FROM packaging_order_progress_delta
+                 WHERE order_id IN %s
+             RETURNING packed_delta, defective_delta
+            )
+            SELECT coalesce(sum(packed_delta), 0), coalesce(sum(defective_delta), 0) FROM consumed
+        """, (tuple(orders.ids),))
+        packed, defective = self.env.cr.fetchone()
+        self.invalidate_model()
+        return int(packed), int(defective)
@@ -16,9 +16,7 @@ class PackagingOrderQuickJumpWizard(models.TransientModel):
             raise UserError("Please enter an order number")
 
         # Ищем заказ по номеру
-        order = self.env['packaging.order'].search([
-            ('name', '=', self.order_number.strip())
-        ], limit=1)
+        order = self.env['packaging.scan.router']._lookup_order(self.order_number.strip())
 
         if not order:
             raise UserError(f"Order with number {self.order_number} not found!")
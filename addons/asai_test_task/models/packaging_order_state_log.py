@@ -0,0 +1,115 @@
+from odoo import models, fields, api, tools
+
+STATE_LOG_PRECOMMIT_KEY = 'asai_test_task.state_log'
+ORDER_STATES = [
+    ('draft', 'Draft'),
+    ('in_progress', 'In Progress'),
+    ('completed', 'Completed'),
+    ('canceled', 'Canceled'),
+    ('defective', 'Defective'),
+]
+
+
+class PackagingOrderStateLog(models.Model):
+    """Append-only history of order state changes.
+
+    Rows are buffered during the transaction and inserted with one create
+    right before commit, so a mass state change costs one INSERT. The order
+    number is stored with each row: the trail outlives archived and deleted
+    orders.
+    """
+    _name = 'packaging.order.state.log'
+    _description = 'Packaging Order State Change'
+    _order = 'change_date desc, id desc'
+    _log_access = False
+
+    order_id = fields.Many2one('packaging.order', string='Order', index=True, ondelete='set null', readonly=True)
+    order_name = fields.Char(string='Order Number', required=True, readonly=True)
+    from_state = fields.Selection(ORDER_STATES, string='From', readonly=True)
+    to_state = fields.Selection(ORDER_STATES, string='To', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    change_date = fields.Datetime(string='Changed At', required=True, readonly=True)
+    trigger = fields.Char(string='Trigger', readonly=True)
+
+    def init(self):
+        # Время в статусе: соседние записи заказа (LEAD по номеру) и выборка по периоду
+        tools.create_index(
+            self._cr, 'packaging_order_state_log_name_date_index',
+            self._table, ['order_name', 'change_date', 'id'],
+        )
+        tools.create_index(
+            self._cr, 'packaging_order_state_log_change_date_index',
+            self._table, ['change_date'],
+        )
+
+    @api.model
+    def _buffer(self, changes, trigger):
+        """Queue (order_id, from_state, to_state) changes for the precommit insert"""
+        data = self.env.cr.precommit.data
+        pending = data.get(STATE_LOG_PRECOMMIT_KEY)
+        if pending is None:
+            pending = data[STATE_LOG_PRECOMMIT_KEY] = []
+            self.env.cr.precommit.add(self._flush_buffer)
+        now = fields.Datetime.now()
+        # Номера только что записанных заказов уже в кэше
+        names = {order.id: order.name for order in self.env['packaging.order'].browse(
+            [order_id for order_id, _from, _to in changes]
+        )}
+        pending.extend({
+            'order_id': order_id,
+            'order_name': names[order_id],
+            'from_state': from_state or False,
+            'to_state': to_state,
+            'user_id': self.env.uid,
+            'change_date': now,
+            'trigger': trigger,
+        } for order_id, from_state, to_state in changes)
+
+    def _flush_buffer(self):
+        pending = self.env.cr.precommit.data.pop(STATE_LOG_PRECOMMIT_KEY, None)
+        if not pending:
+            return
+        # Заказ мог быть удален в той же транзакции - история остается по номеру
+        existing = set(self.env['packaging.order'].browse(
+            list({vals['order_id'] for vals in pending})
+        ).exists().ids)
+        for vals in pending:
+            if vals['order_id'] not in existing:
+                vals['order_id'] = False
+        self.sudo().create(pending)
+        self.env.flush_all()
+
+    @api.model
+    def _time_in_state(self, date_from=None, date_to=None):
+        """Seconds orders spent per state, for states entered within the period.
+
+        Returns {state: {'count', 'avg', 'p50', 'p95'}}; only finished stays
+        (followed by another change) are counted.
+        """
+        if self.env.cr.precommit.data.get(STATE_LOG_PRECOMMIT_KEY):
+            self._flush_buffer()
+        self.env.cr.execute("""
+            WITH stays AS (
+                SELECT to_state, change_date,
+                       lead(change_date) OVER (PARTITION BY order_name ORDER BY change_date, id) AS left_date
+                  FROM packaging_order_state_log
+                 WHERE order_name IN (
+                        SELECT order_name FROM packaging_order_state_log
+                         WHERE change_date >= %(date_from)s AND change_date < %(date_to)s)
+            )
+            SELECT to_state, count(*),
+                   avg(extract(epoch FROM left_date - change_date)),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY extract(epoch FROM left_date - change_date)),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY extract(epoch FROM left_date - change_date))
+              FROM stays
+             WHERE left_date IS NOT NULL
+               AND change_date >= %(date_from)s AND change_date < %(date_to)s
+          GROUP BY to_state
+        """, {
+            'date_from': date_from or '-infinity',
+            'date_to': date_to or 'infinity',
+        })
+        return {
+            state: {'count': count, 'avg': float(avg), 'p50': float(p50), 'p95': float(p95)}
+            for state, count, avg, p50, p95 in self.env.cr.fetchall()
+        }
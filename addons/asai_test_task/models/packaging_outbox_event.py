@@ -0,0 +1,184 @@
+from odoo import models, fields, api, tools, _
+from datetime import timedelta
+import json
+import logging
+import uuid
+
+import requests
+
+_logger = logging.getLogger(__name__)
+
+OUTBOX_STATES = ('completed', 'defective')
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_KEEP_DAYS = 7
+OUTBOX_PRECOMMIT_KEY = 'asai_test_task.outbox_trigger'
+
+
+class PackagingOutboxEvent(models.Model):
+    _name = 'packaging.outbox.event'
+    _description = 'Packaging Outbox Event'
+    _order = 'id desc'
+
+    webhook_id = fields.Many2one('packaging.webhook', string='Webhook', required=True, ondelete='cascade', readonly=True)
+    order_id = fields.Many2one('packaging.order', string='Order', ondelete='set null', readonly=True)
+    event_type = fields.Selection([
+        ('completed', 'Order Completed'),
+        ('defective', 'Order Defective'),
+    ], string='Event', required=True, readonly=True)
+    payload = fields.Text(string='Payload', readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True, readonly=True)
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    next_attempt = fields.Datetime(string='Next Attempt', default=fields.Datetime.now, readonly=True)
+    sent_date = fields.Datetime(string='Sent At', readonly=True)
+    last_error = fields.Char(string='Last Error', readonly=True)
+    create_date = fields.Datetime(index=True)
+
+    def init(self):
+        # Выборка диспетчера - по ожидающим, проверка порядка внутри заказа - по недоставленным
+        tools.create_index(
+            self._cr, 'packaging_outbox_event_pending_index',
+            self._table, ['next_attempt', 'id'],
+            where="state = 'pending'",
+        )
+        tools.create_index(
+            self._cr, 'packaging_outbox_event_undelivered_order_index',
+            self._table, ['webhook_id', 'order_id', 'id'],
+            where="state IN ('pending', 'failed')",
+        )
+
+    # ========== RECORDING ==========
+    @api.model
+    def _record(self, orders, event_type):
+        """Queue an event per active webhook in the current transaction"""
+        webhooks = self.env['packaging.webhook'].sudo().search([])
+        if not webhooks or not orders:
+            return self.browse()
+        now = fields.Datetime.now()
+        vals_list = []
+        for order in orders:
+            # Один id события для всех получателей - по нему они отбрасывают повторы
+            payload = json.dumps({
+                'id': str(uuid.uuid4()),
+                'type': f'order.{event_type}',
+                'occurred_at': fields.Datetime.to_string(now),
+                'order_id': order.id,
+                'order': order.name,
+                'total_items': order.total_items,
+                'packed_items': order.packed_items,
+                'defective_items': order.defective_items,
+                'defective_reason': order.defective_reason or '',
+            })
+            vals_list += [{
+                'webhook_id': webhook.id,
+                'order_id': order.id,
+                'event_type': event_type,
+                'payload': payload,
+                'next_attempt': now,
+            } for webhook in webhooks]
+        events = self.sudo().create(vals_list)
+        self._trigger_dispatch()
+        return events
+
+    @api.model
+    def _trigger_dispatch(self):
+        # Один запуск диспетчера на транзакцию, доставка - после коммита и не в запросе оператора
+        data = self.env.cr.precommit.data
+        if not data.get(OUTBOX_PRECOMMIT_KEY):
+            data[OUTBOX_PRECOMMIT_KEY] = True
+            self.env.cr.precommit.add(self._precommit_trigger)
+
+    def _precommit_trigger(self):
+        self.env.cr.precommit.data.pop(OUTBOX_PRECOMMIT_KEY, None)
+        self.env.ref('asai_test_task.ir_cron_packaging_outbox_dispatch').sudo()._trigger()
+        self.env.flush_all()
+
+    # ========== DISPATCH ==========
+    @api.model
+    def _cron_dispatch(self, batch_size=OUTBOX_BATCH_SIZE, auto_commit=True):
+        """Deliver pending events in batches, oldest first"""
+        delivered = 0
+        while True:
+            events = self._lock_deliverable(batch_size, fields.Datetime.now())
+            if not events:
+                break
+            for webhook, webhook_events in events.grouped('webhook_id').items():
+                delivered += webhook_events._deliver(webhook)
+            # Следующее событие заказа становится доступно после доставки предыдущего
+            if auto_commit:
+                self.env.cr.commit()
+        return delivered
+
+    @api.model
+    def _lock_deliverable(self, limit, now):
+        """Lock events due at `now` that have no earlier undelivered event of the same order.
+
+        A failed event parks the later events of its order until it is retried.
+        """
+        self.flush_model()
+        # now() в SQL - начало транзакции, а next_attempt пишется временем Python
+        self.env.cr.execute("""
+            SELECT e.id
+              FROM packaging_outbox_event e
+             WHERE e.state = 'pending' AND e.next_attempt <= %s
+               AND NOT EXISTS (
+                    SELECT 1 FROM packaging_outbox_event p
+                     WHERE p.state IN ('pending', 'failed') AND p.webhook_id = e.webhook_id
+                       AND p.order_id = e.order_id AND p.id < e.id)
+          ORDER BY e.id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (now, limit))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _deliver(self, webhook):
+        """POST the events to one webhook as a single batch"""
+        events = self.sorted('id')
+        body = json.dumps({'events': [json.loads(event.payload) for event in events]}).encode()
+        try:
+            webhook._post(body)
+        except requests.RequestException as e:
+            _logger.warning("Webhook %s: delivery of %d event(s) failed: %s", webhook.name, len(events), e)
+            events._schedule_retry(str(e)[:200])
+            return 0
+        events.write({'state': 'sent', 'sent_date': fields.Datetime.now(), 'last_error': False})
+        return len(events)
+
+    def _schedule_retry(self, error):
+        now = fields.Datetime.now()
+        for event in self:
+            attempts = event.attempts + 1
+            event.write({
+                'attempts': attempts,
+                'last_error': error,
+                # Экспоненциальная пауза: 30 с, 1 мин, 2 мин ... не больше часа
+                'next_attempt': now + timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600)),
+                'state': 'failed' if attempts >= OUTBOX_MAX_ATTEMPTS else 'pending',
+            })
+
+    def action_retry(self):
+        """Send failed events again"""
+        self.filtered(lambda event: event.state == 'failed').write({
+            'state': 'pending', 'attempts': 0, 'next_attempt': fields.Datetime.now(),
+        })
+        self._trigger_dispatch()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Outbox"),
+                'message': _("Events queued for delivery"),
+                'type': 'success',
+                'sticky': False,
+            },
+        }
+
+    @api.autovacuum
+    def _gc_sent_events(self):
+        """Drop delivered events older than OUTBOX_KEEP_DAYS"""
+        limit_date = fields.Datetime.now() - timedelta(days=OUTBOX_KEEP_DAYS)
+        self.search([('state', '=', 'sent'), ('sent_date', '<', limit_date)]).unlink()
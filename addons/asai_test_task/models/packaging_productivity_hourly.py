@@ -0,0 +1,103 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+WATERMARK_PARAM = 'asai_test_task.productivity_watermark'
+# Сколько пересчитывать назад: буфер журнала пишется при коммите, долгие транзакции опаздывают
+REFRESH_OVERLAP_MINUTES = 15
+# Паузы длиннее - перерыв, а не время между сканами
+SCAN_GAP_BREAK_SECONDS = 600
+
+
+class PackagingProductivityHourly(models.Model):
+    """Items packed per operator and hour, rolled up from the packing event log.
+
+    Hours are the scan time (scan_date) of the events. Only the hours touched
+    by events logged since the last run are recomputed (see _cron_refresh);
+    the log itself is never scanned in full.
+    """
+    _name = 'packaging.productivity.hourly'
+    _description = 'Operator Productivity per Hour'
+    _order = 'hour desc, user_id'
+    _log_access = False
+
+    user_id = fields.Many2one('res.users', string='Operator', required=True, readonly=True, ondelete='cascade')
+    hour = fields.Datetime(string='Hour', required=True, readonly=True)
+    packed = fields.Integer(string='Packed', readonly=True)
+    unpacked = fields.Integer(string='Unpacked', readonly=True)
+    gap_count = fields.Integer(string='Scan Gaps', readonly=True)
+    gap_avg = fields.Float(string='Avg Seconds Between Scans', digits=(16, 1), readonly=True, aggregator='avg')
+    gap_median = fields.Float(string='Median Seconds Between Scans', digits=(16, 1), readonly=True, aggregator='avg')
+    first_scan = fields.Datetime(string='First Scan', readonly=True, aggregator='min')
+    last_scan = fields.Datetime(string='Last Scan', readonly=True, aggregator='max')
+
+    _sql_constraints = [
+        ('user_hour_unique', 'unique(user_id, hour)', 'One rollup per operator and hour!'),
+    ]
+
+    @api.model
+    def _cron_refresh(self, date_from=None):
+        """Recompute rollups of the hours and orders with new packing events"""
+        Param = self.env['ir.config_parameter'].sudo()
+        now = fields.Datetime.now()
+        if date_from is None:
+            watermark = Param.get_param(WATERMARK_PARAM)
+            date_from = (fields.Datetime.to_datetime(watermark) - timedelta(minutes=REFRESH_OVERLAP_MINUTES)
+                         if watermark else fields.Datetime.to_datetime('1970-01-01'))
+        start = date_from.replace(minute=0, second=0, microsecond=0)
+        self.env['packaging.scan.log']._flush_buffer()
+
+        hours = self._refresh_hours(start)
+        orders = self.env['packaging.productivity.order']._refresh_orders(start)
+        Param.set_param(WATERMARK_PARAM, fields.Datetime.to_string(now))
+        _logger.info("Productivity rollups refreshed from %s: %d operator hours, %d orders", start, hours, orders)
+        return hours, orders
+
+    @api.model
+    def _refresh_hours(self, start):
+        """Replace operator-hour rows of the scan hours logged since `start`"""
+        self.flush_model()
+        # Офлайн-скан записывается сейчас, но относится к часу сканирования
+        self.env.cr.execute("""
+            SELECT DISTINCT date_trunc('hour', scan_date)
+              FROM packaging_scan_log
+             WHERE event_date >= %s AND event_type IN ('pack', 'unpack') AND user_id IS NOT NULL
+        """, (start,))
+        hours = tuple(row[0] for row in self.env.cr.fetchall())
+        if not hours:
+            return 0
+        self.env.cr.execute("DELETE FROM packaging_productivity_hourly WHERE hour IN %s", (hours,))
+        # Первому скану часа нужен предыдущий скан оператора - читаем журнал с запасом
+        self.env.cr.execute("""
+            INSERT INTO packaging_productivity_hourly
+                   (user_id, hour, packed, unpacked, gap_count, gap_avg, gap_median, first_scan, last_scan)
+            SELECT user_id, date_trunc('hour', scan_date),
+                   count(*) FILTER (WHERE event_type = 'pack'),
+                   count(*) FILTER (WHERE event_type = 'unpack'),
+                   count(gap) FILTER (WHERE gap <= %(break)s),
+                   coalesce(avg(gap) FILTER (WHERE gap <= %(break)s), 0),
+                   coalesce(percentile_cont(0.5) WITHIN GROUP (ORDER BY gap) FILTER (WHERE gap <= %(break)s), 0),
+                   min(scan_date), max(scan_date)
+              FROM (
+                    SELECT user_id, event_type, scan_date,
+                           CASE WHEN event_type = 'pack'
+                                THEN extract(epoch FROM scan_date - lag(scan_date) OVER scans)
+                           END AS gap
+                      FROM packaging_scan_log
+                     WHERE scan_date >= %(lookback)s AND scan_date < %(end)s
+                       AND event_type IN ('pack', 'unpack') AND user_id IS NOT NULL
+                    WINDOW scans AS (PARTITION BY user_id, event_type ORDER BY scan_date, id)
+                   ) events
+             WHERE date_trunc('hour', scan_date) IN %(hours)s
+          GROUP BY user_id, date_trunc('hour', scan_date)
+        """, {
+            'hours': hours,
+            'lookback': min(hours) - timedelta(seconds=SCAN_GAP_BREAK_SECONDS),
+            'end': max(hours) + timedelta(hours=1),
+            'break': SCAN_GAP_BREAK_SECONDS,
+        })
+        count = self.env.cr.rowcount
+        self.invalidate_model()
+        return count
@@ -0,0 +1,83 @@
+from odoo import models, fields, api
+from datetime import timedelta
+
+# Темп заказа - по сканам за последние N минут до последней упаковки
+PACK_RATE_WINDOW_MINUTES = 30
+
+
+class PackagingProductivityOrder(models.Model):
+    """Packing pace of an order, rolled up from the scan times of the packing event log"""
+    _name = 'packaging.productivity.order'
+    _description = 'Order Packing Pace'
+    _order = 'last_pack desc, id desc'
+    _log_access = False
+
+    order_id = fields.Many2one('packaging.order', string='Order', required=True, readonly=True, ondelete='cascade')
+    packed = fields.Integer(string='Pack Scans', readonly=True)
+    unpacked = fields.Integer(string='Unpack Scans', readonly=True)
+    operators = fields.Integer(string='Operators', readonly=True)
+    first_pack = fields.Datetime(string='First Pack', readonly=True)
+    last_pack = fields.Datetime(string='Last Pack', readonly=True)
+    rate_per_hour = fields.Float(string='Items per Hour', digits=(16, 1), readonly=True)
+    eta = fields.Datetime(string='Completion ETA', readonly=True)
+
+    _sql_constraints = [
+        ('order_unique', 'unique(order_id)', 'One pace rollup per order!'),
+    ]
+
+    @api.model
+    def _refresh_orders(self, start):
+        """Recompute the pace of orders with packing events logged since `start`"""
+        self.env.cr.execute("""
+            WITH touched AS (
+                SELECT DISTINCT order_id FROM packaging_scan_log
+                 WHERE event_date >= %(start)s AND event_type IN ('pack', 'unpack')
+            ), events AS (
+                SELECT l.order_id, l.event_type, l.scan_date, l.user_id
+                  FROM packaging_scan_log l
+                  JOIN touched USING (order_id)
+                 WHERE l.event_type IN ('pack', 'unpack')
+            ), last AS (
+                SELECT order_id, max(scan_date) FILTER (WHERE event_type = 'pack') AS last_pack
+                  FROM events GROUP BY order_id
+            )
+            SELECT e.order_id,
+                   count(*) FILTER (WHERE e.event_type = 'pack'),
+                   count(*) FILTER (WHERE e.event_type = 'unpack'),
+                   count(DISTINCT e.user_id) FILTER (WHERE e.event_type = 'pack'),
+                   min(e.scan_date) FILTER (WHERE e.event_type = 'pack'),
+                   last.last_pack,
+                   count(*) FILTER (WHERE e.event_type = 'pack' AND e.scan_date >= last.last_pack - %(window)s),
+                   min(e.scan_date) FILTER (WHERE e.event_type = 'pack' AND e.scan_date >= last.last_pack - %(window)s)
+              FROM events e
+              JOIN last USING (order_id)
+          GROUP BY e.order_id, last.last_pack
+        """, {'start': start, 'window': timedelta(minutes=PACK_RATE_WINDOW_MINUTES)})
+        rows = self.env.cr.fetchall()
+        orders = self.env['packaging.order'].browse([row[0] for row in rows]).exists()
+        existing = set(orders.ids)
+
+        vals_list = []
+        for order_id, packed, unpacked, operators, first_pack, last_pack, recent, recent_first in rows:
+            if order_id not in existing:
+                continue
+            order = orders.browse(order_id)
+            rate = eta = False
+            if recent > 1 and last_pack > recent_first:
+                rate = (recent - 1) / ((last_pack - recent_first).total_seconds() / 3600)
+                remaining = order.total_items - order.packed_items
+                if remaining > 0:
+                    eta = last_pack + timedelta(hours=remaining / rate)
+            vals_list.append({
+                'order_id': order_id,
+                'packed': packed,
+                'unpacked': unpacked,
+                'operators': operators,
+                'first_pack': first_pack,
+                'last_pack': last_pack,
+                'rate_per_hour': rate or 0.0,
+                'eta': eta,
+            })
+        self.search([('order_id', 'in', orders.ids)]).unlink()
+        self.create(vals_list)
+        return len(vals_list)
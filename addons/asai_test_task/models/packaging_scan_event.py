@@ -0,0 +1,164 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+from datetime import datetime, timezone
+import logging
+import time
+
+from .. import metrics
+from ..savepoints import buffered_savepoint
+from .. import tracing
+
+_logger = logging.getLogger(__name__)
+
+SYNC_BATCH_LIMIT = 5000
+
+
+class PackagingScanEvent(models.Model):
+    _name = 'packaging.scan.event'
+    _description = 'Scanner Event'
+    _order = 'id'
+
+    uuid = fields.Char(string='Event UUID', required=True, readonly=True)
+    event_type = fields.Selection([
+        ('pack', 'Pack'),
+        ('unpack', 'Unpack'),
+        ('defect', 'Defect'),
+    ], string='Event Type', required=True, readonly=True)
+    order_name = fields.Char(string='Order Number', readonly=True)
+    item_code = fields.Char(string='Item Code', readonly=True)
+    order_id = fields.Many2one('packaging.order', string='Order', index=True, ondelete='set null', readonly=True)
+    item_id = fields.Many2one('packaging.item', string='Item', ondelete='set null', readonly=True)
+    client_date = fields.Datetime(string='Scanned At', readonly=True)
+    device = fields.Char(string='Device', index=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='Operator', readonly=True)
+    state = fields.Selection([
+        ('new', 'New'),
+        ('applied', 'Applied'),
+        ('rejected', 'Rejected'),
+    ], string='Status', default='new', readonly=True)
+    message = fields.Char(string='Message', readonly=True)
+
+    _sql_constraints = [
+        ('uuid_unique', 'unique(uuid)', 'Scan event UUID must be unique!'),
+    ]
+
+    # ========== SYNC ==========
+    @api.model
+    @tracing.traced()
+    def sync_events(self, events, device=None):
+        """Apply a batch of buffered scanner events exactly once.
+
+        `events` is a list of dicts with uuid, type, order, code, timestamp.
+        Already known UUIDs are not applied again, their stored result is
+        returned. Returns {'cursor': last event id, 'results': [...]}.
+        """
+        if len(events) > SYNC_BATCH_LIMIT:
+            raise UserError(_("Too many events in one batch (max %d)") % SYNC_BATCH_LIMIT)
+        events = [self._normalize_event(event) for event in events]
+        if not events:
+            return {'cursor': False, 'results': []}
+
+        inserted = self._insert_new_events(events, device)
+        all_events = self.search([('uuid', 'in', [event['uuid'] for event in events])])
+        by_uuid = {event.uuid: event for event in all_events}
+
+        # Новые события применяем в порядке времени сканирования на устройстве
+        new_events = all_events.filtered(lambda event: event.id in inserted)
+        for event in new_events.sorted(lambda event: (event.client_date or fields.Datetime.now(), event.id)):
+            event._apply()
+
+        results = []
+        for event in events:
+            record = by_uuid[event['uuid']]
+            results.append({
+                'uuid': record.uuid,
+                'id': record.id,
+                'status': record.state if record.id in inserted else 'duplicate',
+                'result': record.state,
+                'message': record.message or '',
+            })
+        return {'cursor': max(all_events.ids), 'results': results}
+
+    @api.model
+    def _normalize_event(self, event):
+        uuid = (event.get('uuid') or '').strip()
+        event_type = event.get('type')
+        if not uuid:
+            raise UserError(_("Scan event without UUID"))
+        if event_type not in dict(self._fields['event_type'].selection):
+            raise UserError(_("Unknown scan event type: %s") % event_type)
+        client_date = False
+        if event.get('timestamp'):
+            try:
+                client_date = datetime.fromisoformat(str(event['timestamp']).replace('Z', '+00:00'))
+            except ValueError:
+                raise UserError(_("Invalid timestamp of scan event %s") % uuid)
+            if client_date.tzinfo:
+                client_date = client_date.astimezone(timezone.utc).replace(tzinfo=None)
+        return {
+            'uuid': uuid,
+            'event_type': event_type,
+            'order_name': str(event.get('order') or '').strip(),
+            'item_code': str(event.get('code') or '').strip(),
+            'client_date': client_date,
+        }
+
+    @api.model
+    def _insert_new_events(self, events, device):
+        """Multi-row insert, duplicates are skipped by the uuid unique index"""
+        self.flush_model()
+        rows = SQL(", ").join(
+            SQL(
+                "(%s, %s, %s, %s, %s, %s, %s, 'new', %s, %s, now() at time zone 'UTC', now() at time zone 'UTC')",
+                event['uuid'], event['event_type'], event['order_name'], event['item_code'],
+                event['client_date'] or None, device, self.env.uid, self.env.uid, self.env.uid,
+            )
+            for event in events
+        )
+        self.env.cr.execute(SQL("""
+            INSERT INTO packaging_scan_event (uuid, event_type, order_name, item_code, client_date,
+                                              device, user_id, state, create_uid, write_uid,
+                                              create_date, write_date)
+            VALUES %s
+            ON CONFLICT (uuid) DO NOTHING
+            RETURNING id
+        """, rows))
+        inserted = {row[0] for row in self.env.cr.fetchall()}
+        self.invalidate_model()
+        return inserted
+
+    @tracing.traced()
+    def _apply(self):
+        """Apply one event to its item; errors are stored, not raised"""
+        self.ensure_one()
+        start = time.perf_counter()
+        try:
+            # Журнал и live-уведомления пишутся один раз на пачку, а не на событие
+            with buffered_savepoint(self.env):
+                order = self.env['packaging.scan.router']._lookup_order(self.order_name)
+                if not order:
+                    raise UserError(_("Order with number %s not found!") % self.order_name)
+                if order.reset_pending:
+                    raise UserError(_("Packing reset of order %s is in progress, please wait") % order.name)
+                item = order._find_item_by_code(self.item_code)
+                if not item:
+                    raise UserError(_("Item with code %s not found in this order") % self.item_code)
+                if self.event_type == 'pack':
+                    # Повторная упаковка не ошибка: результат тот же
+                    if not item.is_packed:
+                        item.write({'is_packed': True, 'pack_date': self.client_date or fields.Datetime.now()})
+                elif self.event_type == 'unpack':
+                    if item.is_packed:
+                        item.action_mark_as_unpacked()
+                elif not item.is_defective:
+                    item.write({
+                        'is_defective': True,
+                        'defective_reason': _('Reported by scanner %s') % (self.device or ''),
+                        'defective_date': self.client_date or fields.Datetime.now(),
+                        'defective_operator_id': self.user_id.id,
+                    })
+                self.write({'state': 'applied', 'order_id': order.id, 'item_id': item.id})
+            metrics.SCAN_SECONDS.observe(time.perf_counter() - start, source='scanner')
+        except UserError as e:
+            self.write({'state': 'rejected', 'message': str(e)})
@@ -0,0 +1,157 @@
+from odoo import models, fields, api
+from odoo.tools import SQL
+from dateutil.relativedelta import relativedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+LOG_PRECOMMIT_KEY = 'asai_test_task.scan_log_buffer'
+# Сколько месячных партиций держать созданными заранее
+PARTITIONS_AHEAD = 2
+
+
+class PackagingScanLog(models.Model):
+    """Append-only history of item packing events.
+
+    The table is created by hand (PARTITION BY RANGE on event_date, one
+    partition per month), the ORM only reads it. Rows are buffered during the
+    transaction and written with one multi-row INSERT before commit.
+    """
+    _name = 'packaging.scan.log'
+    _description = 'Packing Event Log'
+    _auto = False
+    _log_access = False
+    _order = 'event_date desc, id desc'
+
+    event_date = fields.Datetime(string='Date', readonly=True)
+    event_type = fields.Selection([
+        ('pack', 'Pack'),
+        ('unpack', 'Unpack'),
+        ('defect', 'Defect'),
+        ('defect_clear', 'Defect Cleared'),
+        ('reset', 'Order Reset'),
+    ], string='Event', readonly=True)
+    order_id = fields.Many2one('packaging.order', string='Order', readonly=True)
+    item_id = fields.Many2one('packaging.item', string='Item', readonly=True)
+    user_id = fields.Many2one('res.users', string='Operator', readonly=True)
+    # Время скана у оператора (pack_date, для офлайн-сканов - время устройства);
+    # event_date - время записи, по нему идут партиции и порядок журнала
+    scan_date = fields.Datetime(string='Scanned At', readonly=True)
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute("CREATE SEQUENCE IF NOT EXISTS packaging_scan_log_id_seq")
+        cr.execute("""
+            CREATE TABLE IF NOT EXISTS packaging_scan_log (
+                id bigint NOT NULL DEFAULT nextval('packaging_scan_log_id_seq'),
+                event_date timestamp without time zone NOT NULL,
+                event_type varchar NOT NULL,
+                order_id integer NOT NULL,
+                item_id integer,
+                user_id integer,
+                scan_date timestamp without time zone,
+                PRIMARY KEY (id, event_date)
+            ) PARTITION BY RANGE (event_date)
+        """)
+        cr.execute("ALTER TABLE packaging_scan_log ADD COLUMN IF NOT EXISTS scan_date timestamp without time zone")
+        cr.execute("UPDATE packaging_scan_log SET scan_date = event_date WHERE scan_date IS NULL")
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS packaging_scan_log_order_id_index
+                ON packaging_scan_log (order_id, event_date, id)
+        """)
+        # Свёртки производительности: новые события - по event_date, пересчет часов - по scan_date
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS packaging_scan_log_event_date_index
+                ON packaging_scan_log (event_date)
+        """)
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS packaging_scan_log_scan_date_index
+                ON packaging_scan_log (scan_date)
+        """)
+        cr.execute("CREATE TABLE IF NOT EXISTS packaging_scan_log_default PARTITION OF packaging_scan_log DEFAULT")
+        self._ensure_partitions()
+
+    # ========== PARTITIONS ==========
+    @api.model
+    def _ensure_partitions(self, months_ahead=PARTITIONS_AHEAD):
+        """Create monthly partitions for the current and next months"""
+        month = fields.Datetime.now().date().replace(day=1)
+        for _i in range(months_ahead + 1):
+            next_month = month + relativedelta(months=1)
+            name = 'packaging_scan_log_%s' % month.strftime('%Y%m')
+            try:
+                with self.env.cr.savepoint(flush=False):
+                    self.env.cr.execute(SQL(
+                        "CREATE TABLE IF NOT EXISTS %s PARTITION OF packaging_scan_log FOR VALUES FROM (%s) TO (%s)",
+                        SQL.identifier(name), month, next_month,
+                    ))
+            except Exception as e:
+                # Например, в DEFAULT уже лежат строки этого месяца
+                _logger.warning("Cannot create scan log partition %s: %s", name, e)
+            month = next_month
+
+    @api.model
+    def _cron_ensure_partitions(self):
+        self._ensure_partitions()
+
+    # ========== WRITING ==========
+    @api.model
+    def _log_events(self, events):
+        """Buffer events (event_type, order_id, item_id[, scan_date]) until commit"""
+        if not events:
+            return
+        data = self.env.cr.precommit.data
+        buffer = data.get(LOG_PRECOMMIT_KEY)
+        if buffer is None:
+            buffer = data[LOG_PRECOMMIT_KEY] = []
+            self.env.cr.precommit.add(self._flush_buffer)
+        now = fields.Datetime.now()
+        uid = self.env.uid
+        for event in events:
+            event_type, order_id, item_id = event[:3]
+            scan_date = event[3] if len(event) > 3 else None
+            buffer.append((now, event_type, order_id, item_id, uid, scan_date or now))
+
+    @api.model
+    def _flush_buffer(self):
+        """Write buffered events with one multi-row INSERT"""
+        buffer = self.env.cr.precommit.data.pop(LOG_PRECOMMIT_KEY, None)
+        if not buffer:
+            return
+        self.env.cr.execute(SQL(
+            "INSERT INTO packaging_scan_log (event_date, event_type, order_id, item_id, user_id, scan_date) VALUES %s",
+            SQL(", ").join(SQL("(%s, %s, %s, %s, %s, %s)", *row) for row in buffer),
+        ))
+
+    # ========== REPLAY ==========
+    @api.model
+    def _replay(self, orders):
+        """Derive item and order state from the log.
+
+        Returns {order_id: {'packed': n, 'defective': n, 'items': {item_id: (packed, defective)}}}.
+        """
+        self._flush_buffer()
+        result = {order.id: {'packed': 0, 'defective': 0, 'items': {}} for order in orders}
+        if not result:
+            return result
+        self.env.cr.execute("""
+            SELECT order_id, item_id, event_type
+              FROM packaging_scan_log
+             WHERE order_id IN %s
+          ORDER BY event_date, id
+        """, (tuple(result),))
+        for order_id, item_id, event_type in self.env.cr.fetchall():
+            items = result[order_id]['items']
+            if event_type == 'reset':
+                items.clear()
+                continue
+            packed, defective = items.get(item_id, (False, False))
+            if event_type in ('pack', 'unpack'):
+                packed = event_type == 'pack'
+            else:
+                defective = event_type == 'defect'
+            items[item_id] = (packed, defective)
+        for state in result.values():
+            state['packed'] = sum(1 for packed, _defective in state['items'].values() if packed)
+            state['defective'] = sum(1 for _packed, defective in state['items'].values() if defective)
+        return result
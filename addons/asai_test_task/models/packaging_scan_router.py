@@ -0,0 +1,89 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import re
+
+LABEL_NUMBER_RE = re.compile(r'^L\d+$')
+ORDER_NUMBER_RE = re.compile(r'^\d+$')
+
+
+class PackagingScanRouter(models.TransientModel):
+    _name = 'packaging.scan.router'
+    _description = 'Scan Router'
+
+    code = fields.Char(string='Scanned Code', required=True)
+    order_id = fields.Many2one('packaging.order', string='Current Order')
+
+    @api.model
+    def default_get(self, fields):
+        res = super().default_get(fields)
+        if self._context.get('active_model') == 'packaging.order' and self._context.get('active_id'):
+            res['order_id'] = self._context['active_id']
+        return res
+
+    def action_route(self):
+        """Route scanned code to the matching action"""
+        self.ensure_one()
+        return self.route_scan(self.code, order=self.order_id)
+
+    # ========== ROUTING ==========
+    @api.model
+    def classify_code(self, code):
+        """Return 'label', 'order' or 'item' for a scanned string"""
+        if LABEL_NUMBER_RE.match(code):
+            return 'label'
+        if ORDER_NUMBER_RE.match(code):
+            return 'order'
+        return 'item'
+
+    @api.model
+    def route_scan(self, code, order=None):
+        """Resolve scanned code and return the action to execute"""
+        code = (code or '').strip()
+        if not code:
+            raise UserError(_("Please scan or enter a code"))
+        order = order or self.env['packaging.order']
+
+        kind = self.classify_code(code)
+        if kind == 'label':
+            label = self._lookup_label(code)
+            if not label:
+                raise UserError(_("Label %s not found!") % code)
+            return label.order_id.action_open_order()
+
+        if kind == 'order':
+            # Цифровой код товара открытого заказа важнее номера другого заказа
+            if order and order._find_item_by_code(code):
+                return order._quick_pack_code(code)
+            found = self._lookup_order(code)
+            if found:
+                return found.action_open_order()
+            if not order:
+                if self.env['packaging.order.archive'].search_count([('name', '=', code)], limit=1):
+                    raise UserError(_("Order %s is archived, see Order Archive") % code)
+                raise UserError(_("Order with number %s not found!") % code)
+
+        if order:
+            return order._quick_pack_code(code)
+
+        item = self._lookup_item(code)
+        if not item:
+            raise UserError(_("Item with code %s not found!") % code)
+        return item.order_id.action_open_order()
+
+    # ========== INDEXED LOOKUPS ==========
+    @api.model
+    def _lookup_order(self, name):
+        """Find order by number (packaging_order.name index)"""
+        return self.env['packaging.order'].search([('name', '=', name)], limit=1)
+
+    @api.model
+    def _lookup_label(self, name):
+        """Find label by number (packaging_label.name index)"""
+        return self.env['packaging.label'].search([('name', '=', name)], limit=1)
+
+    @api.model
+    def _lookup_item(self, item_code):
+        """Find item by code across orders, unpacked items first (packaging_item.item_code index)"""
+        return self.env['packaging.item'].search(
+            [('item_code', '=', item_code)], order='is_packed, id', limit=1
+        )
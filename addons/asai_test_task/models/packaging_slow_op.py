@@ -0,0 +1,46 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import json
+import logging
+
+_logger = logging.getLogger(__name__)
+
+SLOW_OP_KEEP_DAYS = 30
+
+
+class PackagingSlowOp(models.Model):
+    _name = 'packaging.slow.op'
+    _description = 'Slow Packing Operation'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(string='Operation', required=True, index=True, readonly=True)
+    res_ids = fields.Char(string='Record IDs', readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    duration_ms = fields.Float(string='Duration (ms)', digits=(16, 1), readonly=True)
+    query_count = fields.Integer(string='Queries', readonly=True)
+    sql_ms = fields.Float(string='SQL Time (ms)', digits=(16, 1), readonly=True)
+    python_ms = fields.Float(string='Python Time (ms)', digits=(16, 1), readonly=True)
+    steps = fields.Text(string='Steps', readonly=True)
+    create_date = fields.Datetime(index=True)
+
+    @api.model
+    def _record(self, span, res_ids=()):
+        """Store a finished root span"""
+        data = span.to_dict()
+        _logger.info("Slow packing operation %s: %.1f ms, %d queries", data['name'], data['ms'], data['queries'])
+        return self.create({
+            'name': data['name'],
+            'res_ids': ','.join(str(res_id) for res_id in res_ids[:50]),
+            'user_id': self.env.uid,
+            'duration_ms': data['ms'],
+            'query_count': data['queries'],
+            'sql_ms': data['sql_ms'],
+            'python_ms': data['python_ms'],
+            'steps': json.dumps(data['steps'], indent=2),
+        })
+
+    @api.autovacuum
+    def _gc_slow_ops(self):
+        """Drop traces older than SLOW_OP_KEEP_DAYS"""
+        limit_date = fields.Datetime.now() - timedelta(days=SLOW_OP_KEEP_DAYS)
+        self.search([('create_date', '<', limit_date)]).unlink()
@@ -0,0 +1,52 @@
+from odoo import models, fields
+import hashlib
+import hmac
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_POOL_SIZE = 10
+
+# Сессия на поток: соединения с получателями переиспользуются между запусками cron
+_local = threading.local()
+
+
+def _session():
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=WEBHOOK_POOL_SIZE, pool_maxsize=WEBHOOK_POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
+
+
+class PackagingWebhook(models.Model):
+    _name = 'packaging.webhook'
+    _description = 'Packaging Webhook'
+    _order = 'id'
+
+    name = fields.Char(string='Name', required=True)
+    url = fields.Char(string='URL', required=True)
+    secret = fields.Char(string='Secret', help='Signs request bodies: X-Packaging-Signature: sha256=<HMAC>')
+    active = fields.Boolean(string='Active', default=True)
+    pending_count = fields.Integer(string='Pending Events', compute='_compute_pending_count')
+
+    def _compute_pending_count(self):
+        counts = dict(self.env['packaging.outbox.event']._read_group(
+            [('webhook_id', 'in', self.ids), ('state', '=', 'pending')], ['webhook_id'], ['__count'],
+        ))
+        for webhook in self:
+            webhook.pending_count = counts.get(webhook, 0)
+
+    def _post(self, body):
+        """POST a JSON body, raises on network errors and non-2xx answers"""
+        self.ensure_one()
+        headers = {'Content-Type': 'application/json'}
+        if self.secret:
+            digest = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            headers['X-Packaging-Signature'] = f'sha256={digest}'
+        response = _session().post(self.url, data=body, headers=headers, timeout=WEBHOOK_TIMEOUT)
+        response.raise_for_status()
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Savepoints that keep the per-transaction precommit buffers.
+
+A flushing savepoint (cr.savepoint()) calls cr.flush(), which also runs the
+precommit hooks: the scan log, state log and live update buffers would be
+written once per savepoint instead of once per transaction. This savepoint
+flushes only the ORM, and on rollback restores the buffers as they were
+when it was entered.
+"""
+import copy
+from contextlib import contextmanager
+
+
+@contextmanager
+def buffered_savepoint(env):
+    env.flush_all()
+    data = env.cr.precommit.data
+    snapshot = {key: copy.copy(value) for key, value in data.items()}
+    try:
+        with env.cr.savepoint(flush=False):
+            yield
+            env.flush_all()
+    except Exception:
+        # Как при откате flushing savepoint: кэш и несохраненные изменения сбрасываются,
+        # но буферы возвращаются к состоянию на входе, а не очищаются
+        env.transaction.clear()
+        data.clear()
+        data.update(snapshot)
+        raise
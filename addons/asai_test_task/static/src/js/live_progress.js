@@ -0,0 +1,151 @@
+/** @odoo-module **/
+
+import { _t } from "@web/core/l10n/translation";
+import { user } from "@web/core/user";
+import { patch } from "@web/core/utils/patch";
+import { useService } from "@web/core/utils/hooks";
+import { ListController } from "@web/views/list/list_controller";
+import { FormController } from "@web/views/form/form_controller";
+import { onWillUnmount, useEffect } from "@odoo/owl";
+
+const NOTIFICATION = "packaging.progress";
+const LIST_CHANNEL = "packaging_order_list";
+const ORDER_CHANNEL = "packaging_order_";
+const STATION_CHANNEL = "packaging_station_";
+const LIVE_FIELDS = ["state", "total_items", "packed_items", "defective_items", "progress"];
+// Всплески событий применяются пачкой не чаще раза в FLUSH_DELAY мс
+const FLUSH_DELAY = 300;
+
+/**
+ * Subscribe a view to order progress pushed over the bus. Bursts are batched
+ * and handled one at a time: the next batch waits for a previous reload.
+ */
+function useLiveProgress(getChannels, onOrders) {
+    const busService = useService("bus_service");
+    let pending = new Map();
+    let timer = null;
+    let running = false;
+    let destroyed = false;
+
+    const schedule = () => {
+        if (!timer && !running && !destroyed && pending.size) {
+            timer = setTimeout(flush, FLUSH_DELAY);
+        }
+    };
+    const flush = async () => {
+        timer = null;
+        running = true;
+        const orders = [...pending.values()];
+        pending = new Map();
+        try {
+            await onOrders(orders);
+        } finally {
+            running = false;
+            schedule();
+        }
+    };
+    const onProgress = (payload) => {
+        for (const order of payload.orders) {
+            pending.set(order.id, order);
+        }
+        schedule();
+    };
+
+    busService.subscribe(NOTIFICATION, onProgress);
+    useEffect(
+        (...channels) => {
+            for (const channel of channels) {
+                busService.addChannel(channel);
+            }
+            return () => {
+                for (const channel of channels) {
+                    busService.deleteChannel(channel);
+                }
+            };
+        },
+        () => getChannels()
+    );
+    onWillUnmount(() => {
+        destroyed = true;
+        clearTimeout(timer);
+        busService.unsubscribe(NOTIFICATION, onProgress);
+    });
+}
+
+/**
+ * Copy the pushed values into the fields of a loaded record. Records with
+ * unsaved changes are left alone: the operator's edit wins.
+ */
+function patchRecord(record, order) {
+    if (record.dirty || record.isInEdition) {
+        return;
+    }
+    for (const fieldName of LIVE_FIELDS) {
+        if (fieldName in record.data) {
+            record.data[fieldName] = order[fieldName];
+        }
+    }
+}
+
+patch(ListController.prototype, {
+    setup() {
+        super.setup(...arguments);
+        if (this.props.resModel !== "packaging.order") {
+            return;
+        }
+        useLiveProgress(
+            () => [LIST_CHANNEL],
+            async (orders) => {
+                const root = this.model.root;
+                const shown = new Map(root.records.map((record) => [record.resId, record]));
+                let missing = false;
+                for (const order of orders) {
+                    const record = shown.get(order.id);
+                    if (record) {
+                        patchRecord(record, order);
+                    } else {
+                        missing = true;
+                    }
+                }
+                // Заказа нет на странице: перечитываем, только если страница не заполнена
+                // и он может на ней появиться; строка в редактировании важнее
+                if (missing && !root.editedRecord && root.records.length < root.limit) {
+                    await root.load();
+                }
+            }
+        );
+    },
+});
+
+patch(FormController.prototype, {
+    setup() {
+        super.setup(...arguments);
+        if (this.props.resModel !== "packaging.order") {
+            return;
+        }
+        const notification = useService("notification");
+        const lastStates = new Map();
+        useLiveProgress(
+            () => [`${ORDER_CHANNEL}${this.model.root.resId}`, `${STATION_CHANNEL}${user.userId}`],
+            async (orders) => {
+                const root = this.model.root;
+                for (const order of orders) {
+                    if (order.id === root.resId) {
+                        // Новая этикетка - связь many2one, ее приносит только перечитывание
+                        const label = root.data.last_label_id && root.data.last_label_id.display_name;
+                        if (order.last_label !== (label || false) && !root.dirty) {
+                            await root.load();
+                        } else {
+                            patchRecord(root, order);
+                        }
+                    } else if (lastStates.has(order.id) && lastStates.get(order.id) !== order.state) {
+                        notification.add(_t("Order %(name)s: %(state)s", { name: order.name, state: order.state }), {
+                            type: order.state === "defective" ? "danger" : "info",
+                        });
+                    }
+                    lastStates.set(order.id, order.state);
+                }
+            }
+        );
+    },
+});
@@ -1 +1,3 @@
-from . import test_packaging
\ No newline at end of file
+from . import test_packaging
+from . import test_performance
+from . import test_query_counts
\ No newline at end of file
@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
+from odoo import fields
 from odoo.tests import tagged, TransactionCase
+from odoo.tools import mute_logger
 from odoo.exceptions import UserError, ValidationError
 from datetime import datetime, timedelta
 import base64
+import gzip
 import io
 import csv
+import json
+import threading
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from psycopg2 import IntegrityError
 
 
 @tagged('post_install', '-at_install', 'asai_test_task')
@@ -403,9 +411,9 @@ class TestPackagingModule(TransactionCase):
         print(f"Packed items: {order.packed_items}/{order.total_items}")
         print(f"Labels: {len(order.label_ids)}")
         
-        # Если состояние 'completed', но этикетки нет, вызываем обработчик вручную
-        if order.state == 'completed' and not order.label_ids:
-            order._handle_completed_order()
+        # Этикетки завершенных заказов печатаются при коммите
+        self.assertFalse(order.label_ids)
+        self.env.cr.precommit.run()
         
         # Проверяем, создалась ли этикетка
         self.assertEqual(order.state, 'completed')
@@ -473,4 +481,978 @@ class TestPackagingModule(TransactionCase):
         self.assertEqual(len(completed_orders), 1)
         
         defective_orders = self.env['packaging.order'].search([('state', '=', 'defective')])
-        self.assertEqual(len(defective_orders), 1)
\ No newline at end of file
+        self.assertEqual(len(defective_orders), 1)
+
+    def test_20_scan_router(self):
+        """Test scan router classification and routing"""
+        router = self.env['packaging.scan.router']
+        self.assertEqual(router.classify_code('L000123'), 'label')
+        self.assertEqual(router.classify_code('00042'), 'order')
+        self.assertEqual(router.classify_code('ITEM-001'), 'item')
+
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        item = self.env['packaging.item'].create({
+            'order_id': order.id,
+            'product_name': 'Test Product',
+            'item_code': 'SCAN001',
+        })
+        self.env['packaging.item'].create({
+            'order_id': order.id,
+            'product_name': 'Test Product 2',
+            'item_code': 'SCAN002',
+        })
+
+        # Номер заказа открывает заказ
+        action = router.route_scan(order.name)
+        self.assertEqual(action['res_id'], order.id)
+
+        # Код товара без заказа открывает заказ товара
+        action = router.route_scan('SCAN001')
+        self.assertEqual(action['res_id'], order.id)
+        self.assertFalse(item.is_packed)
+
+        # Код товара в контексте заказа упаковывает товар
+        wizard = router.with_context(active_model='packaging.order', active_id=order.id).create({
+            'code': ' SCAN001 ',
+        })
+        self.assertEqual(wizard.order_id, order)
+        wizard.action_route()
+        self.assertTrue(item.is_packed)
+
+        # Цифровой код товара в заказе упаковывает товар, даже если совпадает с номером другого заказа
+        other = self.env['packaging.order'].create({'responsible_id': self.user.id, 'auto_print_labels': False})
+        digit_item = self.env['packaging.item'].create({
+            'order_id': order.id,
+            'product_name': 'Digit Product',
+            'item_code': other.name,
+        })
+        router.route_scan(other.name, order=order)
+        self.assertTrue(digit_item.is_packed)
+        action = router.route_scan(other.name)
+        self.assertEqual(action['res_id'], other.id)
+
+        # Номер этикетки открывает заказ этикетки
+        label = self.env['packaging.label'].create({'order_id': order.id})
+        action = router.route_scan(label.name)
+        self.assertEqual(action['res_id'], order.id)
+
+        with self.assertRaises(UserError):
+            router.route_scan('UNKNOWN-CODE')
+
+
+    def test_21_order_number_unique(self):
+        """Test order number uniqueness"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+        })
+        with mute_logger('odoo.sql_db'), self.assertRaises(IntegrityError):
+            self.env['packaging.order'].create({
+                'name': order.name,
+                'responsible_id': self.user.id,
+            })
+            self.env.flush_all()
+
+    def test_22_progress_stored(self):
+        """Test stored progress is searchable and sortable"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'PROG{i:02d}',
+        } for i in range(20)])
+
+        stalled = [('progress', '<', 10), ('total_items', '>', 0), ('id', '=', order.id)]
+        self.assertEqual(self.env['packaging.order'].search(stalled), order)
+
+        items[:19].action_mark_as_packed()
+        self.assertAlmostEqual(order.progress, 95.0, places=2)
+        self.assertFalse(self.env['packaging.order'].search(stalled))
+        self.assertEqual(
+            self.env['packaging.order'].search([('progress', '>', 90), ('id', '=', order.id)]),
+            order
+        )
+        ranked = self.env['packaging.order'].search([], order='progress desc', limit=1)
+        self.assertGreaterEqual(ranked.progress, order.progress)
+
+    def test_23_order_archiving(self):
+        """Test archiving of old closed orders"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+        })
+        self.env['packaging.item'].create({
+            'order_id': order.id,
+            'product_name': 'Test Product',
+            'item_code': 'ARCH001',
+        }).action_mark_as_packed()
+        self.assertEqual(order.state, 'completed')
+        self.assertTrue(order.closed_date)
+        self.env.cr.precommit.run()
+        self.assertEqual(len(order.label_ids), 1)
+        # Запись того же статуса не сдвигает дату закрытия
+        closed_date = order.closed_date - timedelta(days=1)
+        order.closed_date = closed_date
+        order.write({'state': 'completed', 'priority': '1'})
+        self.assertEqual(order.closed_date, closed_date)
+        self.assertEqual(order.priority, '1')
+        order_name = order.name
+
+        fresh = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+        })
+        fresh.action_cancel_order()
+
+        # Свежие заказы не архивируются
+        Archive = self.env['packaging.order.archive']
+        self.assertEqual(Archive._cron_archive_orders(days=30, auto_commit=False), 0)
+
+        order.closed_date = datetime.now() - timedelta(days=31)
+        self.assertEqual(Archive._cron_archive_orders(days=30, auto_commit=False), 1)
+        self.assertFalse(order.exists())
+        self.assertTrue(fresh.exists())
+
+        archived = Archive.search_archive(order_name)
+        self.assertEqual(len(archived), 1)
+        self.assertEqual(archived.state, 'completed')
+        self.assertEqual(archived.get_items()[0]['item_code'], 'ARCH001')
+        self.assertTrue(archived.label_archive)
+        self.assertEqual(Archive.search_archive('ARCH001'), archived)
+
+        with self.assertRaises(UserError):
+            self.env['packaging.scan.router'].route_scan(order_name)
+
+    def test_24_mass_state_actions(self):
+        """Test set-based state actions on many orders"""
+        orders = self.env['packaging.order'].create([{
+            'responsible_id': self.user.id,
+        } for _i in range(25)])
+
+        orders.action_mark_completed()
+        self.assertEqual(set(orders.mapped('state')), {'completed'})
+        # Ручное завершение этикетки не печатает
+        self.assertFalse(orders.label_ids)
+        self.assertFalse(any(orders.mapped('label_pending')))
+
+        # Больше LABEL_INLINE_LIMIT заказов завершены упаковкой в одной транзакции -
+        # этикетки уходят в очередь одним набором при коммите
+        orders.action_reset_to_draft()
+        self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': 'Test Product',
+            'item_code': f'LBL{order.id}',
+        } for order in orders]).action_mark_as_packed()
+        self.assertEqual(set(orders.mapped('state')), {'completed'})
+        self.assertFalse(any(orders.mapped('label_pending')))
+        self.env.cr.precommit.run()
+        self.assertTrue(all(orders.mapped('label_pending')))
+        self.assertFalse(orders.label_ids)
+
+        # Заказ с ошибкой этикетки остается в очереди до следующего запуска
+        Label = type(self.env['packaging.label'])
+        generate = Label._generate_pdf_label
+
+        def generate_or_fail(label):
+            if label.order_id == orders[0]:
+                raise UserError("Printer offline")
+            return generate(label)
+
+        with patch.object(Label, '_generate_pdf_label', generate_or_fail), \
+                mute_logger('odoo.addons.asai_test_task.models.packaging_order'):
+            processed = self.env['packaging.order']._cron_process_label_queue(auto_commit=False)
+        self.assertEqual(processed, 24)
+        self.assertEqual(len(orders.label_ids), 24)
+        self.assertEqual(orders.filtered('label_pending'), orders[0])
+
+        self.assertEqual(self.env['packaging.order']._cron_process_label_queue(auto_commit=False), 1)
+        self.assertEqual(len(orders.label_ids), 25)
+        self.assertFalse(any(orders.mapped('label_pending')))
+
+        # Одна недопустимая запись блокирует всю операцию
+        with self.assertRaises(UserError):
+            (orders | self.env['packaging.order'].create({'responsible_id': self.user.id})).action_reset_to_draft()
+
+        orders.action_reset_to_draft()
+        orders.action_cancel_order()
+        self.assertEqual(set(orders.mapped('state')), {'canceled'})
+
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': 'Test Product',
+            'item_code': f'MASS{order.id}',
+        } for order in orders[:3]])
+        items.action_mark_defective_simple()
+        self.assertTrue(all(items.mapped('is_defective')))
+
+
+    def test_25_chunked_reset_packing(self):
+        """Test chunked, resumable packing reset"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'CHUNK{i}',
+        } for i in range(7)])
+        items[:5].action_mark_as_packed()
+        self.assertEqual(order.state, 'in_progress')
+
+        # Имитируем большой заказ: сброс уходит в очередь
+        order.reset_pending = True
+        with self.assertRaises(UserError):
+            order._quick_pack_code('CHUNK6')
+        with self.assertRaises(UserError):
+            items[5].action_mark_as_packed()
+        with self.assertRaises(UserError):
+            items[6].action_mark_defective_simple()
+        wizard = self.env['packaging.item.defective.wizard'].create({
+            'item_id': items[6].id,
+            'defective_reason': 'Dent',
+        })
+        with self.assertRaises(UserError):
+            wizard.action_confirm_defective()
+
+        processed = self.env['packaging.order']._cron_process_reset_queue(chunk_size=2, auto_commit=False)
+        self.assertEqual(processed, 1)
+        self.assertFalse(order.reset_pending)
+        self.assertEqual(order.state, 'draft')
+        self.assertEqual(order.packed_items, 0)
+        self.assertFalse(any(items.mapped('is_packed')))
+        self.assertFalse(any(items.mapped('pack_date')))
+
+
+    def test_26_progress_deltas(self):
+        """Test counters folded from progress deltas"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'DELTA{i}',
+        } for i in range(3)])
+        Delta = self.env['packaging.order.progress.delta']
+        # Нулевые дельты не пишутся и не сворачиваются
+        self.assertFalse(Delta._record({order.id: (0, 0)}))
+
+        items[0].action_mark_as_packed()
+        self.assertEqual(order.packed_items, 1)
+        self.assertEqual(order.state, 'in_progress')
+        # Свёрнутые дельты удаляются
+        self.assertFalse(Delta.search([('order_id', '=', order.id)]))
+
+        # Дельта, оставленная параллельным сканом, сворачивается cron'ом
+        Delta.create({'order_id': order.id, 'packed_delta': 2})
+        self.env['packaging.order']._cron_fold_progress_deltas()
+        self.assertEqual(order.packed_items, 3)
+        self.assertEqual(order.state, 'completed')
+
+        # Полный пересчет исправляет счетчики по факту
+        order._compute_packed_items()
+        self.assertEqual(order.packed_items, 1)
+
+        items[1].unlink()
+        self.assertEqual(order.total_items, 2)
+        items[0].unlink()
+        self.assertEqual(order.packed_items, 0)
+
+
+    def test_27_live_progress_coalesced(self):
+        """Test progress updates are coalesced into one bus message per channel"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'LIVE{i}',
+        } for i in range(3)])
+        for item in items:
+            item.action_mark_as_packed()
+
+        Bus = self.env['bus.bus']
+        domain = [('channel', 'like', f'"packaging_order_{order.id}"')]
+        self.assertFalse(Bus.search(domain))
+        self.env.cr.precommit.run()
+
+        messages = Bus.search(domain)
+        self.assertEqual(len(messages), 1)
+        payload = json.loads(messages.message)['payload']
+        self.assertEqual([o['state'] for o in payload['orders']], ['completed'])
+        self.assertTrue(Bus.search_count([('channel', 'like', f'"packaging_station_{self.user.id}"')]))
+
+
+    def test_28_scanner_sync_idempotent(self):
+        """Test offline scanner sync deduplicates events by UUID"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'SYNC{i}',
+        } for i in range(3)])
+        events = [
+            {'uuid': 'e1', 'type': 'pack', 'order': order.name, 'code': 'SYNC0', 'timestamp': '2024-01-01T10:00:01Z'},
+            # Событие пришло раньше по порядку, но отсканировано позже
+            {'uuid': 'e3', 'type': 'unpack', 'order': order.name, 'code': 'SYNC0', 'timestamp': '2024-01-01T10:00:03Z'},
+            {'uuid': 'e2', 'type': 'pack', 'order': order.name, 'code': 'SYNC1', 'timestamp': '2024-01-01T10:00:02Z'},
+            {'uuid': 'e4', 'type': 'pack', 'order': order.name, 'code': 'NOPE', 'timestamp': '2024-01-01T10:00:04Z'},
+        ]
+        Event = self.env['packaging.scan.event']
+        result = Event.sync_events(events, device='scanner-1')
+        statuses = {r['uuid']: r['status'] for r in result['results']}
+        self.assertEqual(statuses, {'e1': 'applied', 'e2': 'applied', 'e3': 'applied', 'e4': 'rejected'})
+        self.assertFalse(items[0].is_packed)
+        self.assertTrue(items[1].is_packed)
+        self.assertTrue(result['cursor'])
+
+        # Повторная отправка той же пачки ничего не меняет
+        again = Event.sync_events(events, device='scanner-1')
+        self.assertEqual({r['status'] for r in again['results']}, {'duplicate'})
+        self.assertEqual(again['cursor'], result['cursor'])
+        self.assertFalse(items[0].is_packed)
+        self.assertEqual(Event.search_count([('device', '=', 'scanner-1')]), 4)
+
+        # Упаковка уже упакованного товара не ошибка
+        result = Event.sync_events([
+            {'uuid': 'e5', 'type': 'pack', 'order': order.name, 'code': 'SYNC1'},
+        ])
+        self.assertEqual(result['results'][0]['status'], 'applied')
+
+
+    def test_29_scan_log_replay(self):
+        """Test packing history is logged and replayable"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'LOG{i}',
+        } for i in range(4)])
+        Log = self.env['packaging.scan.log']
+
+        items[0].action_mark_as_packed()
+        items[1].action_mark_as_packed()
+        items[1].action_mark_as_unpacked()
+        items[2].action_mark_as_packed()
+        state = Log._replay(order)[order.id]
+        self.assertEqual(state['packed'], order.packed_items)
+        self.assertEqual(state['packed'], 2)
+
+        events = Log.search([('order_id', '=', order.id)], order='id')
+        self.assertEqual(events.mapped('event_type'), ['pack', 'pack', 'unpack', 'pack'])
+
+        items[3].action_mark_defective_simple()
+        order.action_reset_packing()
+        items[0].action_mark_as_packed()
+        state = Log._replay(order)[order.id]
+        self.assertEqual((state['packed'], state['defective']), (order.packed_items, order.defective_items))
+        self.assertEqual(state['items'], {items[0].id: (True, False)})
+
+
+    def test_30_metrics_exposition(self):
+        """Test packing metrics are exported in Prometheus format"""
+        from odoo.addons.asai_test_task import metrics
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'MET{i}',
+        } for i in range(2)])
+
+        before = metrics.SCAN_SECONDS.count(source='quick_pack')
+        order._quick_pack_code('MET0')
+        self.assertEqual(metrics.SCAN_SECONDS.count(source='quick_pack'), before + 1)
+
+        body = metrics.render()
+        self.assertIn('# TYPE packaging_scan_seconds histogram', body)
+        self.assertIn('source="quick_pack",le="+Inf"}', body)
+
+        gauge = self.env['packaging.order']._metrics_orders_by_state()
+        for state in ('draft', 'in_progress'):
+            count = self.env['packaging.order'].search_count([('state', '=', state)])
+            self.assertIn('packaging_orders{state="%s"} %d\n' % (state, count), gauge)
+
+        allowlist = '10.0.0.0/24, 192.168.1.5'
+        self.assertTrue(metrics.address_allowed('10.0.0.7', allowlist))
+        self.assertTrue(metrics.address_allowed('192.168.1.5', allowlist))
+        self.assertFalse(metrics.address_allowed('127.0.0.1', allowlist))
+        self.assertFalse(metrics.address_allowed('10.0.0.7', ''))
+
+
+    def test_31_slow_op_tracing(self):
+        """Test sampled slow operations are stored with their steps"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'TRC{i}',
+        } for i in range(2)])
+        SlowOp = self.env['packaging.slow.op']
+        Param = self.env['ir.config_parameter'].sudo()
+
+        # Выключено по умолчанию
+        order._quick_pack_code('TRC0')
+        self.assertFalse(SlowOp.search_count([]))
+
+        Param.set_param('asai_test_task.trace_enabled', 'True')
+        Param.set_param('asai_test_task.trace_threshold_ms', '0')
+        Param.set_param('asai_test_task.trace_sample_rate', '1')
+        order._quick_pack_code('TRC1')
+
+        slow_op = SlowOp.search([])
+        self.assertEqual(len(slow_op), 1)
+        self.assertEqual(slow_op.name, 'packaging.order._quick_pack_code')
+        self.assertEqual(slow_op.res_ids, str(order.id))
+        self.assertGreater(slow_op.query_count, 0)
+        steps = json.loads(slow_op.steps)
+        self.assertEqual(steps[0]['name'], 'packaging.order._find_item_by_code')
+        self.assertIn('packaging.item.action_mark_as_packed', [step['name'] for step in steps])
+
+
+    def test_32_block_number_allocation(self):
+        """Test batch creation reserves order and label numbers in blocks"""
+        orders = self.env['packaging.order'].create([
+            {'responsible_id': self.user.id, 'auto_print_labels': False} for _i in range(5)
+        ])
+        self.assertTrue(all(order.name.isdigit() for order in orders))
+        numbers = [int(order.name) for order in orders]
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + 5)))
+
+        labels = self.env['packaging.label'].create([{'order_id': orders[0].id} for _i in range(3)])
+        labels |= self.env['packaging.label'].create({'order_id': orders[1].id})
+        self.assertTrue(all(label.name.startswith('L') and label.name[1:].isdigit() for label in labels))
+        self.assertEqual(len(set(labels.mapped('name'))), 4)
+        label_numbers = sorted(int(label.name[1:]) for label in labels)
+        self.assertEqual(label_numbers, list(range(label_numbers[0], label_numbers[0] + 4)))
+        self.assertTrue(all(labels.mapped('label_data')))
+
+        # Перенастройка последовательности сбрасывает заранее выделенный блок
+        Sequence = self.env['ir.sequence']
+        sequence = Sequence._sequence_by_code('packaging.label')
+        Sequence._next_prefetched_by_code('packaging.label')
+        sequence.write({'number_next': 900000})
+        self.assertEqual(Sequence._next_prefetched_by_code('packaging.label'), [sequence.get_next_char(900000)])
+
+        with self.assertRaises(ValidationError):
+            self.env['packaging.label'].create([
+                {'order_id': orders[2].id},
+                {'order_id': orders[2].id, 'name': 'X1'},
+            ])
+
+
+    def test_33_parsed_dimensions(self):
+        """Test dimensions are parsed at import and volumes aggregated per order"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        csv_data = [
+            ['item_code', 'product_name', 'dimensions'],
+            ['DIM001', 'Processor', '10x10x5 cm'],
+            ['DIM002', 'RAM', '30x5x1 cm  '],
+            ['DIM003', 'Cable', '100 x 50 x 20 mm'],
+            ['DIM004', 'Manual', 'A4'],
+        ]
+        csv_file = io.StringIO()
+        csv.writer(csv_file).writerows(csv_data)
+        order.write({
+            'import_file': base64.b64encode(csv_file.getvalue().encode('utf-8')),
+            'import_filename': 'dimensions.csv',
+        })
+        order.action_import_csv()
+
+        items = {item.item_code: item for item in order.item_ids}
+        ram = items['DIM002']
+        self.assertEqual((ram.dim_length, ram.dim_width, ram.dim_height, ram.dim_unit), (30, 5, 1, 'cm'))
+        self.assertAlmostEqual(items['DIM003'].volume, 100.0)
+        self.assertEqual(items['DIM003'].dim_unit, 'mm')
+        self.assertFalse(items['DIM004'].dim_unit)
+        self.assertEqual(items['DIM004'].volume, 0)
+
+        self.assertAlmostEqual(order.total_volume, 500 + 150 + 100)
+        self.assertAlmostEqual(order.max_item_volume, 500)
+
+        ram.dimensions = '40x5x1'
+        self.assertAlmostEqual(order.total_volume, 500 + 200 + 100)
+        self.assertIn(order, self.env['packaging.order'].search([('total_volume', '>', 700)]))
+
+
+    def test_34_carton_recommendation(self):
+        """Test carton plan follows item dimensions and the catalog"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'BOX{i}',
+            'dimensions': '10x10x5 cm',
+        } for i in range(2)])
+        box_s = self.env.ref('asai_test_task.carton_s')
+        self.assertEqual(order.carton_count, 1)
+        self.assertEqual(order.carton_summary, '1 × Box S')
+        plan = json.loads(order.carton_plan)
+        self.assertEqual(plan['cartons'][0]['carton_id'], box_s.id)
+        self.assertEqual(sorted(plan['cartons'][0]['item_ids']), sorted(items.ids))
+
+        # Товар больше любой коробки
+        self.env['packaging.item'].create({
+            'order_id': order.id,
+            'product_name': 'Wardrobe',
+            'item_code': 'BOX-BIG',
+            'dimensions': '2x1x0.5 m',
+        })
+        self.assertIn('1 item(s) do not fit any carton', order.carton_summary)
+
+        # Изменение каталога ставит открытые заказы в очередь пересчета
+        box_s.active = False
+        self.assertTrue(order.carton_pending)
+        self.assertIn('Box S', order.carton_summary)
+        self.env['packaging.order']._cron_process_carton_queue(auto_commit=False)
+        self.assertFalse(order.carton_pending)
+        self.assertIn('Box M', order.carton_summary)
+
+        label = self.env['packaging.label'].create({'order_id': order.id})
+        self.assertTrue(label.label_data)
+
+
+    def test_35_batch_cartonization(self):
+        """Test batch cartonization stores plans in bulk and reports a forecast"""
+        orders = self.env['packaging.order'].create([
+            {'responsible_id': self.user.id, 'auto_print_labels': False} for _i in range(3)
+        ])
+        self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'BATCH-{order.id}-{i}',
+            'dimensions': '25x15x10 cm',
+        } for order in orders for i in range(2)])
+        expected = {order.id: order.carton_summary for order in orders}
+        self.env.cr.execute("UPDATE packaging_order SET carton_summary = NULL WHERE id IN %s", (tuple(orders.ids),))
+        orders.invalidate_recordset(['carton_summary'])
+
+        report = orders._batch_cartonize(chunk_size=2)
+        self.assertEqual(report['orders'], 3)
+        self.assertEqual(report['items'], 6)
+        self.assertEqual({order.id: order.carton_summary for order in orders}, expected)
+        self.assertEqual(sum(report['forecast'].values()), sum(orders.mapped('carton_count')))
+
+        # Большой выбор уходит в очередь, cron считает его пачками
+        self.env.cr.execute("UPDATE packaging_order SET carton_summary = NULL WHERE id IN %s", (tuple(orders.ids),))
+        orders.invalidate_recordset(['carton_summary'])
+        orders.write({'carton_pending': True})
+        # Воркеры делят очередь по id: каждый заказ считает ровно один
+        odd = orders.filtered(lambda order: order.id % 2)
+        self.assertEqual(orders._cron_process_carton_queue(chunk_size=2, auto_commit=False, worker=1, workers=2), len(odd))
+        self.assertEqual(orders.filtered('carton_pending'), orders - odd)
+        self.assertEqual(orders._cron_process_carton_queue(chunk_size=2, auto_commit=False), 3 - len(odd))
+        self.assertFalse(any(orders.mapped('carton_pending')))
+        self.assertEqual({order.id: order.carton_summary for order in orders}, expected)
+
+
+    def test_36_dispatch_queue(self):
+        """Test stations claim draft orders by priority without collisions"""
+        # Захват идет в своей транзакции: новые курсоры работают поверх тестового
+        self.registry.enter_test_mode(self.env.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        Order = self.env['packaging.order']
+        # Чужие черновики других тестов не должны попадать в очередь
+        Order.search([('state', '=', 'draft')]).write({'state': 'canceled'})
+        orders = Order.create([
+            {'responsible_id': self.user.id, 'auto_print_labels': False, 'priority': priority}
+            for priority in ('0', '2', '1')
+        ])
+        self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': 'Product',
+            'item_code': f'CLAIM-{order.id}',
+        } for order in orders])
+        operator_a = self.env['res.users'].create({'name': 'Operator A', 'login': 'operator_a'})
+        operator_b = self.env['res.users'].create({'name': 'Operator B', 'login': 'operator_b'})
+
+        claim_a = Order.with_user(operator_a)._claim_next_order()
+        self.assertEqual(claim_a, orders[1])
+        self.assertEqual(claim_a.claimed_by_id, operator_a)
+        self.assertEqual(claim_a.responsible_id, operator_a)
+        # Лимит захватов: оператор получает свой же заказ
+        self.assertEqual(Order.with_user(operator_a)._claim_next_order(), claim_a)
+
+        claim_b = Order.with_user(operator_b)._claim_next_order()
+        self.assertEqual(claim_b, orders[2])
+
+        claim_b.with_user(operator_b).action_release_claim()
+        self.assertFalse(claim_b.claimed_by_id)
+        with self.assertRaises(UserError):
+            claim_a.with_user(operator_b).action_release_claim()
+
+        # Истекший захват снова доступен
+        claim_a.claim_expires = fields.Datetime.now() - timedelta(minutes=1)
+        self.assertEqual(Order._cron_release_expired_claims(), 1)
+        self.assertEqual(Order.with_user(operator_b)._claim_next_order(), orders[1])
+
+
+    def test_37_incremental_export(self):
+        """Test keyset export pages through changed rows once each"""
+        from odoo.addons.asai_test_task import export
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'EXP{i}',
+        } for i in range(5)])
+        self.env.flush_all()
+        # Свежие строки не выгружаются - сдвигаем их изменения в прошлое
+        self.env.cr.execute("""
+            UPDATE packaging_item SET write_date = timestamp '2000-01-01' + id %% 3 * interval '1 second'
+             WHERE id IN %s
+        """, (tuple(items.ids),))
+        items.invalidate_recordset(['write_date'])
+
+        model_name, field_names = export.select_fields('items', 'item_code,is_packed')
+        self.assertEqual(field_names, ('id', 'item_code', 'is_packed', 'write_date'))
+        cursor = export.encode_cursor(datetime(1999, 12, 31), 0)
+        exported = []
+        for _page in range(3):
+            rows, cursor, has_more = export.fetch_page(self.env, model_name, field_names, cursor, limit=2)
+            exported += [row for row in rows if row['write_date'].year == 2000]
+        self.assertEqual(sorted(row['id'] for row in exported), items.ids)
+        keys = [(row['write_date'], row['id']) for row in exported]
+        self.assertEqual(keys, sorted(keys))
+
+        with self.assertRaises(ValueError):
+            export.select_fields('items', 'import_file')
+        with self.assertRaises(ValueError):
+            export.decode_cursor('not a cursor')
+
+        body = b''.join(export.iter_ndjson(exported[:2], compress=True))
+        lines = gzip.decompress(body).decode().splitlines()
+        self.assertEqual(json.loads(lines[0])['item_code'], exported[0]['item_code'])
+
+        # Удаления отдаются отдельным ресурсом, товары заказа - вместе с заказом
+        items[0].unlink()
+        order.unlink()
+        self.env.cr.execute(
+            "UPDATE packaging_export_tombstone SET write_date = timestamp '2000-01-01' WHERE res_id IN %s",
+            (tuple(items.ids + order.ids),),
+        )
+        model_name, field_names = export.select_fields('deletions')
+        rows, _cursor, _more = export.fetch_page(self.env, model_name, field_names, limit=export.PAGE_LIMIT_MAX)
+        deleted = {(row['res_model'], row['res_id']) for row in rows}
+        self.assertIn(('packaging.order', order.id), deleted)
+        self.assertEqual({res_id for res_model, res_id in deleted if res_model == 'packaging.item'} & set(items.ids),
+                         set(items.ids))
+
+    def test_38_order_intake(self):
+        """Test bulk order intake creates orders once per idempotency key"""
+        Order = self.env['packaging.order']
+        batch = [{
+            'key': f'ERP-{i}',
+            'responsible': self.user.login,
+            'priority': '1',
+            'auto_print_labels': False,
+            'items': [{'item_code': f'IN{i}-{j}', 'product_name': 'Product', 'dimensions': '10x10x10 cm'}
+                      for j in range(3)],
+        } for i in range(2)]
+        # Повтор ключа внутри пачки не создает второй заказ
+        batch.append(dict(batch[0]))
+
+        results = Order.intake_orders(batch)
+        self.assertEqual([r['status'] for r in results], ['created', 'created', 'duplicate'])
+        self.assertEqual(results[0]['id'], results[2]['id'])
+        orders = Order.browse([r['id'] for r in results[:2]])
+        self.assertEqual(orders.mapped('total_items'), [3, 3])
+        self.assertEqual(orders.responsible_id, self.user)
+        self.assertEqual(orders.mapped('intake_key'), ['ERP-0', 'ERP-1'])
+
+        # Повтор запроса возвращает те же заказы
+        retry = Order.intake_orders(batch[:2])
+        self.assertEqual([r['status'] for r in retry], ['duplicate', 'duplicate'])
+        self.assertEqual([r['id'] for r in retry], orders.ids)
+        self.assertEqual(Order.search_count([('intake_key', 'like', 'ERP-')]), 2)
+
+        with self.assertRaises(UserError):
+            Order.intake_orders([{'key': 'ERP-X', 'items': [{'item_code': 'NO-NAME'}]}])
+        with self.assertRaises(UserError):
+            Order.intake_orders([{'key': 'ERP-Y', 'responsible': 'no_such_login'}])
+
+    def test_39_outbox_webhook_delivery(self):
+        """Test state changes are queued in the outbox and delivered in order"""
+        received = []
+        status = [500]
+
+        class WebhookStub(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+                self.send_response(status[0])
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), WebhookStub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        Outbox = self.env['packaging.outbox.event']
+        self.env['packaging.webhook'].search([]).write({'active': False})
+        webhook = self.env['packaging.webhook'].create({
+            'name': 'Stub',
+            'url': f'http://127.0.0.1:{server.server_port}/hook',
+            'secret': 'test-secret',
+        })
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        order.write({'state': 'defective'})
+        order.write({'state': 'completed'})
+        events = Outbox.search([('order_id', '=', order.id)], order='id')
+        self.assertEqual(events.mapped('event_type'), ['defective', 'completed'])
+        self.assertEqual(set(events.mapped('state')), {'pending'})
+        events.write({'next_attempt': fields.Datetime.now() - timedelta(seconds=1)})
+
+        # Получатель недоступен: первое событие откладывается, второе ждет его
+        with mute_logger('odoo.addons.asai_test_task.models.packaging_outbox_event'):
+            self.assertEqual(Outbox._cron_dispatch(auto_commit=False), 0)
+        self.assertEqual(len(received), 1)
+        self.assertEqual([event['type'] for event in received[0]['events']], ['order.defective'])
+        self.assertEqual(events[0].attempts, 1)
+        self.assertGreater(events[0].next_attempt, fields.Datetime.now())
+        self.assertEqual(events[1].attempts, 0)
+
+        # Исчерпавшее попытки событие держит остальные события заказа до повтора
+        events[0].write({'state': 'failed', 'next_attempt': fields.Datetime.now() - timedelta(seconds=1)})
+        self.assertFalse(Outbox._lock_deliverable(10, fields.Datetime.now()) & events)
+
+        status[0] = 200
+        events[0].action_retry()
+        self.assertEqual(Outbox._cron_dispatch(auto_commit=False), 2)
+        self.assertEqual(set(events.mapped('state')), {'sent'})
+        delivered = [event['type'] for batch in received[1:] for event in batch['events']]
+        self.assertEqual(delivered, ['order.defective', 'order.completed'])
+        self.assertEqual(received[-1]['events'][0]['order'], order.name)
+        self.assertEqual(webhook.pending_count, 0)
+
+    def test_40_import_formats(self):
+        """Test items import from gzip CSV, NDJSON and XLSX files"""
+        from odoo.addons.asai_test_task import importers
+        rows = [
+            {'item_code': f'FMT{i}', 'product_name': f'Product {i}', 'dimensions': '10x20x30 cm'}
+            for i in range(3)
+        ]
+        stream = io.StringIO()
+        writer = csv.DictWriter(stream, fieldnames=['item_code', 'product_name', 'dimensions'])
+        writer.writeheader()
+        writer.writerows(rows)
+        files = {
+            'items.csv.gz': gzip.compress(stream.getvalue().encode('utf-8')),
+            'items.ndjson': ''.join(json.dumps(row) + '\n\n' for row in rows).encode('utf-8'),
+        }
+        try:
+            import openpyxl  # noqa: F401
+            import xlsxwriter
+        except ImportError:
+            xlsxwriter = None
+        if xlsxwriter:
+            buffer = io.BytesIO()
+            workbook = xlsxwriter.Workbook(buffer, {'in_memory': True})
+            sheet = workbook.add_worksheet()
+            sheet.write_row(0, 0, ['item_code', 'product_name', 'dimensions'])
+            for index, row in enumerate(rows, 1):
+                sheet.write_row(index, 0, [row['item_code'], row['product_name'], row['dimensions']])
+            workbook.close()
+            files['items.xlsx'] = buffer.getvalue()
+
+        for filename, content in files.items():
+            order = self.env['packaging.order'].create({
+                'responsible_id': self.user.id,
+                'auto_print_labels': False,
+            })
+            # Сжатый файл с неверным расширением распознается по сигнатуре
+            order.write({
+                'import_file': base64.b64encode(content),
+                'import_filename': filename.replace('.csv.gz', '.csv'),
+            })
+            order._process_import(batch_size=2)
+            self.assertEqual(order.item_ids.sorted('item_code').mapped('item_code'), ['FMT0', 'FMT1', 'FMT2'], filename)
+            self.assertAlmostEqual(order.total_volume, 3 * 6000.0, msg=filename)
+
+        self.assertIs(importers.detect('items.jsonl', b'{}'), importers.parse_ndjson)
+        with self.assertRaises(ValueError):
+            list(importers.iter_rows('items.ndjson', b'[1, 2]\n'))
+
+    def test_41_state_audit_trail(self):
+        """Test state changes are logged in one batch and give time in state"""
+        StateLog = self.env['packaging.order.state.log']
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        order.action_mark_completed()
+        order.action_reset_to_draft()
+        # До коммита изменения копятся в буфере транзакции
+        self.assertFalse(StateLog.search([('order_id', '=', order.id)]))
+        StateLog._flush_buffer()
+
+        logs = StateLog.search([('order_id', '=', order.id)], order='id')
+        self.assertEqual(
+            [(log.from_state, log.to_state, log.trigger) for log in logs],
+            [(False, 'draft', 'create'), ('draft', 'completed', 'mark_completed'),
+             ('completed', 'draft', 'reset_to_draft')],
+        )
+        self.assertEqual(logs.user_id, self.env.user)
+
+        for log, seconds in zip(logs, (0, 60, 180)):
+            self.env.cr.execute(
+                "UPDATE packaging_order_state_log SET change_date = %s WHERE id = %s",
+                (datetime(2000, 1, 1) + timedelta(seconds=seconds), log.id),
+            )
+        stays = StateLog._time_in_state(datetime(2000, 1, 1), datetime(2000, 1, 2))
+        # Последний черновик еще не закончился и не учитывается
+        self.assertEqual(stays['draft']['count'], 1)
+        self.assertAlmostEqual(stays['draft']['p50'], 60.0)
+        self.assertAlmostEqual(stays['completed']['avg'], 120.0)
+
+        # Удаление заказа не стирает его историю
+        name = order.name
+        order.unlink()
+        StateLog._flush_buffer()
+        self.assertEqual(logs.exists(), logs)
+        self.assertFalse(logs.order_id)
+        self.assertEqual(set(logs.mapped('order_name')), {name})
+        self.assertEqual(StateLog._time_in_state(datetime(2000, 1, 1), datetime(2000, 1, 2))['draft']['count'], 1)
+
+    def test_42_productivity_rollups(self):
+        """Test operator and order rollups are built from pack events"""
+        operator = self.env['res.users'].create({'name': 'Packer', 'login': 'packer_rollup'})
+        order = self.env['packaging.order'].create({
+            'responsible_id': operator.id,
+            'auto_print_labels': False,
+        })
+        items = self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'ROLL{i}',
+        } for i in range(4)])
+        # Офлайн-сканы через 30 и 60 секунд: журнал пишется сейчас, свёртка идет по времени упаковки
+        for item, seconds in zip(items, (0, 30, 90)):
+            item.with_user(operator).write({
+                'is_packed': True,
+                'pack_date': datetime(2000, 1, 1, 10) + timedelta(seconds=seconds),
+            })
+        self.env['packaging.scan.log']._flush_buffer()
+
+        refresh_from = fields.Datetime.now() - timedelta(hours=1)
+        self.env['packaging.productivity.hourly']._cron_refresh(date_from=refresh_from)
+        hourly = self.env['packaging.productivity.hourly'].search([('user_id', '=', operator.id)])
+        self.assertEqual(len(hourly), 1)
+        self.assertEqual(hourly.hour, datetime(2000, 1, 1, 10))
+        self.assertEqual(hourly.packed, 3)
+        self.assertEqual(hourly.gap_count, 2)
+        self.assertAlmostEqual(hourly.gap_median, 45.0)
+
+        pace = self.env['packaging.productivity.order'].search([('order_id', '=', order.id)])
+        self.assertEqual(pace.packed, 3)
+        self.assertAlmostEqual(pace.rate_per_hour, 80.0)
+        # Осталась одна позиция: 45 секунд при темпе 80 в час
+        self.assertEqual(pace.eta, datetime(2000, 1, 1, 10, 2, 15))
+        order.invalidate_recordset(['pack_rate', 'pack_eta'])
+        self.assertEqual(order.pack_eta, pace.eta)
+
+        # Повторный запуск пересчитывает те же часы, а не добавляет строки
+        self.env['packaging.productivity.hourly']._cron_refresh(date_from=refresh_from)
+        self.assertEqual(self.env['packaging.productivity.hourly'].search_count([('user_id', '=', operator.id)]), 1)
+
+
+    def test_43_scan_sync_single_log_insert(self):
+        """Test a scanner sync writes its scan log with one INSERT at commit"""
+        from odoo.addons.asai_test_task.models.packaging_scan_log import LOG_PRECOMMIT_KEY
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'ONCE{i}',
+        } for i in range(5)])
+        self.env.cr.precommit.run()
+
+        Log = self.env['packaging.scan.log']
+        flush_buffer = type(Log)._flush_buffer
+        inserts = []
+
+        def counting_flush(log):
+            buffer = log.env.cr.precommit.data.get(LOG_PRECOMMIT_KEY)
+            if buffer:
+                inserts.append(len(buffer))
+            return flush_buffer(log)
+
+        events = [
+            {'uuid': f'once-{i}', 'type': 'pack', 'order': order.name, 'code': f'ONCE{i}'}
+            for i in range(5)
+        ]
+        with patch.object(type(Log), '_flush_buffer', counting_flush):
+            result = self.env['packaging.scan.event'].sync_events(events, device='scanner-once')
+            # Отклоненное событие не сбрасывает буфер уже примененных
+            self.env['packaging.scan.event'].sync_events([
+                {'uuid': 'once-bad', 'type': 'pack', 'order': order.name, 'code': 'NOPE'},
+            ], device='scanner-once')
+            self.env.cr.precommit.run()
+        self.assertEqual({r['status'] for r in result['results']}, {'applied'})
+        self.assertEqual(inserts, [5])
+        self.assertEqual(Log.search_count([('order_id', '=', order.id), ('event_type', '=', 'pack')]), 5)
+
+
+    def test_44_scan_sync_live_update_coalesced(self):
+        """Test a multi-event scanner sync sends one bus batch at commit"""
+        order = self.env['packaging.order'].create({
+            'responsible_id': self.user.id,
+            'auto_print_labels': False,
+        })
+        self.env['packaging.item'].create([{
+            'order_id': order.id,
+            'product_name': f'Product {i}',
+            'item_code': f'BURST{i}',
+        } for i in range(4)])
+        self.env.cr.precommit.run()
+
+        events = [
+            {'uuid': f'burst-{i}', 'type': 'pack', 'order': order.name, 'code': f'BURST{i}'}
+            for i in range(4)
+        ]
+        Bus = type(self.env['bus.bus'])
+        with patch.object(Bus, '_sendmany', autospec=True) as sendmany:
+            self.env['packaging.scan.event'].sync_events(events, device='scanner-burst')
+            self.assertEqual(sendmany.call_count, 0)
+            self.env.cr.precommit.run()
+        self.assertEqual(sendmany.call_count, 1)
+        notifications = sendmany.call_args.args[1]
+        payloads = [payload for channel, _type, payload in notifications if channel == f'packaging_order_{order.id}']
+        self.assertEqual(len(payloads), 1)
+        self.assertEqual(payloads[0]['orders'][0]['state'], 'completed')
\ No newline at end of file
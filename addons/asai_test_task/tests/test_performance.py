@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks on large tables.
+
+Not part of the standard run, launch explicitly:
+    odoo --test-enable --stop-after-init -i asai_test_task --test-tags=asai_test_task_perf
+Table size is controlled by ASAI_PERF_ORDERS / ASAI_PERF_ITEMS_PER_ORDER,
+e.g. ASAI_PERF_ORDERS=1000000 and ASAI_PERF_ORDERS=5000000 for the list-view runs.
+"""
+from odoo.tests import tagged, TransactionCase
+import logging
+import os
+import random
+import time
+
+_logger = logging.getLogger(__name__)
+
+PERF_ORDERS = int(os.environ.get('ASAI_PERF_ORDERS', 200000))
+PERF_ITEMS_PER_ORDER = int(os.environ.get('ASAI_PERF_ITEMS_PER_ORDER', 5))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@tagged('post_install', '-at_install', '-standard', 'asai_test_task_perf')
+class TestPackagingPerformance(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._bulk_generate(PERF_ORDERS, PERF_ITEMS_PER_ORDER)
+
+    @classmethod
+    def _bulk_generate(cls, orders, items_per_order):
+        """Fill hot tables with SQL, ORM create is too slow for millions of rows"""
+        cr = cls.env.cr
+        uid = cls.env.uid
+        cr.execute("""
+            INSERT INTO packaging_order (name, responsible_id, state, priority, auto_print_labels,
+                                         total_items, packed_items, defective_items, progress,
+                                         create_uid, write_uid, create_date, write_date)
+            SELECT (9000000000 + g)::text, %s, 'draft', '0', false, %s, 0, 0, 0,
+                   %s, %s, now() - g * interval '1 second', now()
+              FROM generate_series(1, %s) g
+        """, (uid, items_per_order, uid, uid, orders))
+        cr.execute("""
+            INSERT INTO packaging_item (order_id, item_code, product_name, is_packed, is_defective,
+                                        create_uid, write_uid, create_date, write_date)
+            SELECT o.id, 'PERF-' || o.id || '-' || i, 'Perf product ' || i, false, false,
+                   %s, %s, now(), now()
+              FROM packaging_order o, generate_series(1, %s) i
+             WHERE o.name LIKE '9%%'
+        """, (uid, uid, items_per_order))
+        cr.execute("""
+            INSERT INTO packaging_label (name, order_id, printed, print_date,
+                                         create_uid, write_uid, create_date, write_date)
+            SELECT 'L9' || lpad(o.id::text, 9, '0'), o.id, false, now(), %s, %s, now(), now()
+              FROM packaging_order o
+             WHERE o.name LIKE '9%%'
+        """, (uid, uid))
+        cr.execute("ANALYZE packaging_order")
+        cr.execute("ANALYZE packaging_item")
+        cr.execute("ANALYZE packaging_label")
+        cls.env.invalidate_all()
+
+    def _report(self, name, samples):
+        p50, p95, p99 = (percentile(samples, p) * 1000 for p in (50, 95, 99))
+        _logger.info(
+            "BENCH %s n=%d p50=%.3fms p95=%.3fms p99=%.3fms",
+            name, len(samples), p50, p95, p99,
+        )
+        return p95
+
+    def test_scan_router_latency(self):
+        """Scan router resolves order, item and label codes under 10 ms"""
+        router = self.env['packaging.scan.router']
+        cr = self.env.cr
+        cr.execute("SELECT id, name FROM packaging_order WHERE name LIKE '9%%' ORDER BY random() LIMIT 300")
+        orders = cr.fetchall()
+        codes = []
+        for order_id, name in orders:
+            codes.append(name)
+            codes.append('PERF-%s-%s' % (order_id, random.randint(1, PERF_ITEMS_PER_ORDER)))
+            codes.append('L9%09d' % order_id)
+
+        # Холодный проход читает индексы с диска, второй - из буферов PostgreSQL
+        for label in ('cold', 'hot'):
+            samples = []
+            for code in codes:
+                self.env.invalidate_all()
+                start = time.perf_counter()
+                router.route_scan(code)
+                samples.append(time.perf_counter() - start)
+            p95 = self._report('scan_router_%s' % label, samples)
+            self.assertLess(p95, 0.010)
+
+
+    def test_order_list_latency(self):
+        """Default order list and quick jump stay index-only at scale"""
+        Order = self.env['packaging.order']
+        fields_list = ['name', 'responsible_id', 'total_items', 'packed_items', 'state']
+        for label, offset in (('first_page', 0), ('page_100', 80 * 100)):
+            samples = []
+            for _attempt in range(50):
+                self.env.invalidate_all()
+                start = time.perf_counter()
+                Order.search_read([], fields_list, offset=offset, limit=80)
+                samples.append(time.perf_counter() - start)
+            p95 = self._report('order_list_%s' % label, samples)
+            self.assertLess(p95, 0.050)
+
+        self.env.cr.execute(
+            "SELECT name FROM packaging_order WHERE name LIKE '9%%' ORDER BY random() LIMIT 300"
+        )
+        names = [row[0] for row in self.env.cr.fetchall()]
+        samples = []
+        for name in names:
+            start = time.perf_counter()
+            Order.search([('name', '=', name)], limit=1)
+            samples.append(time.perf_counter() - start)
+        p95 = self._report('order_name_lookup', samples)
+        self.assertLess(p95, 0.005)
+
+    def test_mass_close_orders(self):
+        """Closing 10,000 orders at end of day takes seconds"""
+        self.env.cr.execute(
+            "SELECT id FROM packaging_order WHERE name LIKE '9%%' AND state = 'draft' ORDER BY id LIMIT 10000"
+        )
+        orders = self.env['packaging.order'].browse([row[0] for row in self.env.cr.fetchall()])
+        self.env.flush_all()
+
+        start = time.perf_counter()
+        orders.action_mark_completed()
+        self.env.flush_all()
+        elapsed = time.perf_counter() - start
+        _logger.info("BENCH mass_close_orders n=%d total=%.3fs", len(orders), elapsed)
+        self.assertLess(elapsed, 10.0)
+        self.assertEqual(set(orders.mapped('state')), {'completed'})
+
+    def test_scan_log_insert_throughput(self):
+        """Buffered multi-row insert into the partitioned scan log"""
+        Log = self.env['packaging.scan.log']
+        self.env.cr.execute("SELECT id FROM packaging_order WHERE name LIKE '9%%' LIMIT 1")
+        order_id = self.env.cr.fetchone()[0]
+        events = 100000
+        start = time.perf_counter()
+        for chunk in range(0, events, 1000):
+            Log._log_events([('pack', order_id, None)] * 1000)
+            # Буфер пишется precommit-хуком, как при коммите
+            self.env.cr.precommit.run()
+        elapsed = time.perf_counter() - start
+        _logger.info("BENCH scan_log_insert n=%d total=%.3fs rate=%.0f/s", events, elapsed, events / elapsed)
+        self.assertGreater(events / elapsed, 20000)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Query-count and timing regression tests of the hot paths.
+
+Every operation is measured on a small and a large data set: the large one
+must not issue more queries (no N+1), and the query count must stay within
+the baseline of perf_baselines.json plus tolerance. Wall time depends on the
+machine and is only checked by the opt-in run:
+    odoo --test-enable --stop-after-init -u asai_test_task --test-tags=asai_test_task_perf
+
+Baselines are measured, not written by hand. Measure them on the reference
+machine after an intended change; the tests write them to the given file,
+never into the module, and the result is reviewed and copied over
+perf_baselines.json:
+    ASAI_PERF_UPDATE_BASELINES=/tmp/perf_baselines.json odoo --test-enable --stop-after-init -u asai_test_task --test-tags=asai_test_task_perf
+An operation without a baseline fails the opt-in timing run; the standard
+run logs a warning and only checks the scaling.
+ASAI_PERF_TIME_TOLERANCE overrides the wall time factor on slow machines.
+"""
+from odoo import fields
+from odoo.tests import tagged, TransactionCase
+from datetime import timedelta
+import json
+import logging
+import math
+import os
+import random
+import time
+
+from .. import cartonization
+
+_logger = logging.getLogger(__name__)
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'perf_baselines.json')
+# Файл для измеренных баз; пусто - базы не пишутся
+UPDATE_BASELINES = os.environ.get('ASAI_PERF_UPDATE_BASELINES', '')
+SMALL_ORDER = 10
+LARGE_ORDER = 1000
+# Бюджет плана коробок заказа из нескольких сотен позиций случайных размеров
+CARTON_PLAN_BUDGET_MS = 50
+# (позиций, мин. сторона, макс. сторона в см) - мелочь дает больше всего свободных пространств
+CARTON_PLAN_CASES = ((300, 1, 5), (300, 1, 15), (500, 1, 5), (500, 1, 15))
+
+
+@tagged('post_install', '-at_install', 'asai_test_task')
+class TestPackagingQueryCounts(TransactionCase):
+    # Время сравнивается с базой только в отдельном прогоне (TestPackagingQueryTimings)
+    check_timings = False
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(BASELINE_FILE, encoding='utf-8') as baseline_file:
+            cls.baselines = json.load(baseline_file)
+        cls.measured = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE_BASELINES and cls.measured:
+            cls.baselines['operations'].update(cls.measured)
+            with open(UPDATE_BASELINES, 'w', encoding='utf-8') as baseline_file:
+                json.dump(cls.baselines, baseline_file, indent=4, sort_keys=True)
+                baseline_file.write('\n')
+            _logger.warning("PERF baselines written to %s, review and copy to %s", UPDATE_BASELINES, BASELINE_FILE)
+        super().tearDownClass()
+
+    def _create_order(self, size, prefix, dimensions=None):
+        return self.env['packaging.order'].create({
+            'auto_print_labels': False,
+            'item_ids': [(0, 0, {
+                'item_code': f'{prefix}-{i:04d}',
+                'product_name': f'Product {i}',
+                'dimensions': dimensions[i] if dimensions else '10x10x10 cm',
+            }) for i in range(size)],
+        })
+
+    def _measure(self, func):
+        """Run func on a cold cache, return (queries, milliseconds)"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        func()
+        self.env.flush_all()
+        elapsed = (time.perf_counter() - start) * 1000
+        return self.env.cr.sql_log_count - queries, elapsed
+
+    def _check_scaling(self, name, small, large):
+        """Same operation on small and large data, large must not cost more queries"""
+        small_queries, _small_ms = small
+        large_queries, large_ms = large
+        _logger.info("PERF %s queries=%d/%d ms=%.1f", name, small_queries, large_queries, large_ms)
+        self.assertLessEqual(
+            large_queries, small_queries,
+            f"{name}: {large_queries} queries on large data vs {small_queries} on small data"
+        )
+        self._check_baseline(name, large_queries, large_ms)
+
+    def _check_baseline(self, name, queries, elapsed_ms):
+        if UPDATE_BASELINES:
+            self.measured[name] = {'queries': queries, 'ms': math.ceil(elapsed_ms)}
+            return
+        baseline = self.baselines['operations'].get(name)
+        if not baseline:
+            message = f"{name}: no baseline in perf_baselines.json, measure it with ASAI_PERF_UPDATE_BASELINES=<file>"
+            if self.check_timings:
+                self.fail(message)
+            _logger.warning("PERF %s", message)
+            return
+        tolerance = self.baselines['tolerance']
+        max_queries = baseline['queries'] + math.ceil(baseline['queries'] * tolerance['queries'])
+        self.assertLessEqual(
+            queries, max_queries,
+            f"{name}: {queries} queries, baseline {baseline['queries']}"
+        )
+        if not self.check_timings:
+            return
+        time_factor = float(os.environ.get('ASAI_PERF_TIME_TOLERANCE', tolerance['time']))
+        self.assertLessEqual(
+            elapsed_ms, baseline['ms'] * time_factor,
+            f"{name}: {elapsed_ms:.1f} ms, baseline {baseline['ms']} ms"
+        )
+
+    def test_01_quick_pack(self):
+        """Quick pack does not depend on order size"""
+        small = self._create_order(SMALL_ORDER, 'QCS')
+        large = self._create_order(LARGE_ORDER, 'QCL')
+        self._check_scaling(
+            'quick_pack',
+            self._measure(lambda: small._quick_pack_code('QCS-0005')),
+            self._measure(lambda: large._quick_pack_code('QCL-0500')),
+        )
+        self.assertEqual(large.packed_items, 1)
+
+    def test_02_find_item_by_code(self):
+        """Item lookup is a single indexed query"""
+        small = self._create_order(SMALL_ORDER, 'FCS')
+        large = self._create_order(LARGE_ORDER, 'FCL')
+        self._check_scaling(
+            'find_item_by_code',
+            self._measure(lambda: small._find_item_by_code('FCS-0009')),
+            self._measure(lambda: large._find_item_by_code('FCL-0999')),
+        )
+
+    def test_03_compute_packed_items(self):
+        """Full recount is one aggregate query per batch of orders"""
+        small = self._create_order(SMALL_ORDER, 'RCS')
+        large = self._create_order(LARGE_ORDER, 'RCL')
+        (small.item_ids[:5] | large.item_ids[:5]).write({'is_packed': True})
+        self._check_scaling(
+            'compute_packed_items',
+            self._measure(small._compute_packed_items),
+            self._measure(large._compute_packed_items),
+        )
+
+    def test_04_generate_pdf_label(self):
+        """Label rendering reads items in one prefetch batch"""
+        small = self._create_order(SMALL_ORDER, 'LCS')
+        large = self._create_order(LARGE_ORDER, 'LCL')
+        small_label = self.env['packaging.label'].create({'order_id': small.id})
+        large_label = self.env['packaging.label'].create({'order_id': large.id})
+        self._check_scaling(
+            'generate_pdf_label',
+            self._measure(small_label._generate_pdf_label),
+            self._measure(large_label._generate_pdf_label),
+        )
+
+    def test_05_defective_report(self):
+        """Defective report does not query per order"""
+        report = self.env['packaging.defective.report'].create({
+            'date_from': fields.Date.today() - timedelta(days=1),
+            'date_to': fields.Date.today() + timedelta(days=1),
+            'show_details': True,
+        })
+
+        def add_defective_orders(count, prefix):
+            for index in range(count):
+                order = self._create_order(5, f'{prefix}{index}')
+                order.item_ids[0].write({'is_defective': True, 'defective_reason': 'Broken'})
+
+        add_defective_orders(2, 'DCS')
+        small = self._measure(report.action_generate_report)
+        add_defective_orders(18, 'DCL')
+        large = self._measure(report.action_generate_report)
+        self._check_scaling('defective_report', small, large)
+
+    def test_06_carton_plan(self):
+        """Carton recommendation for a few hundred items stays under 50 ms"""
+        rng = random.Random(42)
+        small = self._create_order(SMALL_ORDER, 'CCS')
+        large = self._create_order(300, 'CCL', [
+            '%dx%dx%d cm' % (rng.randint(1, 15), rng.randint(1, 15), rng.randint(1, 15)) for _i in range(300)
+        ])
+        large_measure = self._measure(large._compute_carton_plan)
+        self._check_scaling('carton_plan', self._measure(small._compute_carton_plan), large_measure)
+        self.assertTrue(large.carton_count)
+        if not self.check_timings:
+            return
+        self.assertLess(
+            large_measure[1], CARTON_PLAN_BUDGET_MS,
+            f"carton_plan: {large_measure[1]:.1f} ms for 300 items, budget {CARTON_PLAN_BUDGET_MS} ms"
+        )
+        catalog = self.env['packaging.carton'].sudo()._catalog()
+        for count, low, high in CARTON_PLAN_CASES:
+            items = [
+                (i, rng.uniform(low, high), rng.uniform(low, high), rng.uniform(low, high))
+                for i in range(count)
+            ]
+            start = time.perf_counter()
+            cartonization.pack_items(items, catalog)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.assertLess(
+                elapsed, CARTON_PLAN_BUDGET_MS,
+                f"pack_items: {elapsed:.1f} ms for {count} items of {low}-{high} cm, budget {CARTON_PLAN_BUDGET_MS} ms"
+            )
+
+
+@tagged('post_install', '-at_install', '-standard', 'asai_test_task_perf')
+class TestPackagingQueryTimings(TestPackagingQueryCounts):
+    """Same measurements with wall time checked against the baselines"""
+    check_timings = True
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Opt-in tracing of the addon's hot paths.
+
+A traced call records wall time, query count and SQL time of itself and of
+every nested traced step. Root calls are sampled; sampled calls over the
+threshold are stored as `packaging.slow.op`. Controlled by the
+asai_test_task.trace_* system parameters, disabled by default.
+"""
+import functools
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_ENABLED_PARAM = 'asai_test_task.trace_enabled'
+TRACE_THRESHOLD_PARAM = 'asai_test_task.trace_threshold_ms'
+TRACE_SAMPLE_RATE_PARAM = 'asai_test_task.trace_sample_rate'
+TRACE_THRESHOLD_DEFAULT = 500
+TRACE_SAMPLE_RATE_DEFAULT = 0.1
+
+_local = threading.local()
+
+
+class Span:
+    """One traced call and its nested steps"""
+    __slots__ = ('name', 'start', 'queries', 'sql_time', 'duration', 'children')
+
+    def __init__(self, name):
+        thread = threading.current_thread()
+        self.name = name
+        self.children = []
+        self.queries = thread.query_count
+        self.sql_time = thread.query_time
+        self.duration = 0.0
+        self.start = time.perf_counter()
+
+    def close(self):
+        thread = threading.current_thread()
+        self.duration = time.perf_counter() - self.start
+        self.queries = thread.query_count - self.queries
+        self.sql_time = thread.query_time - self.sql_time
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'ms': round(self.duration * 1000, 3),
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 3),
+            'python_ms': round(max(self.duration - self.sql_time, 0.0) * 1000, 3),
+            'steps': [child.to_dict() for child in self.children],
+        }
+
+
+def _settings(env):
+    """(threshold in seconds, sample rate) or None when tracing is off"""
+    get_param = env['ir.config_parameter'].sudo().get_param
+    if get_param(TRACE_ENABLED_PARAM, 'False').lower() not in ('1', 'true'):
+        return None
+    try:
+        threshold = float(get_param(TRACE_THRESHOLD_PARAM, TRACE_THRESHOLD_DEFAULT)) / 1000
+        rate = float(get_param(TRACE_SAMPLE_RATE_PARAM, TRACE_SAMPLE_RATE_DEFAULT))
+    except ValueError:
+        return None
+    return threshold, rate
+
+
+@contextmanager
+def step(name):
+    """Nested step of the current trace, no-op outside a sampled trace"""
+    stack = getattr(_local, 'stack', None)
+    if not stack:
+        yield
+        return
+    span = Span(name)
+    stack[-1].children.append(span)
+    stack.append(span)
+    try:
+        yield
+    finally:
+        span.close()
+        stack.pop()
+
+
+@contextmanager
+def trace(env, name, res_ids=()):
+    """Root of a trace, or a nested step when a trace is already running"""
+    if getattr(_local, 'stack', None) is not None:
+        with step(name):
+            yield
+        return
+
+    settings = _settings(env)
+    if not settings or random.random() >= settings[1]:
+        # Вложенные вызовы не начинают собственную трассировку
+        _local.stack = []
+        try:
+            yield
+        finally:
+            _local.stack = None
+        return
+
+    thread = threading.current_thread()
+    # Счётчики запросов потока ведёт курсор, если они заведены
+    if not hasattr(thread, 'query_count'):
+        thread.query_count = 0
+        thread.query_time = 0
+    root = Span(name)
+    _local.stack = [root]
+    try:
+        yield
+    finally:
+        root.close()
+        _local.stack = None
+    if root.duration >= settings[0]:
+        env['packaging.slow.op'].sudo()._record(root, res_ids)
+
+
+def traced(name=None):
+    """Trace a model method under `model.method` (or the given name)"""
+    def decorator(method):
+        label = name or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with trace(self.env, f'{self._name}.{label}', self.ids):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator